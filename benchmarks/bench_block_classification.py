@@ -0,0 +1,97 @@
+import argparse
+import re
+import timeit
+from src.markdown_block_functions import block_to_block_type
+
+
+def legacy_block_to_block_type(markdown_block):
+    """The block_to_block_type implementation used before the first character
+    dispatch, which searches the whole block with up to five uncompiled patterns
+
+    :param markdown_block: A block of markdown
+    :type markdown_block: str
+    :returns: The block type
+    :rtype: str
+    """
+    if re.search(r"^#{1,6}\s", markdown_block):
+        return "heading"
+    elif re.search(r"^`{3}([\s\S]*)`{3}$", markdown_block, re.MULTILINE):
+        return "code"
+    elif re.search(r"^(>)\s(.*)$", markdown_block, re.MULTILINE):
+        return "quote"
+    elif re.search(r"^(-|\*)\s(.*)$", markdown_block, re.MULTILINE):
+        return "unordered_list"
+    elif re.search(r"^\d{1,3}\.\s(.*)$", markdown_block, re.MULTILINE):
+        return "ordered_list"
+    else:
+        return "paragraph"
+
+
+# each builder returns a block of the requested number of lines
+PATHOLOGICAL_BLOCKS = {
+    # every line opens a fence that is never closed, so the legacy code
+    # pattern rescans the rest of the block from each line
+    "unclosed_fences": lambda lines: "\n".join(["```x"] * lines),
+    # a long code block that only closes on its last line
+    "long_code": lambda lines: "\n".join(
+        ["```"] + ["print(value)"] * (lines - 2) + ["```"]
+    ),
+    # a quote whose last line breaks it, which is only found by checking
+    # every line
+    "broken_quote": lambda lines: "\n".join(["> quoted"] * (lines - 1) + ["plain"]),
+    "nested_list": lambda lines: "\n".join(
+        f"{'  ' * (line % 3)}- item {line}" for line in range(lines)
+    ),
+    "paragraph": lambda lines: "\n".join(["plain text, no markup"] * lines),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the block classifier with the legacy classifier on "
+        "pathological blocks of increasing size"
+    )
+    parser.add_argument(
+        "--lines",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 4000, 16000],
+        help="number of lines per block",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=PATHOLOGICAL_BLOCKS,
+        default=list(PATHOLOGICAL_BLOCKS),
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    print(
+        f"{'case':<16} {'lines':>7} {'legacy (ms)':>12} {'classifier (ms)':>16} {'per line (us)':>14}"
+    )
+    for case in arguments.cases:
+        for lines in arguments.lines:
+            block = PATHOLOGICAL_BLOCKS[case](lines)
+            number = max(1, 20000 // lines)
+            legacy = min(
+                timeit.repeat(
+                    lambda: legacy_block_to_block_type(block),
+                    number=number,
+                    repeat=arguments.repeat,
+                )
+            )
+            classifier = min(
+                timeit.repeat(
+                    lambda: block_to_block_type(block),
+                    number=number,
+                    repeat=arguments.repeat,
+                )
+            )
+            print(
+                f"{case:<16} {lines:>7} {legacy / number * 1000:>12.3f} {classifier / number * 1000:>16.3f} {classifier / number / lines * 1e6:>14.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
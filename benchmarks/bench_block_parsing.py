@@ -0,0 +1,88 @@
+import argparse
+import sys
+import timeit
+from src.markdown_block_functions import block_to_block_type
+from src.markdown_conversion_functions import block_to_html_node
+
+# each builder returns a block of the requested number of lines
+BLOCKS = {
+    # every item nests one level deeper than the one before it, so the block
+    # is as deep as it is long
+    "deep_list": lambda lines: "\n".join(
+        f"{' ' * line}- item" for line in range(lines)
+    ),
+    # items repeatedly nest 32 levels deep and return to the top level
+    "sawtooth_list": lambda lines: "\n".join(
+        f"{'  ' * (line % 32)}{line % 32 + 1}. item *{line}*" for line in range(lines)
+    ),
+    # a table with five aligned columns and one row per line after the header
+    "table": lambda lines: "\n".join(
+        ["| id | name | kind | size | note |", "|---:|:-----|:----:|-----:|------|"]
+        + [
+            f"| {row} | name {row} | `kind` | {row * 7} | a **note** |"
+            for row in range(lines - 2)
+        ]
+    ),
+}
+
+
+def parse_block(block):
+    return block_to_html_node(block, block_to_block_type(block)).to_html()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time parsing and serializing nested lists and tables of "
+        "increasing size, to check the time taken grows linearly with the input"
+    )
+    parser.add_argument(
+        "--lines",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 4000, 10000],
+        help="number of lines per block",
+    )
+    parser.add_argument("--cases", nargs="+", choices=BLOCKS, default=list(BLOCKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        help="exit non-zero if the time per KiB of input of the largest block is "
+        "more than this many times that of the smallest",
+    )
+    arguments = parser.parse_args()
+
+    print(
+        f"{'case':<14} {'lines':>7} {'KiB':>9} {'total (ms)':>11} {'per line (us)':>14} {'per KiB (us)':>13}"
+    )
+    nonlinear = []
+    for case in arguments.cases:
+        per_kib = []
+        for lines in sorted(arguments.lines):
+            block = BLOCKS[case](lines)
+            kib = len(block) / 1024
+            number = max(1, 20000 // lines)
+            duration = (
+                min(
+                    timeit.repeat(
+                        lambda: parse_block(block),
+                        number=number,
+                        repeat=arguments.repeat,
+                    )
+                )
+                / number
+            )
+            per_kib.append(duration / kib)
+            print(
+                f"{case:<14} {lines:>7} {kib:>9.1f} {duration * 1000:>11.3f} {duration / lines * 1e6:>14.3f} {duration / kib * 1e6:>13.3f}"
+            )
+        if arguments.max_growth and per_kib[-1] > per_kib[0] * arguments.max_growth:
+            nonlinear.append(case)
+
+    if nonlinear:
+        print(f"grew faster than linearly: {', '.join(nonlinear)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import timeit
+from src.markdown_inline_functions import (
+    extract_markdown_images,
+    extract_markdown_links,
+    split_nodes_delimiter,
+    text_to_textnodes,
+)
+from src.nodes_textnode import TextNode, TextType
+
+
+def legacy_split_media_nodes(nodes_to_split, split_type):
+    """The split_media_nodes implementation used before the single pass scanner,
+    which re-splits the remaining text on each reconstructed image or link
+
+    :param nodes_to_split: A list of TextNodes
+    :type nodes_to_split: list
+    :param split_type: The type of split ("image" or "link")
+    :type split_type: str
+    :returns: A list of TextNodes
+    :rtype: list
+    """
+    split_type_char = {"image": "!", "link": ""}
+    parser = {"image": extract_markdown_images, "link": extract_markdown_links}
+    text_type = {"image": TextType.IMAGE, "link": TextType.LINK}
+
+    nodes_to_return = []
+    for node in nodes_to_split:
+        if node.text_type != TextType.TEXT:
+            nodes_to_return.append(node)
+            continue
+
+        media_urls = parser[split_type](node.text)
+        if len(media_urls) == 0:
+            nodes_to_return.append(node)
+            continue
+
+        node_content = node.text
+        for a, b in media_urls:
+            splits = node_content.split(f"{split_type_char[split_type]}[{a}]({b})", 1)
+            if splits[0] != "":
+                nodes_to_return.append(TextNode(splits[0], TextType.TEXT))
+            nodes_to_return.append(TextNode(a, text_type[split_type], b))
+            node_content = splits[1]
+
+        if node_content != "":
+            nodes_to_return.append(TextNode(node_content, TextType.TEXT))
+
+    return nodes_to_return
+
+
+def legacy_text_to_textnodes(text):
+    """The five-stage split pipeline text_to_textnodes used before the single
+    pass scanner, kept here as the baseline to compare against
+
+    :param text: A text string
+    :type text: str
+    :returns: A list of TextNodes
+    :rtype: list
+    """
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = legacy_split_media_nodes(nodes, "image")
+    nodes = legacy_split_media_nodes(nodes, "link")
+    return nodes
+
+
+def build_paragraph(spans, links_only=False):
+    """Builds a single paragraph made up of the requested number of formatted
+    spans, most of which are links
+
+    :param spans: The number of formatted spans in the paragraph
+    :type spans: int
+    :param links_only: Whether every span should be a link
+    :type links_only: bool
+    :returns: A markdown formatted paragraph
+    :rtype: str
+    """
+    fragments = []
+    for i in range(spans):
+        match -1 if links_only else i % 8:
+            case 0:
+                fragments.append(f"some **bold {i}** words")
+            case 1:
+                fragments.append(f"an *italic {i}* word")
+            case 2:
+                fragments.append(f"a `snippet_{i}()` call")
+            case 3:
+                fragments.append(f"an ![image {i}](/images/{i}.png) inline")
+            case _:
+                fragments.append(f"a [link {i}](https://example.com/{i}) here")
+    return " and ".join(fragments)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the single pass inline scanner with the legacy pipeline"
+    )
+    parser.add_argument(
+        "--spans",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 5000, 20000],
+        help="number of formatted spans per paragraph",
+    )
+    parser.add_argument(
+        "--links-only",
+        action="store_true",
+        help="build paragraphs made up entirely of links",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+
+    print(f"{'spans':>8} {'legacy (ms)':>12} {'scanner (ms)':>13} {'speedup':>8}")
+    for spans in arguments.spans:
+        paragraph = build_paragraph(spans, arguments.links_only)
+        if legacy_text_to_textnodes(paragraph) != text_to_textnodes(paragraph):
+            raise AssertionError(f"outputs differ for {spans} spans")
+
+        number = max(1, 2000 // spans)
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_text_to_textnodes(paragraph),
+                number=number,
+                repeat=arguments.repeat,
+            )
+        )
+        scanner = min(
+            timeit.repeat(
+                lambda: text_to_textnodes(paragraph),
+                number=number,
+                repeat=arguments.repeat,
+            )
+        )
+        print(
+            f"{spans:>8} {legacy / number * 1000:>12.3f} {scanner / number * 1000:>13.3f} {legacy / scanner:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
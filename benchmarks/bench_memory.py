@@ -0,0 +1,94 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+from benchmarks.corpus import add_corpus_arguments, generate_corpus
+from src.markdown_conversion_functions import markdown_to_html_node
+
+
+def count_nodes(node):
+    """Counts the nodes in a tree of HTMLNodes
+
+    :param node: The root of the tree
+    :type node: HTMLNode
+    :returns: The number of nodes in the tree, including the root
+    :rtype: int
+    """
+    return 1 + sum(count_nodes(child) for child in node.children or ())
+
+
+def measure_trees(documents):
+    """Builds and keeps the html tree of every document while tracing
+    allocations, so that the memory held by the trees can be measured
+
+    :param documents: The markdown documents to convert
+    :type documents: list
+    :returns: A dict of the number of nodes built, the bytes still held by the
+        trees, the peak bytes traced while building them, and the number of
+        memory blocks still allocated
+    :rtype: dict
+    """
+    tracemalloc.start()
+    trees = [markdown_to_html_node(document) for document in documents]
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(
+        statistic.count
+        for statistic in tracemalloc.take_snapshot().statistics("filename")
+    )
+    tracemalloc.stop()
+    return {
+        "nodes": sum(count_nodes(tree) for tree in trees),
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "blocks": blocks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the memory used by the html trees of a synthetic corpus"
+    )
+    add_corpus_arguments(parser)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepaths = generate_corpus(
+            os.path.join(directory, "content"),
+            arguments.pages,
+            arguments.blocks,
+            arguments.inline_density,
+            arguments.nesting_depth,
+            arguments.seed,
+        )
+        documents = []
+        for filepath in filepaths:
+            with open(filepath, "r") as source_file:
+                documents.append(source_file.read())
+
+    result = measure_trees(documents)
+    pages = arguments.pages
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    rows = (
+        ("pages", pages),
+        ("nodes", result["nodes"]),
+        ("retained per page (KiB)", f"{result['retained_bytes'] / pages / 1024:.1f}"),
+        (
+            "retained per node (bytes)",
+            f"{result['retained_bytes'] / result['nodes']:.1f}",
+        ),
+        ("peak traced per page (KiB)", f"{result['peak_bytes'] / pages / 1024:.1f}"),
+        ("allocations per page", f"{result['blocks'] / pages:.0f}"),
+        ("peak RSS (MiB)", f"{peak_rss / 1024 / 1024:.1f}"),
+    )
+    for label, value in rows:
+        print(f"{label:<28} {value:>10}")
+
+
+if __name__ == "__main__":
+    main()
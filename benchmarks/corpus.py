@@ -0,0 +1,193 @@
+import argparse
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "while elves dwarves and men kept their own rings in the halls of "
+    "rivendell lothlorien moria and minas tirith under the watch of gandalf"
+).split()
+
+
+def inline_text(rng, words, inline_density):
+    """Builds a line of text where roughly `inline_density` of the words are
+    wrapped in inline markdown formatting
+
+    :param rng: The random number generator to draw from
+    :type rng: random.Random
+    :param words: The number of words in the line
+    :type words: int
+    :param inline_density: The fraction of words to format, between 0 and 1
+    :type inline_density: float
+    :returns: A line of markdown formatted text
+    :rtype: str
+    """
+    fragments = []
+    for index in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() >= inline_density:
+            fragments.append(word)
+            continue
+        match rng.randrange(5):
+            case 0:
+                fragments.append(f"**{word}**")
+            case 1:
+                fragments.append(f"*{word}*")
+            case 2:
+                fragments.append(f"`{word}`")
+            case 3:
+                fragments.append(f"[{word}](/{word}/{index})")
+            case 4:
+                fragments.append(f"![{word}](/images/{word}.png)")
+    return " ".join(fragments)
+
+
+def list_block(rng, inline_density, nesting_depth, ordered):
+    """Builds a list block, nesting items up to `nesting_depth` levels deep
+
+    :param rng: The random number generator to draw from
+    :type rng: random.Random
+    :param inline_density: The fraction of words to format, between 0 and 1
+    :type inline_density: float
+    :param nesting_depth: The maximum depth of nested items
+    :type nesting_depth: int
+    :param ordered: Whether to build an ordered list
+    :type ordered: bool
+    :returns: A markdown list block
+    :rtype: str
+    """
+    lines = []
+    depth = 0
+    for number in range(1, rng.randint(3, 8) + 1):
+        depth = max(0, min(nesting_depth - 1, depth + rng.choice((-1, 0, 1))))
+        marker = f"{number}." if ordered else "-"
+        text = inline_text(rng, rng.randint(3, 12), inline_density)
+        lines.append(f"{'  ' * depth}{marker} {text}")
+    return "\n".join(lines)
+
+
+def generate_page_markdown(rng, title, blocks, inline_density, nesting_depth):
+    """Builds a synthetic markdown document
+
+    :param rng: The random number generator to draw from
+    :type rng: random.Random
+    :param title: The text of the document's heading 1
+    :type title: str
+    :param blocks: The number of blocks following the heading 1
+    :type blocks: int
+    :param inline_density: The fraction of words to format, between 0 and 1
+    :type inline_density: float
+    :param nesting_depth: The maximum depth of nested list items
+    :type nesting_depth: int
+    :returns: A markdown document
+    :rtype: str
+    """
+    document = [f"# {title}"]
+    for _ in range(blocks):
+        match rng.choices(range(6), weights=(10, 50, 12, 10, 8, 10))[0]:
+            case 0:
+                heading = inline_text(rng, rng.randint(2, 6), inline_density)
+                document.append(f"{'#' * rng.randint(2, 6)} {heading}")
+            case 1:
+                sentences = [
+                    inline_text(rng, rng.randint(8, 24), inline_density)
+                    for _ in range(rng.randint(1, 4))
+                ]
+                document.append(". ".join(sentences) + ".")
+            case 2:
+                document.append(list_block(rng, inline_density, nesting_depth, False))
+            case 3:
+                document.append(list_block(rng, inline_density, nesting_depth, True))
+            case 4:
+                lines = [
+                    f"> {inline_text(rng, rng.randint(6, 16), inline_density)}"
+                    for _ in range(rng.randint(1, 4))
+                ]
+                document.append("\n".join(lines))
+            case 5:
+                lines = [
+                    f"{'    ' * rng.randint(0, 2)}{rng.choice(WORDS)}({rng.choice(WORDS)})"
+                    for _ in range(rng.randint(2, 12))
+                ]
+                document.append("```\n" + "\n".join(lines) + "\n```")
+    return "\n\n".join(document) + "\n"
+
+
+def generate_corpus(
+    directory, pages, blocks_per_page, inline_density, nesting_depth, seed=0
+):
+    """Writes a synthetic site of markdown pages to a directory, spreading the
+    pages across nested sections of up to 100 pages each
+
+    :param directory: The directory to write the pages to
+    :type directory: str
+    :param pages: The number of pages to write
+    :type pages: int
+    :param blocks_per_page: The number of blocks in each page
+    :type blocks_per_page: int
+    :param inline_density: The fraction of words to format, between 0 and 1
+    :type inline_density: float
+    :param nesting_depth: The maximum depth of nested list items
+    :type nesting_depth: int
+    :param seed: The seed for the random number generator
+    :type seed: int
+    :returns: A list of the paths written
+    :rtype: list
+    """
+    rng = random.Random(seed)
+    filepaths = []
+    for page in range(pages):
+        section = os.path.join(directory, f"section-{page // 100:04d}")
+        os.makedirs(section, exist_ok=True)
+        filepath = os.path.join(section, f"page-{page:06d}.md")
+        with open(filepath, "w") as page_file:
+            page_file.write(
+                generate_page_markdown(
+                    rng, f"Page {page}", blocks_per_page, inline_density, nesting_depth
+                )
+            )
+        filepaths.append(filepath)
+    return filepaths
+
+
+def add_corpus_arguments(parser):
+    """Adds the arguments describing the size and shape of a corpus to an
+    argument parser
+
+    :param parser: The parser to add the arguments to
+    :type parser: argparse.ArgumentParser
+    :returns: Nothing
+    :rtype: None
+    """
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument(
+        "--inline-density",
+        type=float,
+        default=0.15,
+        help="fraction of words with inline formatting",
+    )
+    parser.add_argument(
+        "--nesting-depth", type=int, default=3, help="maximum list nesting depth"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic site")
+    parser.add_argument("directory", help="the directory to write the pages to")
+    add_corpus_arguments(parser)
+    arguments = parser.parse_args()
+    filepaths = generate_corpus(
+        arguments.directory,
+        arguments.pages,
+        arguments.blocks,
+        arguments.inline_density,
+        arguments.nesting_depth,
+        arguments.seed,
+    )
+    print(f"wrote {len(filepaths)} pages to {arguments.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import http.client
+import os
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+from src.server_functions import start_static_server
+
+
+def collect_paths(directory):
+    """Returns the url of every page in a generated site
+
+    :param directory: The directory the site was generated into
+    :type directory: str
+    :returns: The site relative urls of the pages, sorted
+    :rtype: list
+    """
+    paths = []
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if not filename.endswith(".html"):
+                continue
+            path = os.path.relpath(os.path.join(dirpath, filename), directory)
+            path = "/" + path.replace(os.sep, "/")
+            paths.append(path.removesuffix("index.html"))
+    return sorted(paths)
+
+
+def run_client(host, port, paths, offset, deadline, headers, conditional, results):
+    # requests pages over a single persistent connection until the deadline,
+    # recording the latency of each request
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    etags = {}
+    latencies = []
+    errors = 0
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        request_headers = dict(headers)
+        if conditional and path in etags:
+            request_headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=request_headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors += 1
+        etag = response.getheader("ETag")
+        if etag is not None:
+            etags[path] = etag
+    connection.close()
+    results.append((latencies, errors))
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the server over a generated site, reporting the "
+        "requests served per second and the latency of each request"
+    )
+    parser.add_argument(
+        "--directory",
+        default="public",
+        help="the generated site, whose pages are requested",
+    )
+    parser.add_argument(
+        "--url",
+        help="test a server that is already running at this url, rather than "
+        "one started over the directory",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument(
+        "--compressed",
+        action="store_true",
+        help="accept gzip and brotli encoded responses",
+    )
+    parser.add_argument(
+        "--conditional",
+        action="store_true",
+        help="revalidate pages already fetched with If-None-Match",
+    )
+    arguments = parser.parse_args()
+
+    paths = collect_paths(arguments.directory)
+    if not paths:
+        parser.error(f"no pages found in {arguments.directory}")
+
+    server = None
+    if arguments.url:
+        parts = urlsplit(arguments.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        server = start_static_server(arguments.directory, "127.0.0.1", 0)
+        host, port = server.server_address[:2]
+
+    headers = {}
+    if arguments.compressed:
+        headers["Accept-Encoding"] = "br, gzip"
+    results = []
+    deadline = time.perf_counter() + arguments.duration
+    clients = [
+        threading.Thread(
+            target=run_client,
+            args=(
+                host,
+                port,
+                paths,
+                client * len(paths) // arguments.concurrency,
+                deadline,
+                headers,
+                arguments.conditional,
+                results,
+            ),
+        )
+        for client in range(arguments.concurrency)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    latencies = sorted(latency for client, _ in results for latency in client)
+    errors = sum(client_errors for _, client_errors in results)
+    print(f"pages:            {len(paths)}")
+    print(f"connections:      {arguments.concurrency}")
+    print(f"requests:         {len(latencies)}")
+    print(f"errors:           {errors}")
+    print(f"requests/sec:     {len(latencies) / elapsed:.1f}")
+    if latencies:
+        print(f"mean latency:     {statistics.fmean(latencies) * 1000:.2f} ms")
+        print(f"p50 latency:      {percentile(latencies, 0.5) * 1000:.2f} ms")
+        print(f"p99 latency:      {percentile(latencies, 0.99) * 1000:.2f} ms")
+        print(f"max latency:      {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from benchmarks.corpus import add_corpus_arguments, generate_corpus
+from src.markdown_block_functions import block_to_block_type, markdown_to_blocks
+from src.markdown_conversion_functions import markdown_to_html_node
+from src.markdown_inline_functions import text_to_textnodes
+from src.site_generation_functions import write_destination
+
+INLINE_PREFIX_PATTERN = re.compile(r"^\s*(#{1,6} |[-*] |\d+\. |> ?)")
+
+
+def time_stage(function, repeat):
+    """Runs a stage `repeat` times and returns the duration of each run
+
+    :param function: The stage to run
+    :type function: Callable
+    :param repeat: The number of times to run the stage
+    :type repeat: int
+    :returns: A list of durations in seconds
+    :rtype: list
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def inline_texts(blocks):
+    """Extracts the lines of inline text from a list of blocks, in the way the
+    block parsers pass them to the inline parser
+
+    :param blocks: A list of markdown blocks
+    :type blocks: list
+    :returns: A list of lines of inline text
+    :rtype: list
+    """
+    texts = []
+    for block in blocks:
+        if block.startswith("```"):
+            continue
+        for line in block.split("\n"):
+            texts.append(INLINE_PREFIX_PATTERN.sub("", line, count=1))
+    return texts
+
+
+def run_stages(filepaths, output_directory, repeat):
+    """Times each stage of page generation separately over a corpus. Each stage
+    is given the output of the previous stage, so a stage's timing only covers
+    its own work.
+
+    :param filepaths: The markdown files to process
+    :type filepaths: list
+    :param output_directory: A scratch directory to write html files to
+    :type output_directory: str
+    :param repeat: The number of times to run each stage
+    :type repeat: int
+    :returns: A dict of stage name to list of durations in seconds
+    :rtype: dict
+    """
+    documents = []
+
+    def read():
+        documents.clear()
+        for filepath in filepaths:
+            with open(filepath, "r") as source_file:
+                documents.append(source_file.read())
+
+    results = {"io_read": time_stage(read, repeat)}
+
+    pages = [markdown_to_blocks(document) for document in documents]
+    results["block_split"] = time_stage(
+        lambda: [markdown_to_blocks(document) for document in documents], repeat
+    )
+
+    blocks = [block for page in pages for block in page]
+    results["block_classification"] = time_stage(
+        lambda: [block_to_block_type(block) for block in blocks], repeat
+    )
+
+    texts = inline_texts(blocks)
+    results["inline_parse"] = time_stage(
+        lambda: [text_to_textnodes(text) for text in texts], repeat
+    )
+
+    # markdown_to_html_node runs every stage above, so the exclusive cost of
+    # building the tree is reported as the remainder
+    trees = [markdown_to_html_node(document) for document in documents]
+    results["tree_build"] = [
+        max(
+            0.0,
+            duration
+            - min(results["block_split"])
+            - min(results["block_classification"])
+            - min(results["inline_parse"]),
+        )
+        for duration in time_stage(
+            lambda: [markdown_to_html_node(document) for document in documents],
+            repeat,
+        )
+    ]
+
+    results["serialization"] = time_stage(
+        lambda: [tree.to_html() for tree in trees], repeat
+    )
+
+    markups = [tree.to_html() for tree in trees]
+    destinations = [
+        os.path.join(output_directory, f"{index:06d}.html")
+        for index in range(len(markups))
+    ]
+
+    def write():
+        for destination, markup in zip(destinations, markups):
+            write_destination(destination, markup)
+
+    results["io_write"] = time_stage(write, repeat)
+    return results
+
+
+def summarise(results, pages):
+    """Reduces the raw durations of each stage to summary statistics
+
+    :param results: A dict of stage name to list of durations in seconds
+    :type results: dict
+    :param pages: The number of pages in the corpus
+    :type pages: int
+    :returns: A dict of stage name to summary statistics
+    :rtype: dict
+    """
+    return {
+        stage: {
+            "min_seconds": min(durations),
+            "mean_seconds": sum(durations) / len(durations),
+            "per_page_ms": min(durations) / pages * 1000,
+            "runs": durations,
+        }
+        for stage, durations in results.items()
+    }
+
+
+def compare(stages, baseline, threshold):
+    """Prints each stage's timing against a baseline, and returns the stages
+    that are slower than the baseline by more than the threshold
+
+    :param stages: The summarised results of this run
+    :type stages: dict
+    :param baseline: The summarised results of a previous run
+    :type baseline: dict
+    :param threshold: The fractional slowdown tolerated before a stage counts
+        as a regression
+    :type threshold: float
+    :returns: A list of the stages that regressed
+    :rtype: list
+    """
+    regressions = []
+    print(f"{'stage':<22} {'baseline (ms)':>14} {'current (ms)':>13} {'change':>8}")
+    for stage, summary in stages.items():
+        if stage not in baseline:
+            continue
+        previous = baseline[stage]["min_seconds"]
+        current = summary["min_seconds"]
+        change = (current - previous) / previous if previous > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        print(
+            f"{stage:<22} {previous * 1000:>14.2f} {current * 1000:>13.2f} {change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time each stage of page generation over a synthetic corpus"
+    )
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fractional slowdown against the baseline reported as a regression",
+    )
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepaths = generate_corpus(
+            os.path.join(directory, "content"),
+            arguments.pages,
+            arguments.blocks,
+            arguments.inline_density,
+            arguments.nesting_depth,
+            arguments.seed,
+        )
+        stages = summarise(
+            run_stages(filepaths, os.path.join(directory, "public"), arguments.repeat),
+            arguments.pages,
+        )
+
+    print(f"{'stage':<22} {'total (ms)':>11} {'per page (ms)':>14}")
+    for stage, summary in stages.items():
+        print(
+            f"{stage:<22} {summary['min_seconds'] * 1000:>11.2f} {summary['per_page_ms']:>14.3f}"
+        )
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "corpus": {
+                "pages": arguments.pages,
+                "blocks": arguments.blocks,
+                "inline_density": arguments.inline_density,
+                "nesting_depth": arguments.nesting_depth,
+                "seed": arguments.seed,
+            },
+            "repeat": arguments.repeat,
+        },
+        "stages": stages,
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["meta"]["corpus"] != results["meta"]["corpus"]:
+            print("warning: the baseline was recorded with a different corpus")
+        print()
+        if compare(stages, baseline["stages"], arguments.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
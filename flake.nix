@@ -13,7 +13,12 @@
 
         buildScript = pkgs.writeScriptBin "build" ''
           #!${pkgs.bash}/bin/bash
-          PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main
+          PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main "$@"
+        '';
+
+        watchScript = pkgs.writeScriptBin "watch" ''
+          #!${pkgs.bash}/bin/bash
+          PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main watch "$@"
         '';
 
         testScript = pkgs.writeScriptBin "tests" ''
@@ -39,12 +44,11 @@
           }
 
           serve_public_directory() {
-            echo "Starting HTTP server on 0.0.0.0 port 8888 (http://0.0.0.0:8888/)"
-            cd public && ${pkgs.python312}/bin/python3 -m http.server 8888
+            PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main serve "$@"
           }
 
           if check_public_directory; then
-            serve_public_directory
+            serve_public_directory "$@"
           else
             exit 1
           fi
@@ -76,8 +80,7 @@
         mainPackage = pkgs.writeScriptBin "site-generator" ''
           #!${pkgs.bash}/bin/bash
           PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main
-          echo "Starting HTTP server on 0.0.0.0 port 8888 (http://0.0.0.0:8888/)"
-          cd public && ${pkgs.python312}/bin/python3 -m http.server 8888
+          PYTHONPATH=$PYTHONPATH:. ${pkgs.python312}/bin/python3 -m src.main serve
         '';
       in
       {
@@ -90,6 +93,7 @@
             pkgs.black
             pkgs.pyright
             buildScript
+            watchScript
             testScript
             serveScript
             formatScript
@@ -103,6 +107,7 @@
             echo "  * build - Generate the static site"
             echo "  * tests - Execute unit tests"
             echo "  * serve - Serve the site at port 8888"
+            echo "  * watch - Serve the site with live reload, rebuilding on changes"
             echo "  * format check - Check file formatting"
             echo "  * format fix - Format files in project"
 
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+MANIFEST_SECTIONS = (
+    "pages",
+    "static",
+    "images",
+    "listings",
+    "outputs",
+    "compressed",
+)
+
+
+def hash_file(filepath):
+    """Takes a filepath and returns the sha256 hex digest of the file's content
+
+    :param filepath: The path to the file to hash
+    :type filepath: str
+    :returns: The hex digest of the file's content
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def atomic_write(filepath, mode="w"):
+    """Opens a temporary file next to filepath and moves it into place once the
+    block completes, so that a reader never sees a partly written file and a
+    destination hard linked elsewhere is never written through. The temporary
+    file is removed when the block raises. The directory must already exist.
+
+    :param filepath: The path to write
+    :type filepath: str
+    :param mode: The mode to open the file in, "w" or "wb"
+    :type mode: str
+    :returns: The open temporary file
+    :rtype: file
+    """
+    temporary_filepath = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        with open(
+            temporary_filepath, mode, encoding=None if "b" in mode else "utf-8"
+        ) as temporary_file:
+            yield temporary_file
+        os.replace(temporary_filepath, filepath)
+    finally:
+        if os.path.exists(temporary_filepath):
+            os.remove(temporary_filepath)
+
+
+class BuildManifest:
+    """Records what each source file produced during a build, so the next build
+    can skip inputs that have not changed and remove outputs that are no longer
+    produced by any source.
+
+    Each section maps a source path to an entry containing the content hash of
+    the source and the output path it was written to. Page entries also hold the
+    hash of the template used to render them. Listings have no source file, so
+    they are keyed by their output path and hash their rendered html instead,
+    and image variants are keyed by their output path and record the cache key
+    of the image they were resized from. Precompressed siblings are keyed by
+    their own path and record the hash of the output they were compressed from.
+    Site-wide outputs, such as the sitemap and feeds, are rewritten on every
+    build and only record their output path.
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.previous = self.load(manifest_path)
+        self.current = {section: {} for section in MANIFEST_SECTIONS}
+        self.template_hashes = {}
+
+    @staticmethod
+    def load(manifest_path):
+        """Loads a manifest from disk. A missing or unreadable manifest is treated
+        as an empty one, which results in a full rebuild.
+
+        :param manifest_path: The path to the manifest file
+        :type manifest_path: str
+        :returns: A dict containing the manifest sections
+        :rtype: dict
+        """
+        try:
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {}
+        return {section: manifest.get(section, {}) for section in MANIFEST_SECTIONS}
+
+    def is_first_build(self):
+        """Returns True if there is no record of a previous build"""
+        return not any(self.previous.values())
+
+    def hash_template(self, template_path):
+        """Returns the hash of a template file, hashing each template only once
+        per build
+
+        :param template_path: The path to the template file
+        :type template_path: str
+        :returns: The hex digest of the template's content
+        :rtype: str
+        """
+        if template_path not in self.template_hashes:
+            self.template_hashes[template_path] = hash_file(template_path)
+        return self.template_hashes[template_path]
+
+    def is_current(self, section, source, entry):
+        """Checks whether a source file produced the same values for every key
+        of an entry on the previous build, and that its output still exists
+
+        :param section: The manifest section, one of MANIFEST_SECTIONS
+        :type section: str
+        :param source: The path to the source file
+        :type source: str
+        :param entry: The entry the source would produce on this build
+        :type entry: dict
+        :returns: True if the source can be skipped
+        :rtype: bool
+        """
+        previous = self.previous[section].get(source)
+        return (
+            previous is not None
+            and all(previous.get(key) == value for key, value in entry.items())
+            and os.path.exists(entry["output"])
+        )
+
+    def is_unmodified(self, section, source, size, mtime_ns, output):
+        """Checks whether a source file has the same size and modification time
+        as on the previous build, and that its output still exists, so that its
+        content does not need to be hashed
+
+        :param section: The manifest section, one of MANIFEST_SECTIONS
+        :type section: str
+        :param source: The path to the source file
+        :type source: str
+        :param size: The size of the source file in bytes
+        :type size: int
+        :param mtime_ns: The modification time of the source file
+        :type mtime_ns: int
+        :param output: The output the source would produce on this build
+        :type output: str
+        :returns: True if the source can be skipped
+        :rtype: bool
+        """
+        entry = self.previous[section].get(source)
+        return (
+            entry is not None
+            and entry.get("size") == size
+            and entry.get("mtime_ns") == mtime_ns
+            and entry["output"] == output
+            and os.path.exists(output)
+        )
+
+    def record(self, section, source, entry):
+        """Records the entry produced by a source file on this build
+
+        :param section: The manifest section, one of MANIFEST_SECTIONS
+        :type section: str
+        :param source: The path to the source file
+        :type source: str
+        :param entry: The entry produced by the source
+        :type entry: dict
+        :returns: Nothing
+        :rtype: None
+        """
+        self.current[section][source] = entry
+
+    def keep_previous(self, section, source):
+        """Carries the entry from the previous build forward for a source file
+        that could not be processed on this build, so its existing output is not
+        treated as orphaned and the source is retried on the next build
+
+        :param section: The manifest section, one of MANIFEST_SECTIONS
+        :type section: str
+        :param source: The path to the source file
+        :type source: str
+        :returns: Nothing
+        :rtype: None
+        """
+        if source in self.previous[section]:
+            self.current[section][source] = self.previous[section][source]
+
+    def carry_forward(self, sections=MANIFEST_SECTIONS):
+        """Carries every entry of the previous build forward, for a rebuild that
+        only processes the sources that changed and records their new entries
+        over the old ones
+
+        :param sections: The manifest sections to carry forward
+        :type sections: Iterable[str]
+        :returns: Nothing
+        :rtype: None
+        """
+        for section in sections:
+            self.current[section].update(self.previous[section])
+
+    def advance(self):
+        """Makes the entries recorded on this build those of the previous build,
+        so that a process rebuilding the site repeatedly, such as watch, can keep
+        one manifest in memory rather than loading it again for every rebuild
+
+        :returns: Nothing
+        :rtype: None
+        """
+        self.previous = self.current
+        self.current = {section: {} for section in MANIFEST_SECTIONS}
+        self.template_hashes = {}
+
+    def forget(self, section, source):
+        """Drops the entry for a source that no longer produces an output
+
+        :param section: The manifest section, one of MANIFEST_SECTIONS
+        :type section: str
+        :param source: The path to the source file
+        :type source: str
+        :returns: Nothing
+        :rtype: None
+        """
+        self.current[section].pop(source, None)
+
+    def current_outputs(self):
+        """Returns the outputs produced by this build so far
+
+        :returns: A set of output paths
+        :rtype: set
+        """
+        return {
+            entry["output"]
+            for section in MANIFEST_SECTIONS
+            for entry in self.current[section].values()
+        }
+
+    def orphaned_outputs(self):
+        """Returns the outputs of the previous build that were not produced by
+        this build
+
+        :returns: A sorted list of output paths
+        :rtype: list
+        """
+        produced = self.current_outputs()
+        return sorted(
+            {
+                entry["output"]
+                for section in MANIFEST_SECTIONS
+                for entry in self.previous[section].values()
+            }
+            - produced
+        )
+
+    def save(self):
+        """Writes the entries recorded on this build to disk
+
+        :returns: Nothing
+        :rtype: None
+        """
+        with atomic_write(self.manifest_path) as manifest_file:
+            json.dump(self.current, manifest_file, indent=1, sort_keys=True)
+
+    def __repr__(self):
+        return f"BuildManifest({self.manifest_path})"
@@ -0,0 +1,135 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.build_manifest import atomic_write, hash_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".html", ".js", ".json", ".svg", ".txt", ".xml")
+
+
+def compression_encodings():
+    """Returns the extensions of the precompressed siblings written for each
+    output: gz, and br when the brotli package is installed
+
+    :returns: The extensions, in the order they are preferred by the server
+    :rtype: tuple
+    """
+    if brotli is None:
+        return ("gz",)
+    return ("br", "gz")
+
+
+def compress_output(job):
+    """Writes the precompressed siblings of an output. Each sibling is written
+    to a temporary file which then replaces it, so a sibling is never seen half
+    written. This function is the unit of work handed to the process pool.
+
+    :param job: A tuple of (output, encodings)
+    :type job: tuple
+    :returns: The output
+    :rtype: str
+    """
+    output, encodings = job
+    with open(output, "rb") as output_file:
+        content = output_file.read()
+    for encoding in encodings:
+        if encoding == "br":
+            compressed = brotli.compress(content, quality=11)
+        else:
+            # a fixed mtime keeps the output the same from one build to the next
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        with atomic_write(f"{output}.{encoding}", "wb") as sibling_file:
+            sibling_file.write(compressed)
+    return output
+
+
+def precompress_outputs(manifest, jobs=1):
+    """Writes gzip, and brotli when it is available, compressed siblings of every
+    text output recorded in the manifest, so a server can send them without
+    compressing each response.
+
+    Outputs whose size and modification time are unchanged since the previous
+    build are skipped without being read, and outputs that were rewritten are
+    only compressed again if their content hash changed. Outputs are compressed
+    on a pool of worker processes when more than one job is requested.
+
+    :param manifest: The manifest of the current build, with every other output
+        already recorded
+    :type manifest: BuildManifest
+    :param jobs: The number of worker processes to compress outputs with
+    :type jobs: int
+    :returns: The number of outputs compressed
+    :rtype: int
+    """
+    encodings = compression_encodings()
+    pending = []
+    unchanged = 0
+    for output in sorted(manifest.current_outputs()):
+        if not output.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        try:
+            stat = os.stat(output)
+        except OSError:
+            continue
+        siblings = [f"{output}.{encoding}" for encoding in encodings]
+        if all(
+            manifest.is_unmodified(
+                "compressed", sibling, stat.st_size, stat.st_mtime_ns, sibling
+            )
+            for sibling in siblings
+        ):
+            for sibling in siblings:
+                manifest.keep_previous("compressed", sibling)
+            unchanged += 1
+            continue
+
+        content_hash = hash_file(output)
+        entries = {
+            sibling: {"hash": content_hash, "output": sibling} for sibling in siblings
+        }
+        is_current = all(
+            manifest.is_current("compressed", sibling, entry)
+            for sibling, entry in entries.items()
+        )
+        for entry in entries.values():
+            # record the new size and mtime so the next build can skip hashing
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+        if is_current:
+            for sibling, entry in entries.items():
+                # the output was rewritten with the same content, so its siblings
+                # are brought up to its mtime for the server to keep serving them
+                os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                manifest.record("compressed", sibling, entry)
+            unchanged += 1
+            continue
+        pending.append(((output, encodings), entries))
+
+    compress_jobs = [job for job, _ in pending]
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            list(
+                executor.map(
+                    compress_output,
+                    compress_jobs,
+                    chunksize=max(1, len(pending) // (jobs * 4)),
+                )
+            )
+    else:
+        for job in compress_jobs:
+            compress_output(job)
+    # siblings are only recorded once written, so a failed build compresses
+    # them again
+    for _, entries in pending:
+        for sibling, entry in entries.items():
+            manifest.record("compressed", sibling, entry)
+
+    print(
+        f"compressed outputs: {len(pending)} compressed, {unchanged} unchanged "
+        f"({', '.join(encodings)})"
+    )
+    return len(pending)
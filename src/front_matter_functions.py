@@ -0,0 +1,142 @@
+import datetime
+import re
+import tomllib
+from itertools import chain
+
+YAML_DELIMITER = "---"
+TOML_DELIMITER = "+++"
+YAML_KEY_PATTERN = re.compile(r"(?P<key>[A-Za-z_][\w-]*)\s*:(?:\s+(?P<value>.*))?$")
+INTEGER_PATTERN = re.compile(r"[-+]?\d+")
+
+
+def parse_yaml_value(value):
+    """Takes the text of a scalar or inline list value from YAML style front
+    matter and converts it to a Python value. Only the subset of YAML used for
+    page metadata is supported: quoted and bare strings, booleans, integers and
+    inline lists of those.
+
+    :param value: The text of the value
+    :type value: str
+    :returns: The parsed value
+    :rtype: str | bool | int | list
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        items = value[1:-1].strip()
+        if items == "":
+            return []
+        return [parse_yaml_value(item) for item in items.split(",")]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in ("true", "yes"):
+        return True
+    if value.lower() in ("false", "no"):
+        return False
+    if INTEGER_PATTERN.fullmatch(value):
+        return int(value)
+    return value
+
+
+def parse_yaml_front_matter(lines):
+    """Takes the lines of YAML style front matter and returns the metadata they
+    contain. Block lists, written as indented `- item` lines after a key with no
+    value, are supported alongside the values handled by parse_yaml_value. A key
+    with no value and no items is an empty string.
+
+    :param lines: The lines between the front matter delimiters
+    :type lines: list
+    :returns: The metadata
+    :rtype: dict
+    """
+    metadata = {}
+    list_key = None
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        if list_key is not None and stripped.startswith("- "):
+            if not isinstance(metadata[list_key], list):
+                metadata[list_key] = []
+            metadata[list_key].append(parse_yaml_value(stripped[2:]))
+            continue
+
+        match = YAML_KEY_PATTERN.match(line)
+        if match is None:
+            raise ValueError(f"Invalid front matter: line {number}: {line!r}")
+        key, value = match.group("key"), match.group("value")
+        if value is None or value.strip() == "":
+            metadata[key] = ""
+            list_key = key
+        else:
+            metadata[key] = parse_yaml_value(value)
+            list_key = None
+    return metadata
+
+
+def parse_toml_front_matter(lines):
+    """Takes the lines of TOML style front matter and returns the metadata they
+    contain
+
+    :param lines: The lines between the front matter delimiters
+    :type lines: list
+    :returns: The metadata
+    :rtype: dict
+    """
+    try:
+        metadata = tomllib.loads("\n".join(lines))
+    except tomllib.TOMLDecodeError as error:
+        raise ValueError(f"Invalid front matter: {error}") from None
+    return toml_dates_to_text(metadata)
+
+
+def toml_dates_to_text(value):
+    """Replaces the dates and times in parsed TOML with their ISO 8601 text, so
+    that dates from either style of front matter compare and serialize the same
+    way. Dates inside arrays and tables are replaced too.
+
+    :param value: A value parsed from TOML
+    :type value: Any
+    :returns: The value with its dates and times as text
+    :rtype: Any
+    """
+    if isinstance(value, dict):
+        return {key: toml_dates_to_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [toml_dates_to_text(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def split_front_matter(lines):
+    """Takes the lines of a markdown document and reads the front matter from the
+    top of it, if there is any. Front matter is delimited by `---` lines and
+    written in YAML style, or by `+++` lines and written in TOML. Only the lines
+    of the front matter are consumed, so the body can still be read lazily.
+
+    :param lines: The lines of a markdown document, such as an open file
+    :type lines: Iterable[str]
+    :returns: A tuple of (metadata, body_lines), where body_lines is an iterator
+        over the remaining lines of the document
+    :rtype: tuple
+    """
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return {}, lines
+
+    delimiter = first_line.rstrip()
+    if delimiter not in (YAML_DELIMITER, TOML_DELIMITER):
+        return {}, chain((first_line,), lines)
+
+    front_matter = []
+    for line in lines:
+        if line.rstrip() == delimiter:
+            break
+        front_matter.append(line.removesuffix("\n"))
+    else:
+        raise ValueError(f"Invalid front matter: no closing '{delimiter}'")
+
+    if delimiter == TOML_DELIMITER:
+        return parse_toml_front_matter(front_matter), lines
+    return parse_yaml_front_matter(front_matter), lines
@@ -0,0 +1,197 @@
+import hashlib
+import html
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.build_manifest import atomic_write
+
+try:
+    import pygments
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    pygments = None
+
+# bump whenever the html produced for highlighted code changes, so that html
+# cached by an older version is not reused
+HIGHLIGHT_CACHE_VERSION = 1
+
+# the highlighter that code blocks are highlighted with in this process, if any
+active_highlighter = None
+
+# the highlighter kept by this process across pages, and the cache directory
+# it was created for
+process_highlighter = None
+process_highlighter_source = None
+
+
+def escape_code(code):
+    """Escapes code for inclusion in html without highlighting it
+
+    :param code: The code
+    :type code: str
+    :returns: The code, with the characters that are special in html escaped
+    :rtype: str
+    """
+    return html.escape(code, quote=False)
+
+
+def highlight_code(language, code):
+    """Highlights code with Pygments, wrapping each token in a span with a class
+    naming its type. Code in a language Pygments has no lexer for, or any code
+    when Pygments is not installed, is escaped without being highlighted.
+
+    :param language: The language named in the code block's info string
+    :type language: str
+    :param code: The code
+    :type code: str
+    :returns: The html for the code
+    :rtype: str
+    """
+    if pygments is None:
+        return escape_code(code)
+    try:
+        lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return escape_code(code)
+    return pygments.highlight(code, lexer, HtmlFormatter(nowrap=True))
+
+
+def highlight_digest():
+    """Returns an identifier for the highlighting produced by this process, which
+    changes with the cache version and the version of Pygments
+
+    :returns: The identifier
+    :rtype: str
+    """
+    version = "none" if pygments is None else pygments.__version__
+    return f"{HIGHLIGHT_CACHE_VERSION}:{version}"
+
+
+def highlight_key(language, code):
+    """Returns the key highlighted code is cached under
+
+    :param language: The language of the code
+    :type language: str
+    :param code: The code
+    :type code: str
+    :returns: The hex digest identifying the code, its language and the
+        highlighter
+    :rtype: str
+    """
+    return hashlib.sha256(
+        f"{highlight_digest()}\0{language}\0{code}".encode()
+    ).hexdigest()
+
+
+def cache_path(cache_dir_path, key):
+    return os.path.join(cache_dir_path, key[:2], f"{key[2:]}.html")
+
+
+def write_cached_highlight(cache_dir_path, key, highlighted):
+    output = cache_path(cache_dir_path, key)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with atomic_write(output) as highlight_file:
+        highlight_file.write(highlighted)
+
+
+class Highlighter:
+    """Highlights the code blocks of pages, caching the html for each by a hash
+    of its language and code. Highlighted code is kept in a bounded, least
+    recently used cache in memory, and persisted to a directory so that code is
+    only highlighted once however often the site is rebuilt.
+    """
+
+    def __init__(self, cache_dir_path, max_entries=1024):
+        self.cache_dir_path = cache_dir_path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.digest = highlight_digest()
+
+    def highlight(self, language, code):
+        """Returns the html for a code block, highlighting it only if it is not
+        already cached
+
+        :param language: The language named in the code block's info string
+        :type language: str
+        :param code: The code
+        :type code: str
+        :returns: The html for the code
+        :rtype: str
+        """
+        key = highlight_key(language, code)
+        highlighted = self.entries.get(key)
+        if highlighted is not None:
+            self.entries.move_to_end(key)
+            return highlighted
+
+        try:
+            with open(cache_path(self.cache_dir_path, key), "r") as highlight_file:
+                highlighted = highlight_file.read()
+        except OSError:
+            highlighted = highlight_code(language, code)
+            write_cached_highlight(self.cache_dir_path, key, highlighted)
+        self.entries[key] = highlighted
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return highlighted
+
+    def __repr__(self):
+        return f"Highlighter({self.cache_dir_path}, entries: {len(self.entries)})"
+
+
+def highlight(language, code):
+    """Returns the html for a code block, highlighted by the active highlighter
+    if there is one and the block names its language, and otherwise escaped
+
+    :param language: The language named in the code block's info string, or
+        None
+    :type language: str
+    :param code: The code
+    :type code: str
+    :returns: The html for the code
+    :rtype: str
+    """
+    if active_highlighter is None or language is None:
+        return escape_code(code)
+    return active_highlighter.highlight(language, code)
+
+
+def active_highlight_digest():
+    """Returns the digest of the active highlighter, or an empty string if there
+    is none"""
+    return "" if active_highlighter is None else active_highlighter.digest
+
+
+def get_highlighter(cache_dir_path):
+    """Returns the highlighter kept by this process, so worker processes keep
+    highlighted code in memory across pages
+
+    :param cache_dir_path: The directory highlighted code is cached in
+    :type cache_dir_path: str
+    :returns: The highlighter
+    :rtype: Highlighter
+    """
+    global process_highlighter, process_highlighter_source
+    if process_highlighter is None or process_highlighter_source != cache_dir_path:
+        process_highlighter = Highlighter(cache_dir_path)
+        process_highlighter_source = cache_dir_path
+    return process_highlighter
+
+
+@contextmanager
+def using_highlighter(highlighter):
+    """Makes a highlighter the active highlighter for this process for the body
+    of a with statement
+
+    :param highlighter: The highlighter to highlight code blocks with, or None
+    :type highlighter: Highlighter
+    """
+    global active_highlighter
+    previous = active_highlighter
+    active_highlighter = highlighter
+    try:
+        yield highlighter
+    finally:
+        active_highlighter = previous
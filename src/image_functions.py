@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import struct
+from contextlib import contextmanager
+
+IMAGE_EXTENSIONS = (".gif", ".jpeg", ".jpg", ".png", ".webp")
+
+# the image index that image tags are completed from in this process, if any
+active_image_index = None
+
+# the image index kept by this process across pages, with the path and
+# modification time it was loaded from
+process_image_index = None
+process_image_index_source = None
+
+
+def read_image_dimensions(filepath):
+    """Reads the intrinsic width and height of a PNG, GIF, JPEG or WebP image
+    from its header, without decoding the image
+
+    :param filepath: The path to the image
+    :type filepath: str
+    :returns: A tuple of (width, height), or None if the format is not
+        recognised or the header is malformed
+    :rtype: tuple
+    """
+    with open(filepath, "rb") as image_file:
+        header = image_file.read(30)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            chunk = header[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", header[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return (
+                    int.from_bytes(header[24:27], "little") + 1,
+                    int.from_bytes(header[27:30], "little") + 1,
+                )
+            return None
+        if header[:2] == b"\xff\xd8":
+            return read_jpeg_dimensions(image_file)
+    return None
+
+
+def read_jpeg_dimensions(image_file):
+    # walks the segments of a JPEG until the start of frame, which holds the
+    # dimensions of the image
+    image_file.seek(2)
+    while True:
+        marker = image_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0x01, 0xFF) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = image_file.read(2)
+        if len(length) < 2:
+            return None
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            frame = image_file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        image_file.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+class ImageIndex:
+    """Maps the url of every image on the site to its intrinsic dimensions and
+    the resized variants generated for it, so image tags can be given a width,
+    height and srcset without the images being read while pages are rendered.
+
+    The digest identifies the content of the index, so that html rendered with
+    one version of the index is not reused with another.
+    """
+
+    def __init__(self, images, digest=""):
+        self.images = images
+        self.digest = digest
+
+    @classmethod
+    def load(cls, index_path):
+        """Loads an index written by process_images
+
+        :param index_path: The path to the index
+        :type index_path: str
+        :returns: The index, empty if it could not be read
+        :rtype: ImageIndex
+        """
+        try:
+            with open(index_path, "rb") as index_file:
+                content = index_file.read()
+            images = json.loads(content)
+        except (OSError, ValueError):
+            return cls({})
+        return cls(images, hashlib.sha256(content).hexdigest())
+
+    def image_props(self, src, alt):
+        """Returns the attributes of an image tag
+
+        :param src: The url of the image
+        :type src: str
+        :param alt: The alt text of the image
+        :type alt: str
+        :returns: The src and alt of the image, along with its width, height and
+            srcset when the image is in the index
+        :rtype: dict
+        """
+        props = {"src": src, "alt": alt}
+        image = self.images.get(src)
+        if image is not None:
+            props["width"] = str(image["width"])
+            props["height"] = str(image["height"])
+            if image["variants"]:
+                props["srcset"] = ", ".join(
+                    f"{url} {width}w"
+                    for url, width in image["variants"] + [[src, image["width"]]]
+                )
+                props["sizes"] = (
+                    f"(max-width: {image['width']}px) 100vw, {image['width']}px"
+                )
+        return props
+
+    def __repr__(self):
+        return f"ImageIndex(images: {len(self.images)})"
+
+
+def image_props(src, alt):
+    """Returns the attributes of an image tag, completed from the active image
+    index if there is one
+
+    :param src: The url of the image
+    :type src: str
+    :param alt: The alt text of the image
+    :type alt: str
+    :returns: The attributes of the image tag
+    :rtype: dict
+    """
+    if active_image_index is None:
+        return {"src": src, "alt": alt}
+    return active_image_index.image_props(src, alt)
+
+
+def image_index_digest():
+    """Returns the digest of the active image index, or an empty string if there
+    is none"""
+    return "" if active_image_index is None else active_image_index.digest
+
+
+def get_image_index(index_path):
+    """Returns the image index kept by this process, loading it again only when
+    the file has changed, so worker processes read it once per build
+
+    :param index_path: The path to the index
+    :type index_path: str
+    :returns: The image index
+    :rtype: ImageIndex
+    """
+    global process_image_index, process_image_index_source
+    try:
+        source = (index_path, os.stat(index_path).st_mtime_ns)
+    except OSError:
+        source = (index_path, None)
+    if process_image_index is None or process_image_index_source != source:
+        process_image_index = ImageIndex.load(index_path)
+        process_image_index_source = source
+    return process_image_index
+
+
+@contextmanager
+def using_image_index(image_index):
+    """Makes an image index the active image index for this process for the
+    body of a with statement
+
+    :param image_index: The image index to complete image tags from, or None
+    :type image_index: ImageIndex
+    """
+    global active_image_index
+    previous = active_image_index
+    active_image_index = image_index
+    try:
+        yield image_index
+    finally:
+        active_image_index = previous
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.build_manifest import atomic_write, hash_file
+from src.image_functions import IMAGE_EXTENSIONS, read_image_dimensions
+from src.site_generation_functions import collect_static_files, copy_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# bump whenever the variants generated for an image change, so that variants
+# cached by an older version are not reused
+IMAGE_CACHE_VERSION = 1
+VARIANT_WIDTHS = (480, 960, 1600)
+JPEG_QUALITY = 82
+
+# formats whose variants are recompressed with Pillow; animated GIFs are left
+# as they are, since resizing would keep only their first frame
+VARIANT_FORMATS = {".jpeg": "JPEG", ".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+
+
+def image_cache_key(content_hash, widths):
+    """Returns the key an image's dimensions and variants are cached under
+
+    :param content_hash: The hex digest of the image's content
+    :type content_hash: str
+    :param widths: The widths of the variants generated
+    :type widths: tuple
+    :returns: The hex digest identifying the image and the variants requested
+    :rtype: str
+    """
+    # without Pillow no variants are generated, so the key must change once it
+    # is installed for them to be generated
+    widths = ",".join(map(str, widths)) if Image is not None else ""
+    return hashlib.sha256(
+        f"{IMAGE_CACHE_VERSION}\0{widths}\0{content_hash}".encode()
+    ).hexdigest()
+
+
+def cache_path(cache_dir_path, key, suffix):
+    return os.path.join(cache_dir_path, key[:2], f"{key[2:]}{suffix}")
+
+
+def variant_path(filepath, width):
+    """Returns the path of a resized variant of an image
+
+    :param filepath: The path to the image
+    :type filepath: str
+    :param width: The width of the variant
+    :type width: int
+    :returns: The path, with the width added before the extension
+    :rtype: str
+    """
+    root, extension = os.path.splitext(filepath)
+    return f"{root}-{width}w{extension}"
+
+
+def write_variants(source_file, key, cache_dir_path, widths):
+    """Resizes and recompresses an image with Pillow, writing a variant into the
+    cache for each of the widths smaller than the image itself
+
+    :param source_file: The path to the image
+    :type source_file: str
+    :param key: The key the image is cached under
+    :type key: str
+    :param cache_dir_path: The directory to cache the variants in
+    :type cache_dir_path: str
+    :param widths: The widths of the variants to generate
+    :type widths: tuple
+    :returns: The widths of the variants written
+    :rtype: list
+    """
+    extension = os.path.splitext(source_file)[1].lower()
+    image_format = VARIANT_FORMATS[extension]
+    options = {"optimize": True}
+    if image_format in ("JPEG", "WEBP"):
+        options["quality"] = JPEG_QUALITY
+    written = []
+    with Image.open(source_file) as image:
+        for width in sorted(widths):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            variant = image.resize((width, height), Image.LANCZOS)
+            if image_format == "JPEG" and variant.mode not in ("L", "RGB"):
+                variant = variant.convert("RGB")
+            output = cache_path(cache_dir_path, key, f"-{width}{extension}")
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with atomic_write(output, "wb") as variant_file:
+                variant.save(variant_file, format=image_format, **options)
+            written.append(width)
+    return written
+
+
+def process_image(job):
+    """Reads the dimensions of an image and generates its resized variants into
+    the cache. This function is the unit of work handed to the process pool.
+
+    Variants are only generated when Pillow is installed, for the widths
+    smaller than the image itself.
+
+    :param job: A tuple of (source_file, key, cache_dir_path, widths)
+    :type job: tuple
+    :returns: A tuple of (key, record), where the record holds the width and
+        height of the image, or None for both if they could not be read, and the
+        widths of the variants generated. The record is only cached when the
+        variants were generated without errors.
+    :rtype: tuple
+    """
+    source_file, key, cache_dir_path, widths = job
+    record = {"width": None, "height": None, "variants": []}
+    dimensions = read_image_dimensions(source_file)
+    if dimensions is not None:
+        record["width"], record["height"] = dimensions
+
+    extension = os.path.splitext(source_file)[1].lower()
+    if Image is not None and extension in VARIANT_FORMATS and dimensions is not None:
+        try:
+            record["variants"] = write_variants(
+                source_file, key, cache_dir_path, widths
+            )
+        except (OSError, ValueError) as exception:
+            # the image is still given its dimensions, just not a srcset, and
+            # the record is not cached so the next build tries again
+            print(f"error: {source_file}: {type(exception).__name__}: {exception}")
+            return key, record
+
+    output = cache_path(cache_dir_path, key, ".json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with atomic_write(output) as record_file:
+        json.dump(record, record_file)
+    return key, record
+
+
+def read_cached_record(cache_dir_path, key, extension):
+    """Reads the cached record of an image, provided every variant it lists is
+    still in the cache.
+
+    :param cache_dir_path: The path to the image cache directory
+    :type cache_dir_path: str
+    :param key: The cache key of the image
+    :type key: str
+    :param extension: The lowercased extension of the image, which its cached
+        variants share
+    :type extension: str
+    :returns: The record, or None if it is missing, unreadable or any of its
+        variants has been removed, in which case the image has to be processed
+        again
+    :rtype: dict or None
+    """
+    try:
+        with open(cache_path(cache_dir_path, key, ".json"), "r") as record_file:
+            record = json.load(record_file)
+    except (OSError, ValueError):
+        return None
+    for width in record["variants"]:
+        if not os.path.exists(cache_path(cache_dir_path, key, f"-{width}{extension}")):
+            return None
+    return record
+
+
+def process_images(
+    static_dir_path,
+    dest_dir_path,
+    cache_dir_path,
+    index_path,
+    manifest=None,
+    widths=VARIANT_WIDTHS,
+    jobs=1,
+):
+    """Reads the dimensions of every image in the static directory, generates
+    resized variants of them alongside the copies in the destination directory,
+    and writes the image index used to give image tags a width, height and
+    srcset.
+
+    Dimensions and variants are cached by a hash of each image's content, so an
+    image is only processed once however often it is renamed or the site is
+    rebuilt. Images that are not cached are processed on a pool of worker
+    processes. When a manifest is provided, the content hashes recorded by
+    copy_static_files are reused rather than hashing the images again, and
+    variants that are already in place are not copied again.
+
+    :param static_dir_path: The directory containing the static files
+    :type static_dir_path: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param cache_dir_path: The directory to cache dimensions and variants in
+    :type cache_dir_path: str
+    :param index_path: The path to write the image index to
+    :type index_path: str
+    :param manifest: The manifest of the current build
+    :type manifest: BuildManifest
+    :param widths: The widths of the variants to generate
+    :type widths: tuple
+    :param jobs: The number of worker processes to use
+    :type jobs: int
+    :returns: The image index, mapping the url of each image to its width,
+        height and variants
+    :rtype: dict
+    """
+    images = []
+    pending = {}
+    records = {}
+    for source_file, destination_file in collect_static_files(
+        static_dir_path, dest_dir_path
+    ):
+        if not source_file.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        entry = None
+        if manifest is not None:
+            entry = manifest.current["static"].get(source_file)
+        content_hash = entry["hash"] if entry else hash_file(source_file)
+        key = image_cache_key(content_hash, widths)
+        images.append((source_file, destination_file, key))
+        if key not in records and key not in pending:
+            extension = os.path.splitext(source_file)[1].lower()
+            record = read_cached_record(cache_dir_path, key, extension)
+            if record is None:
+                pending[key] = (source_file, key, cache_dir_path, widths)
+            else:
+                records[key] = record
+
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            records.update(executor.map(process_image, pending.values()))
+    else:
+        records.update(map(process_image, pending.values()))
+
+    index = {}
+    copied = 0
+    for source_file, destination_file, key in images:
+        record = records[key]
+        if record["width"] is None:
+            continue
+        url = "/" + os.path.relpath(destination_file, dest_dir_path).replace(
+            os.sep, "/"
+        )
+        variants = []
+        extension = os.path.splitext(source_file)[1].lower()
+        for width in record["variants"]:
+            output = variant_path(destination_file, width)
+            variants.append([variant_path(url, width), width])
+            entry = {"hash": key, "width": width, "output": output}
+            if manifest is None or not manifest.is_current("images", output, entry):
+                # cached variants are only ever replaced, never written through,
+                # so they can be linked into place
+                variant = cache_path(cache_dir_path, key, f"-{width}{extension}")
+                copy_file(variant, output, link=True)
+                copied += 1
+            if manifest is not None:
+                manifest.record("images", output, entry)
+        index[url] = {
+            "width": record["width"],
+            "height": record["height"],
+            "variants": variants,
+        }
+
+    with atomic_write(index_path) as index_file:
+        json.dump(index, index_file, sort_keys=True)
+    print(
+        f"images: {len(images)} images, {len(pending)} processed, "
+        f"{copied} variants written"
+    )
+    return index
@@ -0,0 +1,176 @@
+import os
+from urllib.parse import unquote, urljoin, urlsplit
+
+
+def resolve_link(page_url, target):
+    """Resolves the target of a link or image against the url of the page it
+    appears on
+
+    :param page_url: The site relative url of the page
+    :type page_url: str
+    :param target: The href or src of the link or image
+    :type target: str
+    :returns: The site relative path of the target, without its query or
+        fragment, or None if it points off the site or only to a fragment of
+        the page itself
+    :rtype: str
+    """
+    parts = urlsplit(target.strip())
+    if parts.scheme or parts.netloc or not parts.path:
+        # external links, mailto: and the like, and links to a fragment of the
+        # page itself are not checked
+        return None
+    return unquote(urljoin(page_url, parts.path))
+
+
+def target_outputs(path):
+    """Returns the output files, relative to the site directory, that a site
+    relative path can be served from
+
+    :param path: A site relative path, as returned by resolve_link
+    :type path: str
+    :returns: The candidate output files, in posix form
+    :rtype: tuple
+    """
+    relative_path = path.lstrip("/")
+    if relative_path == "" or relative_path.endswith("/"):
+        return (f"{relative_path}index.html",)
+    return (relative_path, f"{relative_path}/index.html")
+
+
+def html_node_links(node):
+    """Returns the targets of the links and images in a tree of HTMLNodes, for
+    pages that are generated from nodes rather than markdown
+
+    :param node: The root of the tree
+    :type node: HTMLNode
+    :returns: Tuples of (kind, url), where kind is "link" or "image"
+    :rtype: list
+    """
+    links = []
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        props = node.props or {}
+        if node.tag == "a" and "href" in props:
+            links.append(("link", props["href"]))
+        elif node.tag == "img" and "src" in props:
+            links.append(("image", props["src"]))
+        if node.children:
+            pending.extend(reversed(node.children))
+    return links
+
+
+class LinkGraph:
+    """Records the internal links and images of every page as it is generated,
+    and checks them against the outputs of the build once it has finished, so
+    the generated html never needs to be read back.
+
+    Targets are resolved when they are added, and checked against a set of the
+    build's outputs, so a check takes time in proportion to the number of links.
+    """
+
+    def __init__(self):
+        self.pages = set()
+        self.links = []
+        self.link_count = 0
+
+    def add_links(self, page_url, links):
+        """Adds the links and images of a generated page that should not itself
+        be reported as an orphan, such as a listing
+
+        :param page_url: The site relative url of the page
+        :type page_url: str
+        :param links: Tuples of (kind, url), where kind is "link" or "image"
+        :type links: Iterable[tuple]
+        :returns: Nothing
+        :rtype: None
+        """
+        for kind, target in links:
+            self.link_count += 1
+            path = resolve_link(page_url, target)
+            if path is not None:
+                self.links.append((page_url, kind, path))
+
+    def add_page(self, page_url, links):
+        """Adds a content page and its links and images
+
+        :param page_url: The site relative url of the page
+        :type page_url: str
+        :param links: Tuples of (kind, url), where kind is "link" or "image"
+        :type links: Iterable[tuple]
+        :returns: Nothing
+        :rtype: None
+        """
+        self.pages.add(page_url)
+        self.add_links(page_url, links)
+
+    def check(self, outputs, dest_dir_path):
+        """Checks every link and image against the outputs of the build
+
+        :param outputs: The filepaths of every file in the generated site,
+            including the copied static files
+        :type outputs: Iterable[str]
+        :param dest_dir_path: The directory the site is written to
+        :type dest_dir_path: str
+        :returns: A dict of "broken_links" and "missing_images" to lists of
+            tuples of (page_url, target), and "orphan_pages" to a list of the urls
+            of content pages that no other page links to
+        :rtype: dict
+        """
+        files = {
+            os.path.relpath(output, dest_dir_path).replace(os.sep, "/")
+            for output in outputs
+        }
+        broken_links = set()
+        missing_images = set()
+        linked = set()
+        for page_url, kind, path in self.links:
+            output = next(
+                (output for output in target_outputs(path) if output in files), None
+            )
+            if output is None:
+                if kind == "image":
+                    missing_images.add((page_url, path))
+                else:
+                    broken_links.add((page_url, path))
+                continue
+            url = f"/{output}"
+            if output == "index.html" or output.endswith("/index.html"):
+                url = url.removesuffix("index.html")
+            if url != page_url:
+                linked.add(url)
+        orphan_pages = sorted(self.pages - linked - {"/"})
+        return {
+            "broken_links": sorted(broken_links),
+            "missing_images": sorted(missing_images),
+            "orphan_pages": orphan_pages,
+        }
+
+    def report(self, outputs, dest_dir_path):
+        """Checks every link and image, printing a summary and each problem found
+
+        :param outputs: The filepaths of every file in the generated site
+        :type outputs: Iterable[str]
+        :param dest_dir_path: The directory the site is written to
+        :type dest_dir_path: str
+        :returns: The problems found, as returned by check
+        :rtype: dict
+        """
+        problems = self.check(outputs, dest_dir_path)
+        print(
+            f"link check: {self.link_count} links on {len(self.pages)} pages, "
+            f"{len(problems['broken_links'])} broken links, "
+            f"{len(problems['missing_images'])} missing images, "
+            f"{len(problems['orphan_pages'])} orphan pages"
+        )
+        for page_url, path in problems["broken_links"]:
+            print(f"broken link: {page_url} -> {path}")
+        for page_url, path in problems["missing_images"]:
+            print(f"missing image: {page_url} -> {path}")
+        for page_url in problems["orphan_pages"]:
+            print(f"orphan page: {page_url}")
+        return problems
+
+    def __repr__(self):
+        return f"LinkGraph(pages: {len(self.pages)}, links: {len(self.links)})"
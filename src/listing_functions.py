@@ -0,0 +1,525 @@
+import hashlib
+import os
+import re
+from src.link_checker import html_node_links
+from src.nodes_htmlnode import LeafNode, ParentNode
+from src.site_generation_functions import write_destination
+from src.site_index import page_tags
+from src.template_functions import load_template, render_template
+
+LISTING_SORTS = ("date", "title")
+
+# the directory, relative to the site, that tag listings are written beneath
+TAGS_DIRECTORY = "tags"
+
+TAG_SLUG_PATTERN = re.compile(r"[^\w]+")
+
+
+def section_title(directory):
+    """Turns the name of a content directory into a title for its listing
+
+    :param directory: The directory, relative to the content directory
+    :type directory: str
+    :returns: The title of the section
+    :rtype: str
+    """
+    if directory == ".":
+        return "Home"
+    name = os.path.basename(directory).replace("-", " ").replace("_", " ")
+    return name[:1].upper() + name[1:]
+
+
+def collect_sections(
+    site_index, content_dir_path, include_drafts=False, directories=None
+):
+    """Groups the pages in a site index by the content directory they are in,
+    going through the index one directory at a time. Every directory containing
+    a page, directly or in a subdirectory, becomes a section.
+
+    Each section is a dict containing:
+      * pages - the index entries of the pages directly in the directory, other
+        than its index page
+      * index - the index entry of the directory's own index.md, or None
+      * subsections - the directories of its immediate subsections
+
+    :param site_index: The index holding the metadata of every page
+    :type site_index: SiteIndex
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :param include_drafts: Whether to include pages marked as drafts
+    :type include_drafts: bool
+    :param directories: The sections whose pages are needed, relative to the
+        content directory, or None for every section. The other sections are
+        still found, with their index page, but their pages are left out.
+    :type directories: set
+    :returns: A dict of directory, relative to the content directory, to section
+    :rtype: dict
+    """
+
+    def section_for(directory):
+        if directory not in sections:
+            sections[directory] = {"pages": [], "index": None, "subsections": set()}
+        return sections[directory]
+
+    def is_listed(source_filepath):
+        return include_drafts or not site_index.is_draft(source_filepath)
+
+    sections = {}
+    for parent, source_filepaths in site_index.pages_by_directory().items():
+        directory = os.path.relpath(parent, content_dir_path)
+        if directories is None or directory in directories:
+            listed = [source for source in source_filepaths if is_listed(source)]
+            if not listed:
+                continue
+            section = section_for(directory)
+            for source_filepath in listed:
+                entry = site_index.pages[source_filepath]
+                if os.path.basename(source_filepath) == "index.md":
+                    section["index"] = entry
+                else:
+                    section["pages"].append(entry)
+        else:
+            index = os.path.join(parent, "index.md")
+            if index in source_filepaths and is_listed(index):
+                section_for(directory)["index"] = site_index.pages[index]
+            elif any(is_listed(source) for source in source_filepaths):
+                section_for(directory)
+            else:
+                continue
+
+        # register the directory with each of its ancestors, stopping at the
+        # first one that already knows about it
+        while directory != ".":
+            parent = os.path.dirname(directory) or "."
+            subsections = section_for(parent)["subsections"]
+            if directory in subsections:
+                break
+            subsections.add(directory)
+            directory = parent
+    return sections
+
+
+def tag_slug(tag):
+    """Turns a tag into the name of the directory its listing is written to
+
+    :param tag: The tag
+    :type tag: str
+    :returns: The tag in lower case, with each run of characters that are not
+        letters, digits or underscores replaced by a hyphen
+    :rtype: str
+    """
+    return TAG_SLUG_PATTERN.sub("-", tag.lower()).strip("-") or "-"
+
+
+def collect_tags(site_index, include_drafts=False):
+    """Groups the pages in a site index by tag, for the tag listings. Tags that
+    turn into the same slug, such as "Python" and "python", share a listing,
+    named after the first of them.
+
+    :param site_index: The index holding the metadata of every page
+    :type site_index: SiteIndex
+    :param include_drafts: Whether to include pages marked as drafts
+    :type include_drafts: bool
+    :returns: A dict of the directory of each tag's listing, relative to the
+        site, to a tuple of (tag, index entries of its pages), sorted by
+        directory
+    :rtype: dict
+    """
+    tags = {}
+    for tag, source_filepaths in site_index.tags(include_drafts).items():
+        directory = os.path.join(TAGS_DIRECTORY, tag_slug(tag))
+        _, pages = tags.setdefault(directory, (tag, []))
+        pages.extend(site_index.pages[source] for source in source_filepaths)
+    return dict(sorted(tags.items()))
+
+
+def affected_listings(pages, content_dir_path):
+    """Returns the listings that may change when pages are created, modified or
+    removed: the listing of the section each page is in, and those of the
+    sections above it, whose subsections may change with it, along with the
+    listing of every tag the page has or had and the index of tags
+
+    :param pages: Tuples of (source_filepath, entry) for each page, both before
+        and after the change, with None as the entry of a page not in the index
+    :type pages: Iterable[tuple]
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :returns: The directories of the listings, relative to the site
+    :rtype: set
+    """
+    directories = set()
+    for source_filepath, entry in pages:
+        directory = os.path.relpath(os.path.dirname(source_filepath), content_dir_path)
+        while directory not in directories:
+            directories.add(directory)
+            if directory == ".":
+                break
+            directory = os.path.dirname(directory) or "."
+        if entry is not None:
+            for tag in page_tags(entry["metadata"]):
+                directories.add(os.path.join(TAGS_DIRECTORY, tag_slug(tag)))
+                directories.add(TAGS_DIRECTORY)
+    return directories
+
+
+def listing_directory(output, dest_dir_path):
+    """Reverses listing_output, returning the directory of the listing a listing
+    page belongs to
+
+    :param output: The filepath of the listing page
+    :type output: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :returns: The directory of the listing, relative to the site
+    :rtype: str
+    """
+    # listing outputs are joined onto the destination directory, so it is cut
+    # off rather than made relative, which is slow over every listing page
+    directory = os.path.dirname(output[len(os.path.join(dest_dir_path, "")) :])
+    parts = directory.split(os.sep) if directory else []
+    if len(parts) >= 2 and parts[-2] == "page" and parts[-1].isdigit():
+        parts = parts[:-2]
+    return os.path.join(*parts) if parts else "."
+
+
+def sort_listing_pages(pages, sort):
+    """Sorts the pages of a section for its listing. Pages are sorted newest
+    first by date, with undated pages last, or alphabetically by title. Ties are
+    broken by title and then url, so listings are stable between builds.
+
+    :param pages: The index entries of the pages
+    :type pages: list
+    :param sort: How to sort the pages, "date" or "title"
+    :type sort: str
+    :returns: A new sorted list of index entries
+    :rtype: list
+    """
+    pages = sorted(
+        pages,
+        key=lambda entry: (
+            str(entry["metadata"].get("title", "")).lower(),
+            entry["url"],
+        ),
+    )
+    if sort == "date":
+        # sorting is stable, even when reversed, so pages sharing a date stay
+        # in title order
+        dated = [entry for entry in pages if "date" in entry["metadata"]]
+        undated = [entry for entry in pages if "date" not in entry["metadata"]]
+        dated.sort(key=lambda entry: str(entry["metadata"]["date"]), reverse=True)
+        pages = dated + undated
+    return pages
+
+
+def listing_url(directory, page_number):
+    """Returns the url of a page of a section's listing
+
+    :param directory: The directory of the listing, relative to the site
+    :type directory: str
+    :param page_number: The page of the listing, starting from 1
+    :type page_number: int
+    :returns: The url of the listing page
+    :rtype: str
+    """
+    url = "/" if directory == "." else f"/{directory.replace(os.sep, '/')}/"
+    if page_number > 1:
+        url = f"{url}page/{page_number}/"
+    return url
+
+
+def listing_output(dest_dir_path, directory, page_number):
+    """Returns the filepath a page of a section's listing is written to
+
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param directory: The directory of the listing, relative to the site
+    :type directory: str
+    :param page_number: The page of the listing, starting from 1
+    :type page_number: int
+    :returns: The filepath of the listing page
+    :rtype: str
+    """
+    parts = [dest_dir_path]
+    if directory != ".":
+        parts.append(directory)
+    if page_number > 1:
+        parts.extend(("page", str(page_number)))
+    return os.path.join(*parts, "index.html")
+
+
+def listing_node(title, subsections, pages, page_number, page_count, directory):
+    """Builds the content of a page of a section's listing
+
+    :param title: The title of the section
+    :type title: str
+    :param subsections: Tuples of (title, url) for each subsection
+    :type subsections: list
+    :param pages: The index entries of the pages on this page of the listing
+    :type pages: list
+    :param page_number: The page of the listing, starting from 1
+    :type page_number: int
+    :param page_count: The number of pages in the listing
+    :type page_count: int
+    :param directory: The directory of the listing, relative to the site
+    :type directory: str
+    :returns: A single ParentNode with a `div` tag
+    :rtype: ParentNode
+    """
+    nodes = [ParentNode("h1", [LeafNode(None, title)])]
+    if subsections and page_number == 1:
+        nodes.append(
+            ParentNode(
+                "ul",
+                [
+                    ParentNode("li", [LeafNode("a", name, {"href": url})])
+                    for name, url in subsections
+                ],
+                {"class": "sections"},
+            )
+        )
+
+    items = []
+    for entry in pages:
+        metadata = entry["metadata"]
+        children = [
+            LeafNode(
+                "a",
+                str(metadata.get("title", entry["url"])),
+                {"href": entry["url"]},
+            )
+        ]
+        if "date" in metadata:
+            children.append(LeafNode(None, " "))
+            children.append(
+                LeafNode("time", str(metadata["date"]), {"datetime": metadata["date"]})
+            )
+        items.append(ParentNode("li", children))
+    if items:
+        nodes.append(ParentNode("ul", items, {"class": "pages"}))
+
+    if page_count > 1:
+        links = []
+        if page_number > 1:
+            links.append(
+                LeafNode(
+                    "a",
+                    "Previous",
+                    {"href": listing_url(directory, page_number - 1), "rel": "prev"},
+                )
+            )
+        links.append(LeafNode("span", f" Page {page_number} of {page_count} "))
+        if page_number < page_count:
+            links.append(
+                LeafNode(
+                    "a",
+                    "Next",
+                    {"href": listing_url(directory, page_number + 1), "rel": "next"},
+                )
+            )
+        nodes.append(ParentNode("nav", links, {"class": "pagination"}))
+    return ParentNode("div", nodes)
+
+
+def generate_listings(
+    site_index,
+    content_dir_path,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    page_size=20,
+    sort="date",
+    include_drafts=False,
+    link_graph=None,
+    minify=False,
+    directories=None,
+):
+    """Generates a paginated listing of the pages and subsections of every
+    content directory that does not have an index.md of its own. The first page
+    of a listing is the directory's index.html, and later pages are written to
+    page/N/index.html beneath it.
+
+    Pages are also listed by the tags in their front matter, with a listing for
+    each tag beneath tags/, and an index of every tag at tags/index.html.
+
+    Listings are built from the metadata in the site index, so no page is read
+    again, and each section is sorted once. When a manifest is provided, listing
+    pages whose html has not changed are not rewritten, and listing pages that
+    are no longer produced are left for remove_orphaned_outputs.
+
+    When the directories of the listings are given, only those listings are
+    generated, and the manifest entries of the others, carried forward from the
+    previous build, are left as they are.
+
+    :param site_index: The index holding the metadata of every page
+    :type site_index: SiteIndex
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :param template_path: The path to the template file used for the listings
+    :type template_path: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param manifest: The manifest used to skip unchanged listing pages
+    :type manifest: BuildManifest
+    :param page_size: The maximum number of pages listed on each listing page
+    :type page_size: int
+    :param sort: How to sort the pages, "date" or "title"
+    :type sort: str
+    :param include_drafts: Whether to list pages marked as drafts
+    :type include_drafts: bool
+    :param link_graph: The link graph to add the links of each listing page to
+    :type link_graph: LinkGraph
+    :param minify: Whether to minify the html of the listings
+    :type minify: bool
+    :param directories: The directories of the listings to generate, relative
+        to the site, as returned by affected_listings, or None to generate every
+        listing
+    :type directories: set
+    :returns: The number of listing pages written
+    :rtype: int
+    """
+    if sort not in LISTING_SORTS:
+        raise ValueError(f"invalid listing sort: {sort}")
+    if page_size < 1:
+        raise ValueError("listing page size must be at least 1")
+
+    if directories is not None and manifest is not None:
+        # the pages of these listings that are no longer produced are left for
+        # remove_orphaned_outputs
+        for output in list(manifest.current["listings"]):
+            if listing_directory(output, dest_dir_path) in directories:
+                manifest.forget("listings", output)
+
+    template = load_template(template_path, minify)
+    sections = collect_sections(
+        site_index, content_dir_path, include_drafts, directories
+    )
+    written = 0
+    for directory in sorted(sections):
+        section = sections[directory]
+        if section["index"] is not None:
+            continue
+        if directories is not None and directory not in directories:
+            continue
+
+        subsections = []
+        for subsection in sorted(section["subsections"]):
+            index = sections[subsection]["index"]
+            if index is None:
+                subsections.append(
+                    (section_title(subsection), listing_url(subsection, 1))
+                )
+            else:
+                name = index["metadata"].get("title", section_title(subsection))
+                subsections.append((str(name), index["url"]))
+        written += write_listing(
+            template,
+            dest_dir_path,
+            directory,
+            section_title(directory),
+            subsections,
+            sort_listing_pages(section["pages"], sort),
+            page_size,
+            manifest,
+            link_graph,
+        )
+
+    tags = {}
+    if directories is None or any(
+        directory.split(os.sep)[0] == TAGS_DIRECTORY for directory in directories
+    ):
+        tags = collect_tags(site_index, include_drafts)
+    if tags and (directories is None or TAGS_DIRECTORY in directories):
+        written += write_listing(
+            template,
+            dest_dir_path,
+            TAGS_DIRECTORY,
+            "Tags",
+            [(tag, listing_url(directory, 1)) for directory, (tag, _) in tags.items()],
+            [],
+            page_size,
+            manifest,
+            link_graph,
+        )
+    for directory, (tag, pages) in tags.items():
+        if directories is not None and directory not in directories:
+            continue
+        written += write_listing(
+            template,
+            dest_dir_path,
+            directory,
+            f"Tagged {tag}",
+            [],
+            sort_listing_pages(pages, sort),
+            page_size,
+            manifest,
+            link_graph,
+        )
+    return written
+
+
+def write_listing(
+    template,
+    dest_dir_path,
+    directory,
+    title,
+    subsections,
+    pages,
+    page_size,
+    manifest=None,
+    link_graph=None,
+):
+    """Writes every page of a listing, skipping listing pages whose html has not
+    changed when a manifest is provided
+
+    :param template: The compiled template for the listing
+    :type template: list
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param directory: The directory of the listing, relative to the site
+    :type directory: str
+    :param title: The title of the listing
+    :type title: str
+    :param subsections: Tuples of (title, url) listed on the first page
+    :type subsections: list
+    :param pages: The index entries of the pages listed, already sorted
+    :type pages: list
+    :param page_size: The maximum number of pages listed on each listing page
+    :type page_size: int
+    :param manifest: The manifest used to skip unchanged listing pages
+    :type manifest: BuildManifest
+    :param link_graph: The link graph to add the links of each listing page to
+    :type link_graph: LinkGraph
+    :returns: The number of listing pages written
+    :rtype: int
+    """
+    written = 0
+    page_count = max(1, -(-len(pages) // page_size))
+    for page_number in range(1, page_count + 1):
+        start = (page_number - 1) * page_size
+        node = listing_node(
+            title,
+            subsections,
+            pages[start : start + page_size],
+            page_number,
+            page_count,
+            directory,
+        )
+        if link_graph is not None:
+            link_graph.add_links(
+                listing_url(directory, page_number), html_node_links(node)
+            )
+        html = render_template(template, {"Title": title, "Content": node.to_html()})
+        output = listing_output(dest_dir_path, directory, page_number)
+        entry = {
+            "hash": hashlib.sha256(html.encode()).hexdigest(),
+            "output": output,
+        }
+        if manifest is not None:
+            if manifest.is_current("listings", output, entry):
+                manifest.record("listings", output, entry)
+                continue
+            manifest.record("listings", output, entry)
+        print(f"generating listing: {output}")
+        write_destination(output, html)
+        written += 1
+    return written
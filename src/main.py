@@ -1,14 +1,397 @@
-from src.site_generation_functions import copy_static_files, generate_pages_recursive
+import argparse
+import cProfile
+import os
+import sys
+from src.build_manifest import BuildManifest
+from src.compression_functions import precompress_outputs
+from src.image_pipeline import process_images
+from src.listing_functions import LISTING_SORTS, generate_listings
+from src.markdown_extensions import load_extensions
+from src.profiling_functions import BuildProfiler, profile_stage, profiling
+from src.server_functions import serve_site
+from src.site_index import SiteIndex
+from src.site_outputs import SiteOutputs
+from src.site_generation_functions import (
+    build_options,
+    copy_static_files,
+    generate_pages_recursive,
+    remove_orphaned_outputs,
+)
+from src.watch_functions import watch_site
 
+MANIFEST_PATH = ".build-manifest.json"
+SITE_INDEX_PATH = ".site-index.json"
+PAGE_DATA_PATH = ".page-data.jsonl"
+IMAGE_INDEX_PATH = ".image-index.json"
 
-def main():
+
+def parse_arguments(argv=None):
+    """Parses the command line arguments for the site generator
+
+    :param argv: The arguments to parse, defaults to sys.argv
+    :type argv: list
+    :returns: The parsed arguments
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Generate the static site")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=("build", "watch", "serve"),
+        default="build",
+        help="build the site once (the default), build it and then serve it "
+        "with live reload, rebuilding whatever changes, or serve the site "
+        "already built in public without building it",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="ignore the build manifest and rebuild every page and asset",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also generate pages marked as drafts in their front matter",
+    )
+    parser.add_argument(
+        "--listing-page-size",
+        type=int,
+        default=20,
+        metavar="N",
+        help="number of pages listed on each page of a generated section listing",
+    )
+    parser.add_argument(
+        "--listing-sort",
+        choices=LISTING_SORTS,
+        default="date",
+        help="sort section listings newest first by date, or by title",
+    )
+    parser.add_argument(
+        "--base-url",
+        metavar="URL",
+        help="the url the site is served from; writes sitemap.xml and the RSS and "
+        "Atom feeds, which need absolute urls",
+    )
+    parser.add_argument(
+        "--feed-size",
+        type=int,
+        default=20,
+        metavar="N",
+        help="number of the newest dated pages included in the feeds",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write a sharded full text search index and its client to "
+        "public/search",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report broken internal links, missing images and pages no other "
+        "page links to",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="minify the html of every page and listing, and the stylesheets "
+        "from static",
+    )
+    parser.add_argument(
+        "--extension",
+        action="append",
+        default=[],
+        metavar="MODULE",
+        dest="extensions",
+        help="import a module that registers markdown block or inline rules; "
+        "may be given more than once",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write gzip (and brotli, when installed) compressed copies of every "
+        "html, css, js, json, svg, txt and xml output alongside it",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="give images their width, height and a srcset of resized variants "
+        "(resizing requires Pillow)",
+    )
+    parser.add_argument(
+        "--image-cache-dir",
+        default=".image-cache",
+        metavar="PATH",
+        help="directory to cache image dimensions and resized variants in",
+    )
+    parser.add_argument(
+        "--highlight",
+        action="store_true",
+        help="highlight the code of fenced code blocks that name their language "
+        "(requires Pygments)",
+    )
+    parser.add_argument(
+        "--highlight-cache-dir",
+        default=".highlight-cache",
+        metavar="PATH",
+        help="directory to cache highlighted code in",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="hard link static files into the output directory instead of copying "
+        "them, where the filesystem allows it",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to generate pages (0 uses every CPU)",
+    )
+    parser.add_argument(
+        "--io-concurrency",
+        type=int,
+        default=0,
+        metavar="N",
+        help="generate pages in an asynchronous pipeline that overlaps reading, "
+        "rendering and writing, with up to N pages in flight (0 streams each page "
+        "in turn)",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=4096,
+        metavar="N",
+        help="number of rendered blocks each process keeps in memory, so blocks "
+        "repeated across pages are only rendered once (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--render-cache-dir",
+        metavar="PATH",
+        help="persist rendered blocks to this directory between builds",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report the time spent in each stage of the build and the slowest pages",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="with --profile, also write a Chrome trace (for a .json path) or a "
+        "cProfile dump of the main process (for any other path)",
+    )
+    parser.add_argument(
+        "--host", default="0.0.0.0", help="address to serve on when watching or serving"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="port to serve on when watching or serving",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.05,
+        help="seconds between checks for changed files while watching, where "
+        "inotify is not available",
+    )
+    arguments = parser.parse_args(argv)
+    if arguments.profile_output and not arguments.profile:
+        parser.error("--profile-output requires --profile")
+    if arguments.jobs < 0:
+        parser.error("--jobs must not be negative")
+    if arguments.feed_size < 0:
+        parser.error("--feed-size must not be negative")
+    if arguments.listing_page_size < 1:
+        parser.error("--listing-page-size must be at least 1")
+    if arguments.io_concurrency < 0:
+        parser.error("--io-concurrency must not be negative")
+    if arguments.render_cache_size < 0:
+        parser.error("--render-cache-size must not be negative")
+    if arguments.jobs == 0:
+        arguments.jobs = os.cpu_count() or 1
+    return arguments
+
+
+def options_from_arguments(arguments):
+    """Collects the settings of a build from the command line arguments, so the
+    build and the rebuilds made while watching share them
+
+    :param arguments: The parsed command line arguments
+    :type arguments: argparse.Namespace
+    :returns: The settings of the build, described in build_options
+    :rtype: dict
+    """
+    return build_options(
+        jobs=arguments.jobs,
+        io_concurrency=arguments.io_concurrency,
+        render_cache_size=arguments.render_cache_size,
+        render_cache_dir=arguments.render_cache_dir,
+        include_drafts=arguments.drafts,
+        image_index=IMAGE_INDEX_PATH if arguments.images else None,
+        minify=arguments.minify,
+        link_static=arguments.link_static,
+        extensions=arguments.extensions,
+        highlight=arguments.highlight_cache_dir if arguments.highlight else None,
+    )
+
+
+def build(arguments, options):
+    """Builds the static site once
+
+    :param arguments: The parsed command line arguments
+    :type arguments: argparse.Namespace
+    :param options: The settings of the build, from options_from_arguments
+    :type options: dict
+    :returns: A list of tuples for the pages that failed: (source_filepath, error)
+    :rtype: list
+    """
+    if arguments.force:
+        for path in (MANIFEST_PATH, SITE_INDEX_PATH, PAGE_DATA_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+
+    load_extensions(options["extensions"])
+
+    profiler = None
+    python_profiler = None
+    if arguments.profile:
+        trace = (arguments.profile_output or "").endswith(".json")
+        profiler = BuildProfiler(trace)
+        if arguments.profile_output and not trace:
+            python_profiler = cProfile.Profile()
+            python_profiler.enable()
+
+    with profiling(profiler):
+        manifest = BuildManifest(MANIFEST_PATH)
+        site_index = SiteIndex(SITE_INDEX_PATH)
+        with profile_stage("site_index"):
+            site_index.update("content", "public")
+        with profile_stage("copy_static_files"):
+            copy_static_files(
+                "static",
+                "public",
+                manifest,
+                link=options["link_static"],
+                minify=options["minify"],
+            )
+        if options["image_index"] is not None:
+            with profile_stage("images"):
+                process_images(
+                    "static",
+                    "public",
+                    arguments.image_cache_dir,
+                    options["image_index"],
+                    manifest,
+                    jobs=options["jobs"],
+                )
+        site_outputs = None
+        if arguments.base_url or arguments.search_index or arguments.check_links:
+            home = site_index.metadata(os.path.join("content", "index.md"))
+            site_outputs = SiteOutputs(
+                "public",
+                PAGE_DATA_PATH,
+                arguments.base_url,
+                str(home.get("title", arguments.base_url or "")),
+                arguments.search_index,
+                arguments.feed_size,
+                arguments.check_links,
+            )
+        try:
+            failures = generate_pages_recursive(
+                "content",
+                "template.html",
+                "public",
+                options=options,
+                manifest=manifest,
+                profiler=profiler,
+                site_index=site_index,
+                site_outputs=site_outputs,
+            )
+            with profile_stage("listings"):
+                generate_listings(
+                    site_index,
+                    "content",
+                    "template.html",
+                    "public",
+                    manifest,
+                    page_size=arguments.listing_page_size,
+                    sort=arguments.listing_sort,
+                    include_drafts=options["include_drafts"],
+                    link_graph=(
+                        site_outputs.link_graph if site_outputs is not None else None
+                    ),
+                    minify=options["minify"],
+                )
+            if site_outputs is not None:
+                with profile_stage("site_outputs"):
+                    site_outputs.close(manifest)
+        except BaseException:
+            # the temporary files of the outputs are removed, and the previous
+            # build's outputs left in place
+            if site_outputs is not None:
+                site_outputs.discard()
+            raise
+        if arguments.compress:
+            with profile_stage("compress"):
+                precompress_outputs(manifest, options["jobs"])
+        remove_orphaned_outputs(manifest, "public")
+        manifest.save()
+        site_index.save()
+
+    if profiler is not None:
+        print(profiler.report())
+        if python_profiler is not None:
+            python_profiler.disable()
+            python_profiler.dump_stats(arguments.profile_output)
+        elif arguments.profile_output:
+            profiler.write_chrome_trace(arguments.profile_output)
+
+    if failures:
+        print(f"{len(failures)} page(s) failed to generate:", file=sys.stderr)
+        for source_filepath, error in failures:
+            print(f"  {source_filepath}: {error}", file=sys.stderr)
+    return failures
+
+
+def main(argv=None):
     """Kicks off the generation of the static site.
 
+    :param argv: The command line arguments, defaults to sys.argv
+    :type argv: list
     :returns: Nothing
     :rtype: None
     """
-    copy_static_files("static", "public")
-    generate_pages_recursive("content", "template.html", "public")
+    arguments = parse_arguments(argv)
+    if arguments.command == "serve":
+        if not os.path.isdir("public"):
+            print("error: public does not exist, build the site first", file=sys.stderr)
+            sys.exit(1)
+        serve_site("public", arguments.host, arguments.port)
+        return
+
+    options = options_from_arguments(arguments)
+    failures = build(arguments, options)
+    if arguments.command == "watch":
+        watch_site(
+            "content",
+            "static",
+            "template.html",
+            "public",
+            arguments.host,
+            arguments.port,
+            arguments.poll_interval,
+            options=options,
+            site_index_path=SITE_INDEX_PATH,
+            manifest_path=MANIFEST_PATH,
+            listing_page_size=arguments.listing_page_size,
+            listing_sort=arguments.listing_sort,
+        )
+    elif failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,71 @@
 import re
+from src.markdown_extensions import get_parser, register_block_rule
+
+HEADING_PATTERN = re.compile(r"#{1,6}\s")
+# the rest of a line after a quote or list marker
+LINE_CONTENT = r"[^\S\n][^\n]*+"
+# nested list items are indented and may use either kind of marker
+NESTED_LIST_MARKER = r"[ \t]+(?:[-*]|\d{1,3}\.)"
+QUOTE_LINE = rf">(?:{LINE_CONTENT})?"
+UNORDERED_LIST_LINE = rf"(?:[-*]|{NESTED_LIST_MARKER}){LINE_CONTENT}"
+ORDERED_LIST_LINE = rf"(?:\d{{1,3}}\.|{NESTED_LIST_MARKER}){LINE_CONTENT}"
+# whole-block patterns, used with fullmatch so that every line is validated;
+# the possessive quantifiers stop a failed match from backtracking
+QUOTE_BLOCK_PATTERN = re.compile(rf"(?:{QUOTE_LINE}\n)*+{QUOTE_LINE}")
+UNORDERED_LIST_BLOCK_PATTERN = re.compile(
+    rf"(?:{UNORDERED_LIST_LINE}\n)*+{UNORDERED_LIST_LINE}"
+)
+ORDERED_LIST_BLOCK_PATTERN = re.compile(
+    rf"(?:{ORDERED_LIST_LINE}\n)*+{ORDERED_LIST_LINE}"
+)
+# a single list item, with its indentation, marker and content
+LIST_ITEM_PATTERN = re.compile(r"([ \t]*)([-*]|\d{1,3}\.)[^\S\n]([^\n]*)")
+# the row under a table's header: cells of hyphens, optionally aligned with
+# colons, separated by pipes
+TABLE_DELIMITER_CELL = r"[ \t]*:?-+:?[ \t]*"
+TABLE_DELIMITER_PATTERN = re.compile(
+    rf"\|?{TABLE_DELIMITER_CELL}(?:\|{TABLE_DELIMITER_CELL})*+\|?"
+)
+# the first word of a code fence's info string, naming its language
+CODE_LANGUAGE_PATTERN = re.compile(r"[\w+#.-]+")
+# pipes separate table cells unless they are escaped
+TABLE_CELL_SEPARATOR = re.compile(r"(?<!\\)\|")
+
+
+def iter_markdown_blocks(lines):
+    """Lazily reads blocks from the lines of a markdown document, such as an open
+    file, so that only one block is held in memory at a time. Blocks are
+    separated by empty lines, except inside a fenced code block, which runs
+    until its closing fence even if it contains empty lines.
+
+    :param lines: The lines of a markdown document, with or without newlines
+    :type lines: Iterable[str]
+    :returns: A generator of markdown blocks
+    :rtype: Generator[str]
+    """
+    block = []
+    in_fence = False
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line == "" and not in_fence:
+            if block:
+                block_text = "\n".join(block).strip()
+                if block_text != "":
+                    yield block_text
+                block = []
+            continue
+
+        fence = line.lstrip()
+        if fence.startswith("```"):
+            if in_fence:
+                in_fence = False
+            elif not block and "```" not in fence[3:]:
+                in_fence = True
+        block.append(line)
+
+    block_text = "\n".join(block).strip()
+    if block_text != "":
+        yield block_text
 
 
 def markdown_to_blocks(markdown):
@@ -9,32 +76,110 @@ def markdown_to_blocks(markdown):
     :returns: A list of markdown blocks
     :rtype: list
     """
-    blocks = []
-    for block in markdown.split("\n\n"):
-        block = block.strip()
-        if block != "":
-            blocks.append(block)
-    return blocks
+    return list(iter_markdown_blocks(markdown.split("\n")))
+
+
+def is_heading_block(markdown_block):
+    return HEADING_PATTERN.match(markdown_block) is not None
+
+
+def is_code_block(markdown_block):
+    return (
+        len(markdown_block) >= 6
+        and markdown_block.startswith("```")
+        and markdown_block.endswith("```")
+    )
+
+
+def is_quote_block(markdown_block):
+    return QUOTE_BLOCK_PATTERN.fullmatch(markdown_block) is not None
+
+
+def is_unordered_list_block(markdown_block):
+    return UNORDERED_LIST_BLOCK_PATTERN.fullmatch(markdown_block) is not None
+
+
+def is_ordered_list_block(markdown_block):
+    return ORDERED_LIST_BLOCK_PATTERN.fullmatch(markdown_block) is not None
+
+
+def split_code_fence(block):
+    """Splits a fenced code block into the language named in its info string
+    and its code
+
+    :param block: A markdown formatted code block
+    :type block: str
+    :returns: A tuple of (language, code), where the language is None if the
+        opening fence has no info string
+    :rtype: tuple
+    """
+    opening, newline, rest = block.partition("\n")
+    if not newline:
+        return None, block.strip("`")
+    language = CODE_LANGUAGE_PATTERN.match(opening.lstrip("`").strip())
+    return (language.group() if language else None), rest.rstrip("`")
+
+
+def split_table_row(line):
+    """Splits a row of a pipe table into its cells. The pipes at the start and
+    end of the row are optional, and a pipe escaped with a backslash is part of
+    the cell rather than a separator.
+
+    :param line: A row of a table
+    :type line: str
+    :returns: The text of each cell, stripped of surrounding whitespace
+    :rtype: list
+    """
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    return [
+        cell.strip().replace("\\|", "|") for cell in TABLE_CELL_SEPARATOR.split(line)
+    ]
+
+
+def is_table_block(markdown_block):
+    # a table is any block whose second line is a delimiter row with as many
+    # cells as the header, so only that line is checked against a pattern
+    header_end = markdown_block.find("\n")
+    if header_end == -1:
+        return False
+    delimiter_end = markdown_block.find("\n", header_end + 1)
+    if delimiter_end == -1:
+        delimiter_end = len(markdown_block)
+    delimiter = markdown_block[header_end + 1 : delimiter_end].strip()
+    if "|" not in delimiter or not TABLE_DELIMITER_PATTERN.fullmatch(delimiter):
+        return False
+    return len(split_table_row(delimiter)) == len(
+        split_table_row(markdown_block[:header_end])
+    )
+
+
+register_block_rule("heading", is_heading_block, "#")
+register_block_rule("code", is_code_block, "`")
+register_block_rule("quote", is_quote_block, ">")
+register_block_rule("unordered_list", is_unordered_list_block, "-*")
+register_block_rule("ordered_list", is_ordered_list_block, "0123456789")
+# tables need not start with a pipe, so the rule is tried for every block that
+# no other rule matches, at the cost of a search for its first line break
+register_block_rule("table", is_table_block)
 
 
 def block_to_block_type(markdown_block):
-    """Takes a markdown block and returns the block type
+    """Takes a markdown block and returns the block type. The block is
+    dispatched on its first character to the block rules registered for it, so
+    each block is only checked against the precompiled patterns of the rules
+    that could match it, each in a single linear pass. Every line of a quote or
+    list must be a quote line or list item. List items may be indented to nest
+    them.
 
     :param markdown_block: A block of markdown
     :type markdown_block: block
-    :returns: A string containing one of the following types: paragraph, heading, code, quote, unordered_list, ordered list
+    :returns: A string containing the type of the first matching block rule,
+        such as heading, code, quote, unordered_list, ordered_list or table, or
+        paragraph if no rule matches
     :rtype: str
     """
-
-    if re.search(r"^#{1,6}\s", markdown_block):
-        return "heading"
-    elif re.search(r"^`{3}([\s\S]*)`{3}$", markdown_block, re.MULTILINE):
-        return "code"
-    elif re.search(r"^(>)\s(.*)$", markdown_block, re.MULTILINE):
-        return "quote"
-    elif re.search(r"^(-|\*)\s(.*)$", markdown_block, re.MULTILINE):
-        return "unordered_list"
-    elif re.search(r"^\d{1,3}\.\s(.*)$", markdown_block, re.MULTILINE):
-        return "ordered_list"
-    else:
-        return "paragraph"
+    return get_parser().block_type(markdown_block)
@@ -1,19 +1,70 @@
-from src.markdown_block_functions import block_to_block_type, markdown_to_blocks
+from src.markdown_block_functions import (
+    LIST_ITEM_PATTERN,
+    iter_markdown_blocks,
+    split_code_fence,
+    split_table_row,
+)
+from src.highlight_functions import highlight
+from src.markdown_extensions import get_parser, register_block_renderer
 from src.markdown_inline_functions import text_to_textnodes
 from src.nodes_textnode import text_node_to_html_node
-from src.nodes_htmlnode import ParentNode
+from src.nodes_htmlnode import LeafNode, ParentNode
+from src.page_text import collect_page_links, collect_page_text
+from src.profiling_functions import profile_stage
+from src.render_cache import render_block
 
 
 def text_to_children(text):
     """Takes a markdown formatted string, splits it into nodes based on markdown
-    formatting, and returns those nodes
+    formatting, and returns those nodes. The plain text of the nodes, and the
+    targets of their links and images, are added to the page text and links
+    being collected, if any.
 
     :param text: A string of markdown formatted text
     :type text: str
     :returns: A list of LeafNodes
     :rtype: list(LeafNode)
     """
-    return list(map(text_node_to_html_node, text_to_textnodes(text)))
+    with profile_stage("inline_parse"):
+        text_nodes = text_to_textnodes(text)
+    collect_page_text("".join(node.text for node in text_nodes))
+    collect_page_links(
+        (node.text_type.value, node.url) for node in text_nodes if node.url is not None
+    )
+    return list(map(text_node_to_html_node, text_nodes))
+
+
+def parse_list_items(block):
+    """Takes a markdown list block and transforms its items into nodes, nesting
+    indented items in a list inside the item before them. The block is read
+    line by line with a stack of the lists currently open, so it is parsed in
+    linear time however deeply it nests. Nested lists are ordered or unordered
+    according to their own markers, and a change of marker at the same depth
+    starts a new nested list.
+
+    :param block: A string of markdown formatted text
+    :type block: str
+    :returns: A list of ParentNodes with `li` tags, for the items of the
+        outermost list
+    :rtype: list(ParentNode)
+    """
+    items = []
+    # each open list is a list of [indent, tag, items]
+    levels = [[0, None, items]]
+    for line in block.split("\n"):
+        match = LIST_ITEM_PATTERN.match(line)
+        indent = len(match.group(1).expandtabs(4))
+        tag = "ul" if match.group(2) in ("-", "*") else "ol"
+        while len(levels) > 1 and indent < levels[-1][0]:
+            levels.pop()
+        if len(levels) > 1 and indent == levels[-1][0] and tag != levels[-1][1]:
+            levels.pop()
+        if indent > levels[-1][0] and levels[-1][2]:
+            nested_items = []
+            levels[-1][2][-1].children.append(ParentNode(tag, nested_items))
+            levels.append([indent, tag, nested_items])
+        levels[-1][2].append(ParentNode("li", text_to_children(match.group(3))))
+    return items
 
 
 def parse_ordered_list(block):
@@ -25,12 +76,7 @@ def parse_ordered_list(block):
     :returns: A list of ParentNodes with `li` tags
     :rtype: list(ParentNode)
     """
-    return list(
-        map(
-            lambda x: ParentNode("li", text_to_children(x.split(" ", maxsplit=1)[1])),
-            block.split("\n"),
-        )
-    )
+    return parse_list_items(block)
 
 
 def parse_unordered_list(block):
@@ -42,14 +88,7 @@ def parse_unordered_list(block):
     :returns: A list of ParentNodes with `li` tags
     :rtype: list(ParentNode)
     """
-    return list(
-        map(
-            lambda item: ParentNode(
-                "li", text_to_children(item.removeprefix("- ").removeprefix("* "))
-            ),
-            block.split("\n"),
-        )
-    )
+    return parse_list_items(block)
 
 
 def parse_quote(block):
@@ -68,14 +107,22 @@ def parse_quote(block):
 
 def parse_code(block):
     """Takes a markdown formatted code block, transforms it into a node, and
-    returns that node
+    returns that node. The first word of the opening fence's info string names
+    the language, which is given to the node as a `language-*` class. Code is
+    not parsed for inline markdown: it is highlighted by the active highlighter
+    if there is one, and otherwise escaped.
 
     :param block: A string of markdown formatted text
     :type block: str
     :returns: A list containing a single ParentNode with a `code` tag
     :rtype: list(ParentNode)
     """
-    return [ParentNode("code", text_to_children(block.strip("```").removeprefix("\n")))]
+    language, code = split_code_fence(block)
+    props = None if language is None else {"class": f"language-{language}"}
+    collect_page_text(code)
+    with profile_stage("highlight"):
+        html = highlight(language, code)
+    return [ParentNode("code", [LeafNode(None, html)], props)]
 
 
 def parse_headings(block):
@@ -90,33 +137,136 @@ def parse_headings(block):
     return ParentNode(f"h{block.count('#')}", text_to_children(block.lstrip("# ")))
 
 
+def table_alignment(delimiter):
+    if delimiter.startswith(":") and delimiter.endswith(":"):
+        return "center"
+    if delimiter.endswith(":"):
+        return "right"
+    if delimiter.startswith(":"):
+        return "left"
+    return None
+
+
+def parse_table_row(line, tag, alignments):
+    cells = split_table_row(line)
+    # rows are cut or padded to the number of columns in the header
+    cells = cells[: len(alignments)] + [""] * (len(alignments) - len(cells))
+    return ParentNode(
+        "tr",
+        [
+            ParentNode(
+                tag,
+                text_to_children(cell),
+                None if alignment is None else {"align": alignment},
+            )
+            for cell, alignment in zip(cells, alignments)
+        ],
+    )
+
+
+def parse_table(block):
+    """Takes a markdown pipe table, transforms it into nodes, and returns those
+    nodes. The table is read a row at a time, so it is parsed in linear time
+    however many rows it has.
+
+    :param block: A string of markdown formatted text
+    :type block: str
+    :returns: A list containing a ParentNode with a `thead` tag, followed by one
+        with a `tbody` tag if the table has any rows
+    :rtype: list(ParentNode)
+    """
+    lines = block.split("\n")
+    alignments = [table_alignment(cell) for cell in split_table_row(lines[1])]
+    nodes = [ParentNode("thead", [parse_table_row(lines[0], "th", alignments)])]
+    if len(lines) > 2:
+        nodes.append(
+            ParentNode(
+                "tbody",
+                [parse_table_row(line, "td", alignments) for line in lines[2:]],
+            )
+        )
+    return nodes
+
+
+def render_paragraph(block):
+    return ParentNode("p", text_to_children(block))
+
+
+def render_code(block):
+    return ParentNode("pre", parse_code(block))
+
+
+def render_ordered_list(block):
+    return ParentNode("ol", parse_ordered_list(block))
+
+
+def render_unordered_list(block):
+    return ParentNode("ul", parse_unordered_list(block))
+
+
+def render_quote(block):
+    return ParentNode("blockquote", parse_quote(block))
+
+
+def render_table(block):
+    return ParentNode("table", parse_table(block))
+
+
+register_block_renderer("paragraph", render_paragraph)
+register_block_renderer("heading", parse_headings)
+register_block_renderer("code", render_code)
+register_block_renderer("ordered_list", render_ordered_list)
+register_block_renderer("unordered_list", render_unordered_list)
+register_block_renderer("quote", render_quote)
+register_block_renderer("table", render_table)
+
+
+def block_to_html_node(block, block_type):
+    """Takes a markdown block and its type, and converts it into a node with the
+    renderer registered for the type
+
+    :param block: A block of markdown
+    :type block: str
+    :param block_type: The type of the block, as returned by block_to_block_type
+    :type block_type: str
+    :returns: A ParentNode for the block
+    :rtype: ParentNode
+    """
+    render = get_parser().block_renderers.get(block_type)
+    if render is None:
+        raise ValueError("invalid block type")
+    return render(block)
+
+
+def markdown_blocks_to_html_nodes(markdown_blocks):
+    """Takes markdown blocks and lazily converts each one into a node, so that a
+    document can be converted as its blocks are read. Blocks are rendered through
+    the active render cache, if there is one.
+
+    :param markdown_blocks: The blocks of a markdown document
+    :type markdown_blocks: Iterable[str]
+    :returns: A generator of nodes, one per block
+    :rtype: Generator[HTMLNode]
+    """
+    parser = get_parser()
+    for block in markdown_blocks:
+        with profile_stage("block_to_block_type"):
+            block_type = parser.block_type(block)
+        yield render_block(block, block_type, block_to_html_node)
+
+
 def markdown_to_html_node(markdown):
     """Takes a markdown document, processes it into its component nodes, wraps them
     in a ParentNode with a `div` tag
 
-    :param markdown: A markdown document
-    :type markdown: str
+    :param markdown: A markdown document, or an iterable of its lines such as an
+        open file
+    :type markdown: str | Iterable[str]
     :returns: A single ParentNode with a `div` tag
     :rtype: ParentNode
     """
-    markdown_blocks = markdown_to_blocks(markdown)
-
-    nodes = []
-    for block in markdown_blocks:
-        match block_to_block_type(block):
-            case "heading":
-                nodes.append(parse_headings(block))
-            case "paragraph":
-                nodes.append(ParentNode("p", text_to_children(block)))
-            case "code":
-                nodes.append(ParentNode("pre", parse_code(block)))
-            case "ordered_list":
-                nodes.append(ParentNode("ol", parse_ordered_list(block)))
-            case "unordered_list":
-                nodes.append(ParentNode("ul", parse_unordered_list(block)))
-            case "quote":
-                nodes.append(ParentNode("blockquote", parse_quote(block)))
-            case _:
-                raise ValueError("invalid block type")
-
-    return ParentNode("div", nodes)
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    with profile_stage("markdown_to_blocks"):
+        markdown_blocks = list(iter_markdown_blocks(markdown))
+    return ParentNode("div", list(markdown_blocks_to_html_nodes(markdown_blocks)))
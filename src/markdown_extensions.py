@@ -0,0 +1,338 @@
+import hashlib
+import importlib
+import re
+from contextlib import contextmanager
+
+# the type of blocks that no block rule matches
+DEFAULT_BLOCK_TYPE = "paragraph"
+
+
+def function_name(function):
+    return f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}"
+
+
+class BlockRule:
+    """Recognises one type of block. Rules are tried in order of priority, with
+    the highest first, and only against blocks starting with one of their
+    trigger characters, so a rule costs nothing for blocks it cannot match."""
+
+    __slots__ = ("name", "match", "triggers", "priority", "order")
+
+    def __init__(self, name, match, triggers=None, priority=0, order=0):
+        self.name = name
+        self.match = match
+        self.triggers = triggers
+        self.priority = priority
+        self.order = order
+
+    def __repr__(self):
+        return f"BlockRule({self.name}, {self.triggers!r}, {self.priority})"
+
+
+class InlineRule:
+    """Parses one piece of inline syntax, starting at a literal marker"""
+
+    __slots__ = ("marker", "parse", "priority", "order")
+
+    def __init__(self, marker, parse, priority=0, order=0):
+        self.marker = marker
+        self.parse = parse
+        self.priority = priority
+        self.order = order
+
+    def __repr__(self):
+        return f"InlineRule({self.marker!r}, {self.priority})"
+
+
+class ExtensionTextType:
+    """A type of inline node added by an extension, alongside the built in
+    TextTypes. Like a TextType, its value names it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f"ExtensionTextType({self.value})"
+
+
+class MarkdownParser:
+    """The dispatch tables compiled from a ParserRegistry.
+
+    Block rules are grouped by the first characters that trigger them, so each
+    block is only checked against the rules for its first character. The
+    markers of every inline rule are compiled into a single pattern, so inline
+    text is scanned once however many rules there are.
+
+    The digest identifies the rules compiled, so that html rendered with one
+    set of rules is not reused with another.
+    """
+
+    def __init__(self, block_rules, block_renderers, inline_rules, text_renderers):
+        ordered = sorted(block_rules, key=lambda rule: (-rule.priority, rule.order))
+        # rules without triggers are tried for every block, in priority order
+        # with the rules for the block's first character
+        self.block_fallback = tuple(
+            (rule.name, rule.match) for rule in ordered if rule.triggers is None
+        )
+        triggers = {
+            trigger
+            for rule in ordered
+            if rule.triggers is not None
+            for trigger in rule.triggers
+        }
+        self.block_dispatch = {
+            trigger: tuple(
+                (rule.name, rule.match)
+                for rule in ordered
+                if rule.triggers is None or trigger in rule.triggers
+            )
+            for trigger in triggers
+        }
+        self.block_renderers = dict(block_renderers)
+
+        ordered_inline = sorted(
+            inline_rules,
+            key=lambda rule: (-rule.priority, -len(rule.marker), rule.order),
+        )
+        self.inline_handlers = {rule.marker: rule.parse for rule in ordered_inline}
+        # alternatives are tried in order, so longer markers, such as ** before
+        # *, are matched first unless a rule is given a higher priority
+        self.inline_pattern = re.compile(
+            "|".join(re.escape(rule.marker) for rule in ordered_inline) or r"(?!)"
+        )
+        self.text_renderers = dict(text_renderers)
+
+        description = [
+            f"block {rule.name} {rule.triggers} {rule.priority} {function_name(rule.match)}"
+            for rule in ordered
+        ]
+        description.extend(
+            f"render {name} {function_name(render)}"
+            for name, render in sorted(block_renderers.items())
+        )
+        description.extend(
+            f"inline {rule.marker} {rule.priority} {function_name(rule.parse)}"
+            for rule in ordered_inline
+        )
+        description.extend(
+            f"text {text_type.value} {function_name(render)}"
+            for text_type, render in text_renderers.items()
+        )
+        self.digest = hashlib.sha256("\n".join(description).encode()).hexdigest()
+
+    def block_type(self, block):
+        """Returns the type of a block: the name of the first rule, in priority
+        order, that matches it, or the default block type if none does
+
+        :param block: A block of markdown
+        :type block: str
+        :returns: The type of the block
+        :rtype: str
+        """
+        for name, match in self.block_dispatch.get(block[:1], self.block_fallback):
+            if match(block):
+                return name
+        return DEFAULT_BLOCK_TYPE
+
+    def __repr__(self):
+        return (
+            f"MarkdownParser(block rules: {len(self.block_renderers)}, "
+            f"inline rules: {len(self.inline_handlers)})"
+        )
+
+
+class ParserRegistry:
+    """Holds the block and inline rules the markdown parser is built from.
+
+    Rules are registered by name or marker, so registering a rule again
+    replaces it, which lets an extension override a built in rule. The rules
+    are compiled into a MarkdownParser the first time it is needed, and again
+    only after a rule changes.
+    """
+
+    def __init__(self):
+        self.block_rules = {}
+        self.block_renderers = {}
+        self.inline_rules = {}
+        self.text_renderers = {}
+        self.order = 0
+        self.compiled = None
+
+    def next_order(self):
+        self.compiled = None
+        self.order += 1
+        return self.order
+
+    def register_block_rule(self, name, match, triggers=None, priority=0):
+        """Registers a rule that recognises a type of block
+
+        :param name: The type of block the rule recognises
+        :type name: str
+        :param match: Returns True if a block is of this type
+        :type match: Callable[[str], bool]
+        :param triggers: The characters a block of this type can start with,
+            or None if it may start with any character. Rules with triggers are
+            only tried against blocks starting with one of them.
+        :type triggers: str
+        :param priority: Rules with a higher priority are tried first, and rules
+            with the same priority in the order they were registered
+        :type priority: int
+        :returns: Nothing
+        :rtype: None
+        """
+        self.block_rules[name] = BlockRule(
+            name, match, triggers, priority, self.next_order()
+        )
+
+    def register_block_renderer(self, name, render):
+        """Registers the function that converts a type of block into a node
+
+        :param name: The type of block
+        :type name: str
+        :param render: Converts a block of this type into an HTMLNode
+        :type render: Callable[[str], HTMLNode]
+        :returns: Nothing
+        :rtype: None
+        """
+        self.next_order()
+        self.block_renderers[name] = render
+
+    def register_inline_rule(self, marker, parse, priority=0):
+        """Registers a rule that parses a piece of inline syntax
+
+        :param marker: The literal text the syntax starts with
+        :type marker: str
+        :param parse: Takes the text being parsed and the match of the marker,
+            and returns a tuple of (node, end), where the node is a TextNode, or
+            None if the syntax produces nothing, and end is the index after the
+            syntax. Returns None if the syntax is incomplete, leaving the marker
+            as plain text.
+        :type parse: Callable[[str, re.Match], tuple]
+        :param priority: Markers with a higher priority are matched first;
+            otherwise longer markers are matched before shorter ones
+        :type priority: int
+        :returns: Nothing
+        :rtype: None
+        """
+        self.inline_rules[marker] = InlineRule(
+            marker, parse, priority, self.next_order()
+        )
+
+    def register_text_type(self, value, render):
+        """Registers a type of inline node produced by an inline rule
+
+        :param value: The name of the type
+        :type value: str
+        :param render: Converts a TextNode of this type into a LeafNode
+        :type render: Callable[[TextNode], LeafNode]
+        :returns: The type, to give the TextNodes the rule produces
+        :rtype: ExtensionTextType
+        """
+        self.next_order()
+        text_type = ExtensionTextType(value)
+        self.text_renderers[text_type] = render
+        return text_type
+
+    def parser(self):
+        """Returns the parser compiled from the registered rules
+
+        :returns: The parser
+        :rtype: MarkdownParser
+        """
+        if self.compiled is None:
+            self.compiled = MarkdownParser(
+                self.block_rules.values(),
+                self.block_renderers,
+                self.inline_rules.values(),
+                self.text_renderers,
+            )
+        return self.compiled
+
+    def copy(self):
+        """Returns a registry holding the same rules, which can be changed
+        without changing this one"""
+        registry = ParserRegistry()
+        registry.block_rules = dict(self.block_rules)
+        registry.block_renderers = dict(self.block_renderers)
+        registry.inline_rules = dict(self.inline_rules)
+        registry.text_renderers = dict(self.text_renderers)
+        registry.order = self.order
+        return registry
+
+    def __repr__(self):
+        return (
+            f"ParserRegistry(block rules: {len(self.block_rules)}, "
+            f"inline rules: {len(self.inline_rules)})"
+        )
+
+
+# the registry that the built in rules and extensions register with
+default_registry = ParserRegistry()
+
+# the registry that markdown is parsed with in this process
+active_registry = default_registry
+
+
+def register_block_rule(name, match, triggers=None, priority=0):
+    """Registers a block rule with the default registry, as described in
+    ParserRegistry.register_block_rule"""
+    default_registry.register_block_rule(name, match, triggers, priority)
+
+
+def register_block_renderer(name, render):
+    """Registers a block renderer with the default registry, as described in
+    ParserRegistry.register_block_renderer"""
+    default_registry.register_block_renderer(name, render)
+
+
+def register_inline_rule(marker, parse, priority=0):
+    """Registers an inline rule with the default registry, as described in
+    ParserRegistry.register_inline_rule"""
+    default_registry.register_inline_rule(marker, parse, priority)
+
+
+def register_text_type(value, render):
+    """Registers a type of inline node with the default registry, as described
+    in ParserRegistry.register_text_type"""
+    return default_registry.register_text_type(value, render)
+
+
+def get_parser():
+    """Returns the parser compiled from the active registry
+
+    :returns: The parser
+    :rtype: MarkdownParser
+    """
+    return active_registry.parser()
+
+
+def load_extensions(modules):
+    """Imports the modules that register extensions. A module is only imported
+    once per process, so this is cheap to call for every page.
+
+    :param modules: The names of the modules
+    :type modules: Iterable[str]
+    :returns: Nothing
+    :rtype: None
+    """
+    for module in modules:
+        importlib.import_module(module)
+
+
+@contextmanager
+def using_parser_registry(registry):
+    """Makes a registry the one markdown is parsed with in this process for the
+    body of a with statement
+
+    :param registry: The registry to parse with
+    :type registry: ParserRegistry
+    """
+    global active_registry
+    previous = active_registry
+    active_registry = registry
+    try:
+        yield registry
+    finally:
+        active_registry = previous
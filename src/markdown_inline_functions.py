@@ -1,6 +1,11 @@
 import re
+from src.markdown_extensions import get_parser, register_inline_rule
 from src.nodes_textnode import TextType, TextNode
 
+INLINE_DELIMITERS = {"**": TextType.BOLD, "*": TextType.ITALIC, "`": TextType.CODE}
+IMAGE_PATTERN = re.compile(r"\!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     nodes_to_return = []
@@ -34,7 +39,7 @@ def extract_markdown_images(text):
     :returns: A list of tuples containing the alt text and image url: (alt, url)
     :rtype: list
     """
-    return re.findall(r"\!\[(.*?)\]\((.*?)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text):
@@ -45,7 +50,7 @@ def extract_markdown_links(text):
     :returns: A list of tuples containing the anchor text and link url: (anchor, url)
     :rtype: list
     """
-    return re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes):
@@ -84,9 +89,8 @@ def split_media_nodes(nodes_to_split, split_type):
     if split_type not in ("image", "link"):
         raise ValueError(f"Invalid split_type: {split_type}")
 
-    split_type_char = {"image": "!", "link": ""}
-    parser = {"image": extract_markdown_images, "link": extract_markdown_links}
-    text_type = {"image": TextType.IMAGE, "link": TextType.LINK}
+    pattern = {"image": IMAGE_PATTERN, "link": LINK_PATTERN}[split_type]
+    text_type = {"image": TextType.IMAGE, "link": TextType.LINK}[split_type]
 
     nodes_to_return = []
     for node in nodes_to_split:
@@ -94,41 +98,124 @@ def split_media_nodes(nodes_to_split, split_type):
             nodes_to_return.append(node)
             continue
 
-        media_urls = parser[split_type](node.text)
-        if len(media_urls) == 0:
-            nodes_to_return.append(node)
-            continue
+        text_start = 0
+        for media in pattern.finditer(node.text):
+            if media.start() > text_start:
+                nodes_to_return.append(
+                    TextNode(node.text[text_start : media.start()], TextType.TEXT)
+                )
+            nodes_to_return.append(TextNode(media.group(1), text_type, media.group(2)))
+            text_start = media.end()
 
-        node_content = node.text
-        for a, b in media_urls:
-            splits = node_content.split(f"{split_type_char[split_type]}[{a}]({b})", 1)
-            if len(splits) != 2:
-                raise ValueError("Invalid markdown, section not closed")
+        if text_start < len(node.text):
+            nodes_to_return.append(TextNode(node.text[text_start:], TextType.TEXT))
 
-            if splits[0] != "":
-                nodes_to_return.append(TextNode(splits[0], TextType.TEXT))
-            nodes_to_return.append(TextNode(a, text_type[split_type], b))
+    return nodes_to_return
 
-            node_content = splits[1]
 
-        if node_content != "":
-            nodes_to_return.append(TextNode(node_content, TextType.TEXT))
+def parse_delimited(text, token):
+    """Parses a bold, italic or code span, running from its opening delimiter to
+    the next matching one. The content of the span is not parsed any further.
+
+    :param text: The text being parsed
+    :type text: str
+    :param token: The match of the opening delimiter
+    :type token: re.Match
+    :returns: A tuple of (node, end), where the node is None for an empty span
+    :rtype: tuple
+    :raises ValueError: If the span is not closed
+    """
+    marker = token.group()
+    content_start = token.end()
+    content_end = text.find(marker, content_start)
+    if content_end == -1:
+        raise ValueError(f"Invalid Markdown: no closing delimiter '{marker}'")
+    node = None
+    if content_end > content_start:
+        node = TextNode(text[content_start:content_end], INLINE_DELIMITERS[marker])
+    return node, content_end + len(marker)
+
+
+def parse_image(text, token):
+    """Parses an image at its opening bracket
+
+    :param text: The text being parsed
+    :type text: str
+    :param token: The match of the opening bracket
+    :type token: re.Match
+    :returns: A tuple of (node, end), or None if the bracket does not start a
+        complete image
+    :rtype: tuple
+    """
+    media = IMAGE_PATTERN.match(text, token.start())
+    if media is None:
+        return None
+    return TextNode(media.group(1), TextType.IMAGE, media.group(2)), media.end()
 
-    return nodes_to_return
+
+def parse_link(text, token):
+    """Parses a link at its opening bracket
+
+    :param text: The text being parsed
+    :type text: str
+    :param token: The match of the opening bracket
+    :type token: re.Match
+    :returns: A tuple of (node, end), or None if the bracket does not start a
+        complete link
+    :rtype: tuple
+    """
+    media = LINK_PATTERN.match(text, token.start())
+    if media is None:
+        return None
+    return TextNode(media.group(1), TextType.LINK, media.group(2)), media.end()
+
+
+for delimiter in INLINE_DELIMITERS:
+    register_inline_rule(delimiter, parse_delimited)
+register_inline_rule("![", parse_image)
+register_inline_rule("[", parse_link)
 
 
 def text_to_textnodes(text):
     """Takes a string, splits them by formatting, and returns a list of TextNodes
 
+    The string is scanned once, left to right, for the markers of every
+    registered inline rule, compiled into a single pattern. At each marker the
+    rule's parser consumes the syntax that follows it; at bold, italic and code
+    delimiters this is the span up to the matching closing delimiter, whose
+    content is not parsed any further, and images and links are matched at
+    their opening bracket. A marker that does not start complete syntax is left
+    as plain text.
+
     :param text: A text string
     :type text: str
     :returns: A list of TextNodes
     :rtype: list
     """
-    nodes_to_return = [TextNode(text, TextType.TEXT)]
-    nodes_to_return = split_nodes_delimiter(nodes_to_return, "**", TextType.BOLD)
-    nodes_to_return = split_nodes_delimiter(nodes_to_return, "*", TextType.ITALIC)
-    nodes_to_return = split_nodes_delimiter(nodes_to_return, "`", TextType.CODE)
-    nodes_to_return = split_nodes_image(nodes_to_return)
-    nodes_to_return = split_nodes_link(nodes_to_return)
+    parser = get_parser()
+    pattern = parser.inline_pattern
+    handlers = parser.inline_handlers
+    nodes_to_return = []
+    text_start = 0
+    position = 0
+    while True:
+        token = pattern.search(text, position)
+        if token is None:
+            break
+        parsed = handlers[token.group()](text, token)
+        if parsed is None:
+            position = token.end()
+            continue
+
+        node, end = parsed
+        if token.start() > text_start:
+            nodes_to_return.append(
+                TextNode(text[text_start : token.start()], TextType.TEXT)
+            )
+        if node is not None:
+            nodes_to_return.append(node)
+        position = text_start = end
+
+    if text_start < len(text):
+        nodes_to_return.append(TextNode(text[text_start:], TextType.TEXT))
     return nodes_to_return
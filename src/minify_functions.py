@@ -0,0 +1,111 @@
+import re
+
+HTML_TOKEN_PATTERN = re.compile(
+    r"(<!--.*?-->|<(pre|textarea|script|style)\b.*?</\2\s*>|<[^>]*>)",
+    re.DOTALL | re.IGNORECASE,
+)
+HTML_TAG_NAME_PATTERN = re.compile(r"<[/!]?([a-zA-Z][a-zA-Z0-9]*)")
+# html collapses runs of these characters, unlike \s, which also matches
+# non-breaking spaces
+HTML_WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+
+# tags that start a new line, so whitespace beside them is never rendered
+BLOCK_TAGS = frozenset(
+    (
+        "address article aside blockquote body br dd details div dl doctype dt "
+        "figcaption figure footer form h1 h2 h3 h4 h5 h6 head header hr html li "
+        "link main meta nav ol p pre section summary table tbody td tfoot th "
+        "thead title tr ul"
+    ).split()
+)
+
+CSS_TOKEN_PATTERN = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)|([{};,>])|([^"'/\s{};,>]+|/)""",
+    re.DOTALL,
+)
+
+
+def is_block_tag(token):
+    match = HTML_TAG_NAME_PATTERN.match(token)
+    return match is not None and match.group(1).lower() in BLOCK_TAGS
+
+
+def minify_html(html):
+    """Removes the whitespace and comments from html that do not change how it
+    is rendered. Runs of whitespace are collapsed to a single space, and removed
+    entirely beside block level tags. The content of pre, textarea, script and
+    style elements is left as it is, as are conditional comments.
+
+    :param html: The html to minify, which may be a fragment
+    :type html: str
+    :returns: The minified html
+    :rtype: str
+    """
+    tokens = HTML_TOKEN_PATTERN.split(html)
+    # split returns the text between matches at even indexes, with the whole
+    # match and the raw element's name after each one
+    parts = tokens[0::3]
+    matches = tokens[1::3]
+    output = []
+    for index, text in enumerate(parts):
+        if text:
+            text = HTML_WHITESPACE_PATTERN.sub(" ", text)
+            if index > 0 and is_block_tag(matches[index - 1]):
+                text = text.lstrip(" ")
+            if index < len(matches) and is_block_tag(matches[index]):
+                text = text.rstrip(" ")
+            if text.startswith(" ") and output and output[-1].endswith(" "):
+                # the text either side of a removed comment
+                text = text[1:]
+            output.append(text)
+        if index < len(matches):
+            token = matches[index]
+            if token.startswith("<!--") and not token.startswith("<!--[if"):
+                continue
+            output.append(token)
+    return "".join(output)
+
+
+def minify_css(css):
+    """Removes the comments and whitespace from a stylesheet that do not change
+    its meaning. Strings are left as they are, and whitespace is only removed
+    beside braces, semicolons, commas and child combinators, and after colons,
+    so expressions such as calc(1px + 2px) and selectors such as `a :hover` are
+    unaffected.
+
+    :param css: The stylesheet to minify
+    :type css: str
+    :returns: The minified stylesheet
+    :rtype: str
+    """
+    output = []
+    pending_space = False
+    for string, comment, space, punctuation, other in CSS_TOKEN_PATTERN.findall(css):
+        if comment or space:
+            pending_space = True
+            continue
+        if punctuation:
+            if punctuation == "}" and output and output[-1] == ";":
+                output.pop()
+            output.append(punctuation)
+        else:
+            if pending_space and output and output[-1][-1] not in "{};,>:":
+                output.append(" ")
+            output.append(string or other)
+        pending_space = False
+    return "".join(output)
+
+
+def minify_template(compiled_template):
+    """Minifies the literal text of a compiled template, leaving its slots in
+    place
+
+    :param compiled_template: A template compiled with compile_template
+    :type compiled_template: list
+    :returns: The compiled template, with each literal segment minified
+    :rtype: list
+    """
+    return [
+        minify_html(segment) if index % 2 == 0 else segment
+        for index, segment in enumerate(compiled_template)
+    ]
@@ -1,29 +1,55 @@
+# the depth of nested ParentNodes that to_html recurses through before
+# walking the rest of the tree iteratively
+RECURSION_DEPTH_LIMIT = 64
+
+
 class HTMLNode:
+    # nodes are created for every span of every page, so they are kept free
+    # of a per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
+    def iter_html(self):
+        """Yields the html markup of the node as a sequence of string chunks,
+        without building the whole document in memory"""
+        raise NotImplementedError("iter_html not implemented")
+
     def to_html(self):
-        raise NotImplementedError("to_html not implemented")
+        return "".join(self.iter_html())
+
+    def write_html(self, fp):
+        """Writes the html markup of the node to a file object chunk by chunk
+
+        :param fp: A file object opened for writing text
+        :type fp: io.TextIOBase
+        :returns: Nothing
+        :rtype: None
+        """
+        fp.writelines(self.iter_html())
 
     def props_to_html(self):
         if self.props is None:
             return ""
-        props = ""
-        for key in self.props:
-            props = props + f' {key}="{self.props.get(key)}"'
-        return props
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
+    def iter_html(self):
+        return (self.to_html(),)
+
     def to_html(self):
         if self.value is None:
             raise ValueError("Invalid HTML: no value")
@@ -36,23 +62,66 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def iter_html(self):
+        # the tree is walked with a stack of the children still to be written
+        # at each level, so deeply nested trees are serialized in linear time
+        # without reaching the recursion limit, and children that are produced
+        # lazily are only consumed as they are written
         if self.tag is None:
             raise ValueError("Invalid HTML: no tag")
         if self.children is None:
             raise ValueError("Invalid HTML: no children")
+        yield f"<{self.tag}{self.props_to_html()}>"
+        pending = [(iter(self.children), f"</{self.tag}>")]
+        while pending:
+            children, closing_tag = pending[-1]
+            for node in children:
+                node_type = type(node)
+                if node_type is LeafNode:
+                    yield node.to_html()
+                elif node_type is ParentNode:
+                    if node.tag is None:
+                        raise ValueError("Invalid HTML: no tag")
+                    if node.children is None:
+                        raise ValueError("Invalid HTML: no children")
+                    yield f"<{node.tag}{node.props_to_html()}>"
+                    pending.append((iter(node.children), f"</{node.tag}>"))
+                    break
+                else:
+                    yield from node.iter_html()
+            else:
+                pending.pop()
+                yield closing_tag
 
-        opening_tag = f"<{self.tag}{self.props_to_html()}>"
-        child_nodes = ""
-        closing_tag = f"</{self.tag}>"
-
-        for node in self.children:
-            child_nodes = child_nodes + node.to_html()
-
-        return opening_tag + child_nodes + closing_tag
+    def to_html(self):
+        return parent_node_to_html(self, 0)
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
+
+
+def parent_node_to_html(node, depth):
+    # typical trees are serialized recursively, which is quickest; subtrees
+    # nested deeper than the limit are walked by iter_html instead
+    if depth > RECURSION_DEPTH_LIMIT:
+        return "".join(node.iter_html())
+    if node.tag is None:
+        raise ValueError("Invalid HTML: no tag")
+    if node.children is None:
+        raise ValueError("Invalid HTML: no children")
+    child_nodes = "".join(
+        [
+            (
+                parent_node_to_html(child, depth + 1)
+                if type(child) is ParentNode
+                else child.to_html()
+            )
+            for child in node.children
+        ]
+    )
+    return f"<{node.tag}{node.props_to_html()}>{child_nodes}</{node.tag}>"
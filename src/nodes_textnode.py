@@ -1,4 +1,6 @@
 from enum import Enum
+from src.image_functions import image_props
+from src.markdown_extensions import get_parser
 from src.nodes_htmlnode import LeafNode
 
 
@@ -12,6 +14,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -29,7 +33,8 @@ class TextNode:
 
 
 def text_node_to_html_node(node):
-    """Takes a TextNode and converts it into its corresponding LeafNode
+    """Takes a TextNode and converts it into its corresponding LeafNode, with
+    the renderer registered for its type if it was added by an extension
 
     :param node: A TextNode to convert
     :type node: TextNode
@@ -48,6 +53,11 @@ def text_node_to_html_node(node):
         case TextType.LINK:
             return LeafNode("a", node.text, {"href": node.url})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": node.url, "alt": node.text})
+            return LeafNode("img", "", image_props(node.url, node.text))
         case _:
-            raise ValueError(f"no matching TextType: {node.text_type}")
+            # types added by extensions are rendered by the function registered
+            # for them
+            render = get_parser().text_renderers.get(node.text_type)
+            if render is None:
+                raise ValueError(f"no matching TextType: {node.text_type}")
+            return render(node)
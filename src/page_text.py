@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+
+# the list that the plain text of the page being rendered in this process is
+# collected into, if any
+active_page_text = None
+
+# the list that the targets of the links and images of the page being rendered
+# in this process are collected into, if any
+active_page_links = None
+
+
+def collect_page_text(text):
+    """Adds the plain text of a run of inline markdown, such as a paragraph or
+    list item, to the active page text, if there is one
+
+    :param text: The plain text, with the inline formatting removed
+    :type text: str
+    :returns: Nothing
+    :rtype: None
+    """
+    if active_page_text is not None:
+        active_page_text.append(text)
+
+
+def join_page_text(parts):
+    """Joins collected runs of text into a single line of plain text
+
+    :param parts: The runs of text collected for a page or block
+    :type parts: list
+    :returns: The text, with runs of whitespace collapsed to single spaces
+    :rtype: str
+    """
+    return " ".join(" ".join(parts).split())
+
+
+@contextmanager
+def collecting_page_text():
+    """Collects the plain text of everything rendered in this process for the
+    body of a with statement, taken from the TextNodes produced while parsing
+    inline markdown
+
+    :returns: The list that runs of text are collected into, which can be
+        joined with join_page_text
+    :rtype: list
+    """
+    global active_page_text
+    previous = active_page_text
+    active_page_text = []
+    try:
+        yield active_page_text
+    finally:
+        active_page_text = previous
+
+
+def collect_page_links(links):
+    """Adds the targets of links and images to the active page links, if there
+    are any
+
+    :param links: Tuples of (kind, url), where kind is "link" or "image"
+    :type links: Iterable[tuple]
+    :returns: Nothing
+    :rtype: None
+    """
+    if active_page_links is not None:
+        active_page_links.extend(links)
+
+
+@contextmanager
+def collecting_page_links():
+    """Collects the targets of every link and image rendered in this process for
+    the body of a with statement, taken from the TextNodes produced while
+    parsing inline markdown
+
+    :returns: The list that tuples of (kind, url) are collected into
+    :rtype: list
+    """
+    global active_page_links
+    previous = active_page_links
+    active_page_links = []
+    try:
+        yield active_page_links
+    finally:
+        active_page_links = previous
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# the profiler that stages are recorded against in this process, if any
+active_profiler = None
+
+NULL_STAGE = nullcontext()
+
+
+class BuildProfiler:
+    """Records the wall and CPU time spent in each stage of a build, and in each
+    page. Stage times are exclusive: time spent in a stage nested inside another
+    is only counted against the inner stage.
+    """
+
+    def __init__(self, trace=False):
+        self.stages = {}
+        self.pages = {}
+        self.events = [] if trace else None
+        self.stack = []
+
+    @contextmanager
+    def stage(self, name, trace=True):
+        """Times the body of a with statement as a stage of the build
+
+        :param name: The name of the stage
+        :type name: str
+        :param trace: Whether to record a trace event for this call
+        :type trace: bool
+        """
+        frame = [time.perf_counter(), time.process_time(), 0.0, 0.0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            wall = time.perf_counter() - frame[0]
+            cpu = time.process_time() - frame[1]
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall - frame[2]
+            totals[2] += cpu - frame[3]
+            if self.stack:
+                self.stack[-1][2] += wall
+                self.stack[-1][3] += cpu
+            if trace and self.events is not None:
+                self.events.append(trace_event(name, "stage", frame[0], wall))
+
+    @contextmanager
+    def page(self, source_filepath):
+        """Times the body of a with statement as the generation of a page
+
+        :param source_filepath: The filepath of the page's source markdown file
+        :type source_filepath: str
+        """
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            self.pages[source_filepath] = [wall, time.process_time() - cpu_start]
+            if self.events is not None:
+                self.events.append(
+                    trace_event(source_filepath, "page", wall_start, wall)
+                )
+
+    def to_dict(self):
+        """Returns the recorded timings as a picklable dict, so they can be sent
+        back from a worker process and merged"""
+        return {"stages": self.stages, "pages": self.pages, "events": self.events}
+
+    def merge(self, timings):
+        """Adds timings recorded by another profiler to this one
+
+        :param timings: The timings returned by BuildProfiler.to_dict
+        :type timings: dict
+        :returns: Nothing
+        :rtype: None
+        """
+        for name, (calls, wall, cpu) in timings["stages"].items():
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += calls
+            totals[1] += wall
+            totals[2] += cpu
+        self.pages.update(timings["pages"])
+        if self.events is not None and timings["events"]:
+            self.events.extend(timings["events"])
+
+    def report(self, slowest=10):
+        """Formats the slowest pages and a per-stage breakdown of the build
+
+        :param slowest: The number of pages to list
+        :type slowest: int
+        :returns: A printable report
+        :rtype: str
+        """
+        lines = [f"slowest pages ({len(self.pages)} generated):"]
+        lines.append(f"  {'wall (ms)':>10} {'cpu (ms)':>10}  page")
+        pages = sorted(self.pages.items(), key=lambda page: page[1][0], reverse=True)
+        for source_filepath, (wall, cpu) in pages[:slowest]:
+            lines.append(
+                f"  {wall * 1000:>10.2f} {cpu * 1000:>10.2f}  {source_filepath}"
+            )
+
+        total_wall = sum(wall for _, wall, _ in self.stages.values()) or 1.0
+        lines.append("stages:")
+        lines.append(
+            f"  {'stage':<22} {'calls':>8} {'wall (ms)':>10} {'cpu (ms)':>10} {'share':>6}"
+        )
+        stages = sorted(
+            self.stages.items(), key=lambda stage: stage[1][1], reverse=True
+        )
+        for name, (calls, wall, cpu) in stages:
+            lines.append(
+                f"  {name:<22} {calls:>8} {wall * 1000:>10.2f} {cpu * 1000:>10.2f} {wall / total_wall:>6.1%}"
+            )
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, filepath):
+        """Writes the recorded trace events in the Chrome trace event format,
+        which can be loaded in chrome://tracing or Perfetto
+
+        :param filepath: The path to write the trace to
+        :type filepath: str
+        :returns: Nothing
+        :rtype: None
+        """
+        with open(filepath, "w") as trace_file:
+            json.dump({"traceEvents": self.events or []}, trace_file)
+
+    def __repr__(self):
+        return f"BuildProfiler(stages: {len(self.stages)}, pages: {len(self.pages)})"
+
+
+def trace_event(name, category, start, duration):
+    """Builds a complete event in the Chrome trace event format
+
+    :param name: The name of the event
+    :type name: str
+    :param category: The category of the event
+    :type category: str
+    :param start: The perf_counter value the event started at, in seconds
+    :type start: float
+    :param duration: The duration of the event, in seconds
+    :type duration: float
+    :returns: A trace event
+    :rtype: dict
+    """
+    return {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": start * 1_000_000,
+        "dur": duration * 1_000_000,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+
+
+def profile_stage(name):
+    """Returns a context manager that times its body as a stage of the build
+    when profiling is enabled in this process, and does nothing otherwise
+
+    :param name: The name of the stage
+    :type name: str
+    :returns: A context manager
+    :rtype: contextlib.AbstractContextManager
+    """
+    if active_profiler is None:
+        return NULL_STAGE
+    return active_profiler.stage(name)
+
+
+def profile_iter(name, iterable):
+    """Wraps an iterable so the time spent producing each item is recorded as a
+    stage of the build when profiling is enabled in this process. Returns the
+    iterable unchanged otherwise.
+
+    :param name: The name of the stage
+    :type name: str
+    :param iterable: The iterable to wrap
+    :type iterable: Iterable
+    :returns: An iterable producing the same items
+    :rtype: Iterable
+    """
+    if active_profiler is None:
+        return iterable
+    return profiled_iterator(active_profiler, name, iter(iterable))
+
+
+def profiled_iterator(profiler, name, iterator):
+    while True:
+        with profiler.stage(name, trace=False):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def profiling(profiler):
+    """Makes a profiler the active profiler for this process for the body of a
+    with statement
+
+    :param profiler: The profiler to record stages against, or None
+    :type profiler: BuildProfiler
+    """
+    global active_profiler
+    previous = active_profiler
+    active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        active_profiler = previous
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.build_manifest import atomic_write
+from src.highlight_functions import active_highlight_digest
+from src.image_functions import image_index_digest
+from src.markdown_extensions import get_parser
+from src.nodes_htmlnode import LeafNode
+from src.page_text import (
+    collect_page_links,
+    collect_page_text,
+    collecting_page_links,
+    collecting_page_text,
+    join_page_text,
+)
+
+# bump whenever the html produced for a block changes, so that fragments
+# persisted by an older version are not reused
+RENDER_CACHE_VERSION = 5
+
+# the render cache that blocks are rendered through in this process, if any
+active_render_cache = None
+
+# the render cache kept by this process across pages and builds
+process_render_cache = None
+
+
+class RenderCache:
+    """A bounded, least recently used cache of the html rendered for markdown
+    blocks, keyed by a hash of the block's type and text. Blocks that repeat
+    across pages, such as footers and shared snippets, are then only parsed and
+    serialized once. The plain text and link targets of each block are cached
+    alongside its html, so the text and links collected for a page are the same
+    whether or not its blocks were cached.
+
+    When a directory is given, fragments are also persisted there by key, so
+    they survive between builds. Fragments evicted from memory are read back
+    from the directory when they are next needed.
+    """
+
+    def __init__(self, max_entries=4096, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(block, block_type):
+        """Returns the cache key for a markdown block. Every block depends on the
+        rules of the active parser. Blocks that may contain an image also
+        depend on the active image index, which completes their image tags, and
+        code blocks depend on the active highlighter.
+
+        :param block: A block of markdown
+        :type block: str
+        :param block_type: The type of the block
+        :type block_type: str
+        :returns: The hex digest identifying the block
+        :rtype: str
+        """
+        images = image_index_digest() if "![" in block else ""
+        code = active_highlight_digest() if block[:1] == "`" else ""
+        parser = get_parser().digest
+        return hashlib.sha256(
+            f"{RENDER_CACHE_VERSION}\0{parser}\0{images}\0{code}\0{block_type}\0{block}".encode()
+        ).hexdigest()
+
+    def fragment_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key[2:]}.json")
+
+    def get(self, key):
+        """Returns the cached html, plain text and links for a key, or None if it
+        has not been cached
+
+        :param key: A key returned by RenderCache.key
+        :type key: str
+        :returns: A tuple of (html, text, links), or None
+        :rtype: tuple
+        """
+        fragment = self.entries.get(key)
+        if fragment is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+        if self.directory is not None:
+            try:
+                with open(self.fragment_path(key), "r") as fragment_file:
+                    fragment = json.load(fragment_file)
+                fragment = (
+                    fragment["html"],
+                    fragment["text"],
+                    [tuple(link) for link in fragment["links"]],
+                )
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+            else:
+                self.disk_hits += 1
+                self.store(key, fragment)
+                return fragment
+
+        self.misses += 1
+        return None
+
+    def put(self, key, html, text="", links=()):
+        """Caches the html rendered for a key, persisting it when the cache has a
+        directory
+
+        :param key: A key returned by RenderCache.key
+        :type key: str
+        :param html: The html fragment rendered for the block
+        :type html: str
+        :param text: The plain text of the block
+        :type text: str
+        :param links: The targets of the block's links and images, as tuples of
+            (kind, url)
+        :type links: list
+        :returns: Nothing
+        :rtype: None
+        """
+        links = list(links)
+        self.store(key, (html, text, links))
+        if self.directory is None:
+            return
+
+        fragment_path = self.fragment_path(key)
+        os.makedirs(os.path.dirname(fragment_path), exist_ok=True)
+        with atomic_write(fragment_path) as fragment_file:
+            json.dump({"html": html, "text": text, "links": links}, fragment_file)
+
+    def store(self, key, fragment):
+        self.entries[key] = fragment
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def render(self, block, block_type, render_block):
+        """Returns a node holding the html for a block, rendering the block only
+        if it is not already cached
+
+        :param block: A block of markdown
+        :type block: str
+        :param block_type: The type of the block
+        :type block_type: str
+        :param render_block: Converts a block and its type into an HTMLNode
+        :type render_block: Callable
+        :returns: A LeafNode without a tag, holding the html for the block
+        :rtype: LeafNode
+        """
+        key = self.key(block, block_type)
+        fragment = self.get(key)
+        if fragment is None:
+            with collecting_page_text() as block_text, collecting_page_links() as links:
+                html = render_block(block, block_type).to_html()
+            fragment = (html, join_page_text(block_text), links)
+            self.put(key, *fragment)
+        html, text, links = fragment
+        collect_page_text(text)
+        collect_page_links(links)
+        return LeafNode(None, html)
+
+    def counts(self):
+        """Returns the number of lookups served from memory, served from disk, and
+        missed, as a tuple"""
+        return self.hits, self.disk_hits, self.misses
+
+    def __repr__(self):
+        return f"RenderCache(entries: {len(self.entries)}/{self.max_entries}, directory: {self.directory})"
+
+
+def format_render_cache_counts(counts):
+    """Formats the counts of a render cache for the build output
+
+    :param counts: The lookups served from memory, served from disk and missed
+    :type counts: tuple
+    :returns: A printable summary
+    :rtype: str
+    """
+    hits, disk_hits, misses = counts
+    lookups = hits + disk_hits + misses
+    hit_rate = (hits + disk_hits) / lookups if lookups else 0.0
+    return (
+        f"render cache: {hits + disk_hits} hits ({disk_hits} from disk), "
+        f"{misses} misses, {hit_rate:.1%} hit rate"
+    )
+
+
+def get_render_cache(max_entries, directory):
+    """Returns the render cache kept by this process, creating it on first use,
+    so that worker processes keep their cache from one page to the next
+
+    :param max_entries: The number of fragments to keep in memory
+    :type max_entries: int
+    :param directory: The directory to persist fragments to, or None
+    :type directory: str
+    :returns: The render cache for this process
+    :rtype: RenderCache
+    """
+    global process_render_cache
+    if (
+        process_render_cache is None
+        or process_render_cache.max_entries != max_entries
+        or process_render_cache.directory != directory
+    ):
+        process_render_cache = RenderCache(max_entries, directory)
+    return process_render_cache
+
+
+def render_block(block, block_type, render):
+    """Renders a block through the active render cache, or directly when there
+    is none
+
+    :param block: A block of markdown
+    :type block: str
+    :param block_type: The type of the block
+    :type block_type: str
+    :param render: Converts a block and its type into an HTMLNode
+    :type render: Callable
+    :returns: A node for the block
+    :rtype: HTMLNode
+    """
+    if active_render_cache is None:
+        return render(block, block_type)
+    return active_render_cache.render(block, block_type, render)
+
+
+@contextmanager
+def render_caching(cache):
+    """Makes a render cache the active render cache for this process for the
+    body of a with statement
+
+    :param cache: The render cache to render blocks through, or None
+    :type cache: RenderCache
+    """
+    global active_render_cache
+    previous = active_render_cache
+    active_render_cache = cache
+    try:
+        yield cache
+    finally:
+        active_render_cache = previous
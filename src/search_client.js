@@ -0,0 +1,114 @@
+// Client for the search index written by src/search_index.py. Shards are
+// fetched lazily, only for the terms searched for, and cached for the session.
+//
+//   const search = createSearch("/search/");
+//   const results = await search("gandalf the grey"); // [{url, title}, ...]
+(function (global) {
+  "use strict";
+
+  const TOKEN_PATTERN = /[\p{L}\p{N}_]+/gu;
+
+  // terms are measured in code points, as they are by the index
+  function tokenize(text) {
+    return (text.toLowerCase().match(TOKEN_PATTERN) || []).filter(
+      (term) => Array.from(term).length <= 32,
+    );
+  }
+
+  function shardKey(term, length) {
+    return Array.from(term)
+      .slice(0, length)
+      .map((character) =>
+        /[a-z0-9]/.test(character)
+          ? character
+          : `_${character.codePointAt(0).toString(16)}_`,
+      )
+      .join("");
+  }
+
+  function decodePostings(encoded) {
+    const postings = new Map();
+    let pageId = 0;
+    for (const page of encoded) {
+      pageId += page[0];
+      postings.set(pageId, Math.max(1, page.length - 1));
+    }
+    return postings;
+  }
+
+  function createSearch(baseUrl) {
+    const files = new Map();
+    const load = (path) => {
+      if (!files.has(path)) {
+        files.set(
+          path,
+          fetch(baseUrl + path).then((response) => response.json()),
+        );
+      }
+      return files.get(path);
+    };
+
+    return async function search(query) {
+      const index = await load("index.json");
+      const shards = new Set(index.shards);
+      let scores = null;
+      for (const term of new Set(tokenize(query))) {
+        let postings = new Map();
+        const termLength = Array.from(term).length;
+        for (
+          let length = Math.min(termLength, index.max_prefix_length);
+          length > 0;
+          length--
+        ) {
+          const name = shardKey(term, length);
+          if (shards.has(name)) {
+            const shard = await load(`terms/${name}.json`);
+            const encoded = shard[term] || [];
+            if (Array.isArray(encoded)) {
+              postings = decodePostings(encoded);
+            } else {
+              // a large term's postings are split into chunks by page id
+              const key = shardKey(term, termLength);
+              const chunks = await Promise.all(
+                encoded.chunks.map((_, number) =>
+                  load(`terms/${key}.${number}.json`),
+                ),
+              );
+              for (const chunk of chunks) {
+                for (const [pageId, score] of decodePostings(chunk)) {
+                  postings.set(pageId, score);
+                }
+              }
+            }
+            break;
+          }
+        }
+        if (scores === null) {
+          scores = postings;
+        } else {
+          for (const [pageId, score] of scores) {
+            if (postings.has(pageId)) {
+              scores.set(pageId, score + postings.get(pageId));
+            } else {
+              scores.delete(pageId);
+            }
+          }
+        }
+      }
+
+      const ranked = Array.from(scores || []).sort(
+        (a, b) => b[1] - a[1] || a[0] - b[0],
+      );
+      return Promise.all(
+        ranked.map(async ([pageId]) => {
+          const number = Math.floor(pageId / index.pages_per_shard);
+          const pages = await load(`pages/${number}.json`);
+          const [url, title] = pages[pageId % index.pages_per_shard];
+          return { url, title };
+        }),
+      );
+    };
+  }
+
+  global.createSearch = createSearch;
+})(this);
@@ -0,0 +1,433 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from src.build_manifest import atomic_write
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_DIRECTORY = "search"
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_TERM_LENGTH = 32
+MAX_POSITIONS = 8
+COMMON_TERM_FRACTION = 0.1
+COMMON_TERM_MIN_PAGES = 100
+BASE_PREFIX_LENGTH = 2
+MAX_SHARD_BYTES = 64 * 1024
+MAX_TERM_BYTES = MAX_SHARD_BYTES // 2
+PAGES_PER_SHARD = 100
+MAX_TITLE_LENGTH = 200
+RUN_BUCKETS = 64
+CLIENT_PATH = os.path.join(os.path.dirname(__file__), "search_client.js")
+
+
+def tokenize(text):
+    """Splits plain text into lower case search terms. Terms longer than
+    MAX_TERM_LENGTH, which are almost always hashes or encoded data, are
+    dropped, but still count towards the positions of the terms after them.
+
+    :param text: The plain text of a page
+    :type text: str
+    :returns: The terms, in the order they appear
+    :rtype: list
+    """
+    return [
+        term if len(term) <= MAX_TERM_LENGTH else None
+        for term in TOKEN_PATTERN.findall(text.lower())
+    ]
+
+
+def page_terms(text):
+    """Builds the postings of a single page: the positions of each term in the
+    page's text, keeping at most MAX_POSITIONS positions per term
+
+    :param text: The plain text of a page
+    :type text: str
+    :returns: A dict of term to a list of positions
+    :rtype: dict
+    """
+    terms = defaultdict(list)
+    for position, term in enumerate(tokenize(text)):
+        if term is not None:
+            positions = terms[term]
+            if len(positions) < MAX_POSITIONS:
+                positions.append(position)
+    return terms
+
+
+def shard_key(term, length):
+    """Returns the name of the shard holding a term, made from the first
+    characters of the term. Characters other than ascii letters and digits are
+    replaced with their code point in hex between underscores, so shard names
+    are safe in urls and filenames, and terms in other scripts are spread over
+    shards just as ascii terms are.
+
+    :param term: A search term
+    :type term: str
+    :param length: The number of characters of the term to use
+    :type length: int
+    :returns: The shard name
+    :rtype: str
+    """
+    return "".join(
+        (
+            character
+            if character.isascii() and character.isalnum()
+            else f"_{ord(character):x}_"
+        )
+        for character in term[:length]
+    )
+
+
+def chunk_postings(postings, keep_positions):
+    """Splits the postings of a term too large for a shard of its own into
+    chunks of consecutive page ids, each of which encodes to at most
+    MAX_SHARD_BYTES
+
+    :param postings: A list of tuples of (page_id, positions)
+    :type postings: list
+    :param keep_positions: Whether to include positions
+    :type keep_positions: bool
+    :returns: The chunks, as lists of tuples of (page_id, positions)
+    :rtype: list
+    """
+    chunks = [[]]
+    size = 2
+    for page_id, positions in sorted(postings):
+        # a page's size with its id undeltaed is an upper bound on its size
+        # once encoded
+        page = [page_id, *positions] if keep_positions else [page_id]
+        page_size = len(json.dumps(page, separators=(",", ":"))) + 1
+        if chunks[-1] and size + page_size > MAX_SHARD_BYTES:
+            chunks.append([])
+            size = 2
+        chunks[-1].append((page_id, positions))
+        size += page_size
+    return chunks
+
+
+def encode_postings(postings, keep_positions):
+    """Encodes the postings of a term compactly. Pages are listed in id order
+    as arrays of the id's difference from the previous page's id, followed by
+    the term's positions in the page, each as a difference from the one before.
+
+    :param postings: A list of tuples of (page_id, positions)
+    :type postings: list
+    :param keep_positions: Whether to include positions
+    :type keep_positions: bool
+    :returns: The encoded postings
+    :rtype: list
+    """
+    encoded = []
+    previous_id = 0
+    for page_id, positions in sorted(postings):
+        page = [page_id - previous_id]
+        previous_id = page_id
+        if keep_positions:
+            previous_position = 0
+            for position in positions:
+                page.append(position - previous_position)
+                previous_position = position
+        encoded.append(page)
+    return encoded
+
+
+def decode_postings(encoded):
+    """Reverses encode_postings
+
+    :param encoded: The encoded postings of a term
+    :type encoded: list
+    :returns: A dict of page id to a list of positions, empty for terms stored
+        without positions
+    :rtype: dict
+    """
+    postings = {}
+    page_id = 0
+    for page in encoded:
+        page_id += page[0]
+        positions = []
+        position = 0
+        for delta in page[1:]:
+            position += delta
+            positions.append(position)
+        postings[page_id] = positions
+    return postings
+
+
+class SearchIndexBuilder:
+    """Builds a full text search index for a site as its pages are generated,
+    and writes it as an inverted index split into small JSON shards that a
+    client loads lazily, by the prefix of each term searched for.
+
+    The index is written to a `search` directory containing:
+      * index.json - the shard names, the number of pages, and the settings a
+        client needs to find the shard for a term
+      * terms/NAME.json - a shard, mapping each term with the shard's prefix to
+        its postings, encoded by encode_postings, or, for a term whose postings
+        are larger than MAX_TERM_BYTES, to {"chunks": [first page id, ...]}
+      * terms/TERM.N.json - chunk N of such a term's postings, covering the
+        page ids from the chunk's first page id to the next chunk's, where TERM
+        is the whole term escaped by shard_key
+      * pages/N.json - the url and title of pages N * PAGES_PER_SHARD onwards,
+        indexed by page id, with null for unused ids, and titles cut to
+        MAX_TITLE_LENGTH
+      * search.js - a client for the index
+
+    Postings are spilled to temporary run files, bucketed by term prefix, as
+    pages are added, and each bucket is only loaded once every page has been
+    added, so memory use is bounded by the largest bucket rather than the size
+    of the site. Shards are split on longer prefixes until they fit in
+    MAX_SHARD_BYTES, and the postings of terms too large to share a shard are
+    split by page id into chunks that fit in it too. Each page keeps at most
+    MAX_POSITIONS positions per term, and terms found on more than
+    COMMON_TERM_FRACTION of the pages, and at least COMMON_TERM_MIN_PAGES, keep
+    only their page ids, which keeps common terms to few chunks.
+
+    Page ids are stable between builds, so with a manifest only the files
+    whose content changed are rewritten.
+    """
+
+    def __init__(self, dest_dir_path, run_buckets=RUN_BUCKETS):
+        self.directory = os.path.join(dest_dir_path, SEARCH_DIRECTORY)
+        self.run_directory = tempfile.mkdtemp(prefix="search-runs-")
+        self.runs = [None] * run_buckets
+        self.pages = {}
+        self.next_id = 0
+
+    def run_file(self, term):
+        bucket = hash(shard_key(term, BASE_PREFIX_LENGTH)) % len(self.runs)
+        if self.runs[bucket] is None:
+            self.runs[bucket] = open(
+                os.path.join(self.run_directory, f"{bucket}.run"), "w", encoding="utf-8"
+            )
+        return self.runs[bucket]
+
+    def add(self, url, title, text, page_id=None):
+        """Adds a page to the index
+
+        :param url: The site relative url of the page
+        :type url: str
+        :param title: The title of the page
+        :type title: str
+        :param text: The plain text of the page
+        :type text: str
+        :param page_id: The page's stable id, or None to number pages in the
+            order they are added
+        :type page_id: int
+        :returns: Nothing
+        :rtype: None
+        """
+        if page_id is None:
+            page_id = self.next_id
+        self.next_id = max(self.next_id, page_id + 1)
+        self.pages[page_id] = (url, title[:MAX_TITLE_LENGTH])
+        for term, positions in page_terms(text).items():
+            positions = ",".join(map(str, positions))
+            self.run_file(term).write(f"{term}\t{page_id}\t{positions}\n")
+
+    def read_run(self, bucket):
+        run = self.runs[bucket]
+        run.close()
+        terms = defaultdict(list)
+        with open(run.name, "r", encoding="utf-8") as run_file:
+            for line in run_file:
+                term, page_id, positions = line.rstrip("\n").split("\t")
+                terms[term].append(
+                    (int(page_id), [int(position) for position in positions.split(",")])
+                )
+        os.remove(run.name)
+        return terms
+
+    def encode_shards(self, terms):
+        """Encodes the terms of a bucket into shards, splitting each shard on a
+        longer prefix until it fits in MAX_SHARD_BYTES, and the postings of
+        terms larger than MAX_TERM_BYTES into chunks
+
+        :param terms: A dict of term to its postings, as tuples of (page_id,
+            positions)
+        :type terms: dict
+        :returns: A tuple of (shards, chunks), each a dict of file name, without
+            its extension, to the file's JSON
+        :rtype: tuple
+        """
+        common = max(COMMON_TERM_MIN_PAGES, len(self.pages) * COMMON_TERM_FRACTION)
+        shards = {}
+        chunk_files = {}
+        encoded = {}
+        for term, postings in terms.items():
+            keep_positions = len(postings) <= common
+            encoded[term] = encode_postings(postings, keep_positions)
+            if len(json.dumps(encoded[term], separators=(",", ":"))) <= MAX_TERM_BYTES:
+                continue
+            chunks = chunk_postings(postings, keep_positions)
+            name = shard_key(term, len(term))
+            for number, chunk in enumerate(chunks):
+                chunk_files[f"{name}.{number}"] = json.dumps(
+                    encode_postings(chunk, keep_positions), separators=(",", ":")
+                )
+            encoded[term] = {"chunks": [chunk[0][0] for chunk in chunks]}
+
+        pending = defaultdict(dict)
+        for term, postings in encoded.items():
+            pending[term[:BASE_PREFIX_LENGTH]][term] = postings
+        while pending:
+            prefix, shard_terms = pending.popitem()
+            content = json.dumps(shard_terms, separators=(",", ":"), sort_keys=True)
+            if len(content) <= MAX_SHARD_BYTES:
+                shards[shard_key(prefix, len(prefix))] = content
+                continue
+            split = defaultdict(dict)
+            for term, postings in shard_terms.items():
+                split[term[: len(prefix) + 1]][term] = postings
+            for split_prefix, split_terms in split.items():
+                if split_prefix == prefix:
+                    # a term no longer than the prefix cannot be split further,
+                    # but is no larger than MAX_TERM_BYTES on its own
+                    shards[shard_key(prefix, len(prefix))] = json.dumps(
+                        split_terms, separators=(",", ":"), sort_keys=True
+                    )
+                else:
+                    pending[split_prefix] = split_terms
+        return shards, chunk_files
+
+    def write(self, filepath, content, manifest, entries):
+        entry = {
+            "hash": hashlib.sha256(content.encode()).hexdigest(),
+            "output": filepath,
+        }
+        entries.append(entry)
+        if manifest is not None and manifest.is_current("outputs", filepath, entry):
+            return 0
+        print(f"writing: {filepath}")
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with atomic_write(filepath) as output_file:
+            output_file.write(content)
+        return 1
+
+    def close(self, manifest=None):
+        """Writes the index, skipping the files whose content is unchanged since
+        the previous build when a manifest is given
+
+        :param manifest: The manifest of the current build
+        :type manifest: BuildManifest
+        :returns: The manifest entries of every file in the index
+        :rtype: list
+        """
+        entries = []
+        written = 0
+        shard_names = []
+        for bucket in range(len(self.runs)):
+            if self.runs[bucket] is None:
+                continue
+            shards, chunk_files = self.encode_shards(self.read_run(bucket))
+            shard_names.extend(shards)
+            for name, content in (*shards.items(), *chunk_files.items()):
+                filepath = os.path.join(self.directory, "terms", f"{name}.json")
+                written += self.write(filepath, content, manifest, entries)
+        shutil.rmtree(self.run_directory, ignore_errors=True)
+
+        page_shards = defaultdict(lambda: [None] * PAGES_PER_SHARD)
+        for page_id, page in self.pages.items():
+            page_shards[page_id // PAGES_PER_SHARD][page_id % PAGES_PER_SHARD] = page
+        for number, pages in sorted(page_shards.items()):
+            while pages and pages[-1] is None:
+                pages.pop()
+            filepath = os.path.join(self.directory, "pages", f"{number}.json")
+            content = json.dumps(pages, separators=(",", ":"))
+            written += self.write(filepath, content, manifest, entries)
+
+        index = {
+            "version": SEARCH_INDEX_VERSION,
+            "pages": len(self.pages),
+            "pages_per_shard": PAGES_PER_SHARD,
+            "max_prefix_length": MAX_TERM_LENGTH,
+            "shards": sorted(shard_names),
+        }
+        written += self.write(
+            os.path.join(self.directory, "index.json"),
+            json.dumps(index, separators=(",", ":")),
+            manifest,
+            entries,
+        )
+        with open(CLIENT_PATH, "r", encoding="utf-8") as client_file:
+            written += self.write(
+                os.path.join(self.directory, "search.js"),
+                client_file.read(),
+                manifest,
+                entries,
+            )
+        print(
+            f"search index: {len(self.pages)} pages, {len(shard_names)} term shards, "
+            f"{written} of {len(entries)} files written"
+        )
+        return entries
+
+    def discard(self):
+        for run in self.runs:
+            if run is not None:
+                run.close()
+        shutil.rmtree(self.run_directory, ignore_errors=True)
+
+
+def search_index(search_dir_path, query):
+    """Searches an index written by SearchIndexBuilder the way the client does,
+    loading only the shards for the terms searched for. Pages must contain
+    every term, and are ranked by how often the terms appear in them.
+
+    :param search_dir_path: The directory the index was written to
+    :type search_dir_path: str
+    :param query: The text to search for
+    :type query: str
+    :returns: The matching pages, as tuples of (url, title), best match first
+    :rtype: list
+    """
+
+    def load(*parts):
+        with open(os.path.join(search_dir_path, *parts), "r") as index_file:
+            return json.load(index_file)
+
+    index = load("index.json")
+    shard_names = set(index["shards"])
+    scores = None
+    for term in set(filter(None, tokenize(query))):
+        postings = {}
+        for length in range(min(len(term), index["max_prefix_length"]), 0, -1):
+            name = shard_key(term, length)
+            if name in shard_names:
+                postings = load("terms", f"{name}.json").get(term, [])
+                if isinstance(postings, dict):
+                    chunks = postings["chunks"]
+                    postings = {}
+                    for number in range(len(chunks)):
+                        chunk = load(
+                            "terms", f"{shard_key(term, len(term))}.{number}.json"
+                        )
+                        postings.update(decode_postings(chunk))
+                else:
+                    postings = decode_postings(postings)
+                break
+        term_scores = {
+            page_id: max(1, len(positions)) for page_id, positions in postings.items()
+        }
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {
+                page_id: score + term_scores[page_id]
+                for page_id, score in scores.items()
+                if page_id in term_scores
+            }
+
+    results = []
+    page_shards = {}
+    for page_id, _ in sorted(
+        (scores or {}).items(), key=lambda item: (-item[1], item[0])
+    ):
+        number = page_id // index["pages_per_shard"]
+        if number not in page_shards:
+            page_shards[number] = load("pages", f"{number}.json")
+        url, title = page_shards[number][page_id % index["pages_per_shard"]]
+        results.append((url, title))
+    return results
@@ -0,0 +1,463 @@
+import contextlib
+import email.utils
+import functools
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import (
+    BaseHTTPRequestHandler,
+    SimpleHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from urllib.parse import quote, unquote, urlsplit
+from src.compression_functions import COMPRESSIBLE_EXTENSIONS
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    "<script>new EventSource("
+    f'"{LIVE_RELOAD_PATH}"'
+    ").onmessage = () => location.reload();</script>"
+)
+
+# files up to this size are held in memory; larger ones are sent with sendfile
+SMALL_FILE_SIZE = 64 * 1024
+FILE_CACHE_SIZE = 64 * 1024 * 1024
+NOT_FOUND_PAGE = "404.html"
+# the content codings of the precompressed siblings, in order of preference
+PRECOMPRESSED_ENCODINGS = (("br", "br"), ("gzip", "gz"))
+TEXT_CONTENT_TYPES = ("application/javascript", "application/json", "image/svg+xml")
+
+
+class LiveReload:
+    """Tracks the number of times the site has been rebuilt, so that connected
+    browsers can be told to reload when it changes"""
+
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        """Tells every waiting browser that the site has been rebuilt"""
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        """Blocks until the site is rebuilt past the given version, or the
+        timeout expires
+
+        :param version: The version the caller has already seen
+        :type version: int
+        :param timeout: The maximum number of seconds to wait
+        :type timeout: float
+        :returns: The current version
+        :rtype: int
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class LiveReloadRequestHandler(SimpleHTTPRequestHandler):
+    """Serves a directory, injecting a live reload script into html pages and
+    streaming reload events to them as server-sent events"""
+
+    def __init__(self, *args, live_reload, **kwargs):
+        self.live_reload = live_reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.stream_reload_events()
+            return
+
+        filepath = self.translate_path(self.path)
+        if os.path.isdir(filepath) and self.path.split("?")[0].endswith("/"):
+            filepath = os.path.join(filepath, "index.html")
+        if not filepath.endswith(".html") or not os.path.isfile(filepath):
+            super().do_GET()
+            return
+
+        with open(filepath, "rb") as html_file:
+            content = html_file.read()
+        marker = b"</body>"
+        script = LIVE_RELOAD_SCRIPT.encode()
+        if marker in content:
+            content = content.replace(marker, script + marker, 1)
+        else:
+            content = content + script
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def stream_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.live_reload.version
+        try:
+            while True:
+                current = self.live_reload.wait(version, timeout=15)
+                if current == version:
+                    self.wfile.write(b": keep-alive\n\n")
+                else:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = current
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_request(self, code="-", size="-"):
+        # keep the build output readable; errors are still logged
+        pass
+
+
+def start_live_reload_server(directory, host, port, live_reload):
+    """Starts serving a directory with live reload on a background thread
+
+    :param directory: The directory to serve
+    :type directory: str
+    :param host: The address to listen on
+    :type host: str
+    :param port: The port to listen on
+    :type port: int
+    :param live_reload: The live reload state shared with the watcher
+    :type live_reload: LiveReload
+    :returns: The running server, which can be stopped with shutdown()
+    :rtype: ThreadingHTTPServer
+    """
+    handler = functools.partial(
+        LiveReloadRequestHandler,
+        directory=os.path.abspath(directory),
+        live_reload=live_reload,
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FileCache:
+    """Holds the content of small files in memory, so they can be served
+    without being read from disk for each request. An entry is used only while
+    the file's inode, size and modification time are unchanged, so files
+    replaced by a rebuild are read again, and the least recently used entries
+    are evicted once the cache holds more than max_size bytes.
+    """
+
+    def __init__(self, max_file_size=SMALL_FILE_SIZE, max_size=FILE_CACHE_SIZE):
+        self.max_file_size = max_file_size
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def read(self, filepath):
+        """Returns the content of a file, from the cache if it is unchanged
+
+        :param filepath: The path to the file
+        :type filepath: str
+        :returns: A tuple of (stat, content), where the stat matches the content
+            returned, and the content is None for files too large to cache
+        :rtype: tuple
+        :raises OSError: If the file cannot be read
+        """
+        stat = os.stat(filepath)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(filepath)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(filepath)
+                return entry[1], entry[2]
+        if stat.st_size > self.max_file_size:
+            return stat, None
+
+        with open(filepath, "rb") as cached_file:
+            # the file may have been replaced since it was stat'd
+            stat = os.fstat(cached_file.fileno())
+            content = cached_file.read()
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            previous = self.entries.pop(filepath, None)
+            if previous is not None:
+                self.size -= len(previous[2])
+            self.entries[filepath] = (signature, stat, content)
+            self.size += len(content)
+            while self.size > self.max_size:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return stat, content
+
+    def __repr__(self):
+        return f"FileCache(files: {len(self.entries)}, bytes: {self.size})"
+
+
+def accepted_encodings(header):
+    """Parses an Accept-Encoding header
+
+    :param header: The value of the header, or None if it was not sent
+    :type header: str
+    :returns: The content codings the client accepts, lowercased, leaving out
+        those it gave a quality of zero
+    :rtype: set
+    """
+    encodings = set()
+    for coding in (header or "").split(","):
+        name, _, parameters = coding.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            encodings.add(name)
+    return encodings
+
+
+def entity_tag(stat, encoding=None):
+    """Returns the entity tag of a file, derived from its size and modification
+    time, so it can be computed without reading the file
+
+    :param stat: The result of stat'ing the file
+    :type stat: os.stat_result
+    :param encoding: The content coding of the file, if it is a precompressed
+        sibling
+    :type encoding: str
+    :returns: The quoted entity tag
+    :rtype: str
+    """
+    tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    if encoding is not None:
+        tag = f"{tag}-{encoding}"
+    return f'"{tag}"'
+
+
+def content_type(filepath):
+    content_type, _ = mimetypes.guess_type(filepath)
+    if content_type is None:
+        return "application/octet-stream"
+    if content_type.startswith("text/") or content_type in TEXT_CONTENT_TYPES:
+        return f"{content_type}; charset=utf-8"
+    return content_type
+
+
+class StaticRequestHandler(BaseHTTPRequestHandler):
+    """Serves a generated site over persistent HTTP/1.1 connections.
+
+    Responses carry an ETag and Last-Modified date so browsers can revalidate
+    them, and the precompressed .br and .gz siblings written by the compress
+    stage are sent to clients that accept them. Small files are served from the
+    server's file cache, and larger ones are sent with sendfile.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "StaticSiteGenerator"
+    # close idle persistent connections rather than holding a thread forever
+    timeout = 30
+    # headers and body are written separately, so don't wait to coalesce them
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_file()
+
+    def do_HEAD(self):
+        self.send_file()
+
+    def resolve_path(self):
+        # returns the file a request path is served from, or None if there is
+        # no such file; redirects directories requested without a trailing slash
+        path = unquote(urlsplit(self.path).path)
+        parts = [part for part in path.split("/") if part not in ("", ".", "..")]
+        if any(os.sep in part or "\0" in part for part in parts):
+            return None
+        filepath = os.path.join(self.server.directory, *parts)
+        if os.path.isdir(filepath):
+            if not path.endswith("/"):
+                query = urlsplit(self.path).query
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header(
+                    "Location", f"{quote(path)}/" + (f"?{query}" if query else "")
+                )
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return False
+            filepath = os.path.join(filepath, "index.html")
+        if not os.path.isfile(filepath):
+            return None
+        return filepath
+
+    def select_representation(self, filepath):
+        # prefers the smallest precompressed sibling the client accepts, as long
+        # as it is not older than the file itself
+        if not filepath.endswith(COMPRESSIBLE_EXTENSIONS):
+            return filepath, None
+        encodings = accepted_encodings(self.headers.get("Accept-Encoding"))
+        if not encodings:
+            return filepath, None
+        try:
+            modified = os.stat(filepath).st_mtime_ns
+        except OSError:
+            return filepath, None
+        for encoding, extension in PRECOMPRESSED_ENCODINGS:
+            if encoding not in encodings:
+                continue
+            sibling = f"{filepath}.{extension}"
+            try:
+                if os.stat(sibling).st_mtime_ns >= modified:
+                    return sibling, encoding
+            except OSError:
+                continue
+        return filepath, None
+
+    def is_not_modified(self, stat, etag):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                return False
+            return int(stat.st_mtime) <= since.timestamp()
+        return False
+
+    def send_file(self):
+        filepath = self.resolve_path()
+        if filepath is False:
+            return
+        if filepath is None:
+            self.send_not_found()
+            return
+
+        representation, encoding = self.select_representation(filepath)
+        try:
+            stat, content = self.server.file_cache.read(representation)
+            served_file = None
+            if content is None:
+                served_file = open(representation, "rb")
+                stat = os.fstat(served_file.fileno())
+        except OSError:
+            self.send_not_found()
+            return
+
+        with served_file or contextlib.nullcontext():
+            etag = entity_tag(stat, encoding)
+            not_modified = self.is_not_modified(stat, etag)
+            self.send_response(
+                HTTPStatus.NOT_MODIFIED if not_modified else HTTPStatus.OK
+            )
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(int(stat.st_mtime)))
+            self.send_header("Cache-Control", "no-cache")
+            if filepath.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.send_header("Vary", "Accept-Encoding")
+            if not_modified:
+                self.end_headers()
+                return
+            self.send_header("Content-Type", content_type(filepath))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(stat.st_size))
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            try:
+                if content is not None:
+                    self.wfile.write(content)
+                else:
+                    self.connection.sendfile(served_file, count=stat.st_size)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    def send_not_found(self):
+        # serves the site's own 404 page if it has one, keeping the connection
+        # open, unlike send_error
+        content = b"404 Not Found\n"
+        page_content_type = "text/plain; charset=utf-8"
+        try:
+            _, page = self.server.file_cache.read(
+                os.path.join(self.server.directory, NOT_FOUND_PAGE)
+            )
+            if page is not None:
+                content = page
+                page_content_type = content_type(NOT_FOUND_PAGE)
+        except OSError:
+            pass
+        self.send_response(HTTPStatus.NOT_FOUND)
+        self.send_header("Content-Type", page_content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    def log_request(self, code="-", size="-"):
+        # logging each request would cost more than serving it; errors are
+        # still logged
+        pass
+
+
+class StaticServer(ThreadingHTTPServer):
+    """Serves a directory with a StaticRequestHandler on a thread per
+    connection, sharing one file cache between the threads"""
+
+    daemon_threads = True
+    # the default backlog of 5 drops connections under load
+    request_queue_size = 128
+
+    def __init__(self, server_address, directory, file_cache=None):
+        self.directory = os.path.abspath(directory)
+        self.file_cache = file_cache if file_cache is not None else FileCache()
+        super().__init__(server_address, StaticRequestHandler)
+
+
+def start_static_server(directory, host, port):
+    """Starts serving a directory on a background thread
+
+    :param directory: The directory to serve
+    :type directory: str
+    :param host: The address to listen on
+    :type host: str
+    :param port: The port to listen on, or 0 for any free port
+    :type port: int
+    :returns: The running server, which can be stopped with shutdown()
+    :rtype: StaticServer
+    """
+    server = StaticServer((host, port), directory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_site(directory, host, port):
+    """Serves a generated site until interrupted
+
+    :param directory: The directory to serve
+    :type directory: str
+    :param host: The address to listen on
+    :type host: str
+    :param port: The port to listen on
+    :type port: int
+    :returns: Nothing
+    :rtype: None
+    """
+    with StaticServer((host, port), directory) as server:
+        print(f"serving {directory} on http://{host}:{server.server_address[1]}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
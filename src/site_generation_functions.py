@@ -1,34 +1,266 @@
+import asyncio
 import os
 import re
 import shutil
-from src.markdown_conversion_functions import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import chain
+from src.build_manifest import atomic_write, hash_file
+from src.front_matter_functions import split_front_matter
+from src.highlight_functions import (
+    get_highlighter,
+    highlight_digest,
+    pygments,
+    using_highlighter,
+)
+from src.image_functions import get_image_index, using_image_index
+from src.markdown_block_functions import iter_markdown_blocks
+from src.markdown_conversion_functions import markdown_blocks_to_html_nodes
+from src.markdown_extensions import get_parser, load_extensions
+from src.minify_functions import minify_css, minify_html
+from src.nodes_htmlnode import LeafNode, ParentNode
+from src.page_text import collecting_page_links, collecting_page_text, join_page_text
+from src.profiling_functions import (
+    BuildProfiler,
+    profile_iter,
+    profile_stage,
+    profiling,
+)
+from src.render_cache import (
+    format_render_cache_counts,
+    get_render_cache,
+    render_caching,
+)
+from src.template_functions import iter_template, load_template, metadata_values
 
 
-def copy_static_files(source_filepath, destination_filepath):
-    """Purges the target filepath, then recursively copies files from the
-    provided source filepath to that location
+def collect_static_files(source_filepath, destination_filepath):
+    """Recursively walks a directory of static files and pairs each file with
+    the path it will be copied to
 
     :param source_filepath: The source directory to copy
     :type source_filepath: str
     :param destination_filepath: The target directory
     :type destination_filepath: str
-    :returns: Nothing
-    :rtype: None
+    :returns: A sorted list of tuples: (source_file, destination_file)
+    :rtype: list
     """
-    # Purge the destination_filepath and create a new directory
-    if os.path.exists(destination_filepath):
-        shutil.rmtree(destination_filepath)
-    os.mkdir(destination_filepath)
-
-    # Recursively copy files to the destination directory
-    for file in os.listdir(source_filepath):
+    files = []
+    for file in sorted(os.listdir(source_filepath)):
         source_file = os.path.join(source_filepath, file)
         destination_file = os.path.join(destination_filepath, file)
-        print(f"copying: {source_file} -> {destination_file}")
         if os.path.isfile(source_file):
-            shutil.copy(source_file, destination_file)
+            files.append((source_file, destination_file))
         else:
-            copy_static_files(source_file, destination_file)
+            files.extend(collect_static_files(source_file, destination_file))
+    return files
+
+
+def copy_file(source_file, destination_file, link=False):
+    """Copies a single file, replacing the destination atomically so that a
+    destination hard linked to its source is never written through.
+
+    When linking is requested the destination is hard linked to the source,
+    falling back to a copy when the two are on different filesystems. Copies
+    use copy_file_range where the platform supports it, which lets the kernel
+    copy (or reflink) the data without passing it through userspace, and
+    otherwise shutil.copyfile, which uses sendfile on Linux.
+
+    :param source_file: The path to the file to copy
+    :type source_file: str
+    :param destination_file: The path to copy the file to
+    :type destination_file: str
+    :param link: Whether to hard link the file instead of copying it
+    :type link: bool
+    :returns: Nothing
+    :rtype: None
+    """
+    os.makedirs(os.path.dirname(destination_file) or ".", exist_ok=True)
+    temporary_file = f"{destination_file}.{os.getpid()}.tmp"
+    try:
+        if link:
+            try:
+                os.link(source_file, temporary_file)
+                os.replace(temporary_file, destination_file)
+                return
+            except OSError:
+                pass
+
+        copied = False
+        if hasattr(os, "copy_file_range"):
+            try:
+                with open(source_file, "rb") as source, open(
+                    temporary_file, "wb"
+                ) as destination:
+                    size = os.fstat(source.fileno()).st_size
+                    while size > 0:
+                        written = os.copy_file_range(
+                            source.fileno(), destination.fileno(), size
+                        )
+                        if written == 0:
+                            break
+                        size -= written
+                copied = size == 0
+            except OSError:
+                pass
+        if not copied:
+            shutil.copyfile(source_file, temporary_file)
+        shutil.copymode(source_file, temporary_file)
+        os.replace(temporary_file, destination_file)
+    finally:
+        if os.path.lexists(temporary_file):
+            os.remove(temporary_file)
+
+
+def copy_static_file(source_file, destination_file, link=False, minify=False):
+    """Copies a single static file to its destination. Stylesheets are minified
+    when minifying, and other files are copied or hard linked with copy_file.
+
+    :param source_file: The path to the file to copy
+    :type source_file: str
+    :param destination_file: The path to copy the file to
+    :type destination_file: str
+    :param link: Whether to hard link the file instead of copying it
+    :type link: bool
+    :param minify: Whether to minify the file if it is a stylesheet
+    :type minify: bool
+    :returns: Nothing
+    :rtype: None
+    """
+    if not (minify and source_file.endswith(".css")):
+        copy_file(source_file, destination_file, link)
+        return
+    with open(source_file, "r") as stylesheet:
+        write_destination(destination_file, minify_css(stylesheet.read()))
+
+
+def static_file_entry(source_file, destination_file, minified=False):
+    """Returns the manifest entry for a static file: the hash of its content,
+    the path it is copied to, and whether it was minified
+
+    :param source_file: The path to the static file
+    :type source_file: str
+    :param destination_file: The path the file is copied to
+    :type destination_file: str
+    :param minified: Whether the file is minified as it is copied
+    :type minified: bool
+    :returns: The entry
+    :rtype: dict
+    """
+    entry = {"hash": hash_file(source_file), "output": destination_file}
+    if minified:
+        entry["minified"] = True
+    return entry
+
+
+def copy_static_files(
+    source_filepath, destination_filepath, manifest=None, link=False, minify=False
+):
+    """Recursively copies files from the provided source filepath to the target
+    filepath.
+
+    Without a manifest, or on the first build recorded by the manifest, the
+    target filepath is purged first. Otherwise files whose size and modification
+    time are unchanged since the previous build are skipped without being read,
+    and files that did change are only copied if their content hash differs.
+    Files are copied concurrently on a thread pool.
+
+    When minifying, stylesheets are minified as they are copied rather than
+    linked, and written to a temporary file which replaces the destination, so
+    a destination hard linked to its source is never written through.
+
+    :param source_filepath: The source directory to copy
+    :type source_filepath: str
+    :param destination_filepath: The target directory
+    :type destination_filepath: str
+    :param manifest: The manifest used to skip unchanged files
+    :type manifest: BuildManifest
+    :param link: Whether to hard link files instead of copying them
+    :type link: bool
+    :param minify: Whether to minify stylesheets
+    :type minify: bool
+    :returns: Nothing
+    :rtype: None
+    """
+    if manifest is None or manifest.is_first_build():
+        # Purge the destination_filepath and create a new directory
+        if os.path.exists(destination_filepath):
+            shutil.rmtree(destination_filepath)
+        os.mkdir(destination_filepath)
+    else:
+        os.makedirs(destination_filepath, exist_ok=True)
+
+    pending = []
+    unchanged = 0
+    for source_file, destination_file in collect_static_files(
+        source_filepath, destination_filepath
+    ):
+        entry = None
+        minified = minify and source_file.endswith(".css")
+        if manifest is not None:
+            stat = os.stat(source_file)
+            # a stylesheet is copied again when minification is turned on or off
+            same_minify = (
+                manifest.previous["static"].get(source_file, {}).get("minified", False)
+                == minified
+            )
+            if same_minify and manifest.is_unmodified(
+                "static", source_file, stat.st_size, stat.st_mtime_ns, destination_file
+            ):
+                manifest.keep_previous("static", source_file)
+                unchanged += 1
+                continue
+            entry = static_file_entry(source_file, destination_file, minified)
+            is_current = same_minify and manifest.is_current(
+                "static", source_file, entry
+            )
+            # record the new size and mtime so the next build can skip hashing
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            if is_current:
+                manifest.record("static", source_file, entry)
+                unchanged += 1
+                continue
+        pending.append((source_file, destination_file, entry, minified))
+
+    def copy(file):
+        source_file, destination_file, _, minified = file
+        copy_static_file(source_file, destination_file, link, minified)
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(copy, pending))
+    if manifest is not None:
+        for source_file, _, entry, _ in pending:
+            manifest.record("static", source_file, entry)
+
+    print(
+        f"static files: {len(pending)} {'linked' if link else 'copied'}, {unchanged} unchanged"
+    )
+
+
+def remove_orphaned_outputs(manifest, destination_filepath):
+    """Removes the outputs of the previous build that were not produced by this
+    build, along with any directories below the destination filepath left empty
+    by their removal
+
+    :param manifest: The manifest of the current build
+    :type manifest: BuildManifest
+    :param destination_filepath: The directory the site is written to
+    :type destination_filepath: str
+    :returns: Nothing
+    :rtype: None
+    """
+    for output in manifest.orphaned_outputs():
+        if not os.path.isfile(output):
+            continue
+        print(f"removing: {output}")
+        os.remove(output)
+
+        root = os.path.normpath(destination_filepath)
+        directory = os.path.dirname(os.path.normpath(output))
+        while directory.startswith(root + os.sep) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
 
 
 def extract_title(markdown):
@@ -47,24 +279,82 @@ def extract_title(markdown):
     return matches.group("title")
 
 
-def write_destination(filepath, content):
-    """Takes a filepath and content string, and writes the content to that filepath
+def write_destination(filepath, content, created_directories=None):
+    """Takes a filepath and content, and writes the content to that filepath. The
+    content may be a string, or an iterable of string chunks which are written as
+    they are produced. The content is written to a temporary file which replaces
+    the destination once it is complete, so an error while producing the chunks
+    leaves any previous version of the file in place.
 
     :param filepath: The path to the destination file
     :type filepath: str
     :param content: The content to write
-    :type content: str
+    :type content: str | Iterable[str]
+    :param created_directories: The directories already known to exist, which
+        is updated as directories are created, so that a build creates each
+        directory only once
+    :type created_directories: set
     :returns: Nothing
     :rtype: None
     """
-    path_parts = filepath.split("/")
-    if len(path_parts) > 1:
-        os.makedirs("/".join(path_parts[:-1]), exist_ok=True)
-    with open(filepath, "w") as destination_file:
-        destination_file.write(content)
+    directory = os.path.dirname(filepath)
+    if directory and (
+        created_directories is None or directory not in created_directories
+    ):
+        os.makedirs(directory, exist_ok=True)
+        if created_directories is not None:
+            created_directories.add(directory)
+    with atomic_write(filepath) as destination_file:
+        if isinstance(content, str):
+            destination_file.write(content)
+        else:
+            destination_file.writelines(content)
+
+
+def render_page(markdown_lines, template_path, minify=False):
+    """Lazily renders the html page for a markdown document using a template html
+    file. Blocks are read and converted only as the chunks of the page are
+    consumed, apart from the front matter and the first block.
+
+    The page's title is taken from its front matter, falling back to the heading
+    1 in its first block, and a template named in the front matter is used in
+    place of the given one. Every other front matter variable fills the slot of
+    the same name. When minifying, the template is minified once when
+    it is loaded and each block as it is converted, so the page is still never
+    held in memory as a whole.
+
+    :param markdown_lines: The lines of the markdown document, such as an open
+        file
+    :type markdown_lines: Iterable[str]
+    :param template_path: The path to the template file used to generate the html document
+    :type template_path: str
+    :param minify: Whether to minify the html
+    :type minify: bool
+    :returns: The chunks of the html page
+    :rtype: Iterable[str]
+    """
+    metadata, body_lines = split_front_matter(markdown_lines)
+    markdown_blocks = profile_iter("read", iter_markdown_blocks(body_lines))
+    first_block = next(markdown_blocks, "")
+    title = metadata.get("title")
+    if title is None:
+        title = extract_title(first_block)
+    block_nodes = markdown_blocks_to_html_nodes(chain((first_block,), markdown_blocks))
+    if minify:
+        block_nodes = (
+            LeafNode(None, minify_html(node.to_html())) for node in block_nodes
+        )
+    html_node = ParentNode("div", block_nodes)
+    values = metadata_values(metadata)
+    values["Title"] = str(title)
+    values["Content"] = profile_iter("to_html", html_node.iter_html())
+    return iter_template(
+        load_template(metadata.get("template") or template_path, minify),
+        values,
+    )
 
 
-def generate_page(source_filepath, template_path, destination_filepath):
+def generate_page(source_filepath, template_path, destination_filepath, minify=False):
     """Generate a html page from a source markdown file, using a template html file.
     Writes the file to the destination filepath.
 
@@ -74,41 +364,571 @@ def generate_page(source_filepath, template_path, destination_filepath):
     :type template_path: str
     :param destination_filepath: The filepath to write the html file to
     :type destination_filepath: str
+    :param minify: Whether to minify the html
+    :type minify: bool
     :returns: Nothing
     :rtype: None
     """
-    print(
-        f"generating page: {
-            source_filepath} -> {destination_filepath} using {template_path}"
+    with open(source_filepath, "r") as source_file:
+        # blocks are read, converted and written one at a time, so the page is
+        # never held in memory as a whole
+        html_markup = render_page(source_file, template_path, minify)
+
+        # serialization and template filling are timed as the chunks are produced
+        with profile_stage("write"):
+            write_destination(
+                destination_filepath, profile_iter("template", html_markup)
+            )
+
+
+# the settings a build is run with, and their defaults
+DEFAULT_BUILD_OPTIONS = {
+    "jobs": 1,
+    "io_concurrency": 0,
+    "render_cache_size": 0,
+    "render_cache_dir": None,
+    "include_drafts": False,
+    "image_index": None,
+    "minify": False,
+    "link_static": False,
+    "extensions": (),
+    "highlight": None,
+}
+
+
+def build_options(**settings):
+    """Returns the settings of a build, shared by every stage of the build and by
+    the rebuilds made while watching. The settings are:
+      * jobs - the number of worker processes to generate pages with
+      * io_concurrency - the number of pages in flight in the asynchronous
+        pipeline, or 0 to generate pages without it
+      * render_cache_size - the number of rendered blocks each process keeps in
+        memory
+      * render_cache_dir - the directory to persist rendered blocks to between
+        builds, or None
+      * include_drafts - whether to generate pages marked as drafts
+      * image_index - the path to the image index written by process_images,
+        used to give image tags their dimensions and srcset, or None
+      * minify - whether to minify the html of each page and the stylesheets
+      * link_static - whether to hard link static files instead of copying them
+      * extensions - the names of the modules that register parser extensions
+      * highlight - the directory to cache highlighted code in, or None to
+        escape code without highlighting it
+
+    :param settings: The settings to change from their defaults
+    :type settings: dict
+    :returns: The settings, with the default for each setting not given
+    :rtype: dict
+    """
+    unknown = sorted(set(settings) - set(DEFAULT_BUILD_OPTIONS))
+    if unknown:
+        raise TypeError(f"Unknown build options: {', '.join(unknown)}")
+    options = dict(DEFAULT_BUILD_OPTIONS)
+    options.update(settings)
+    options["extensions"] = tuple(options["extensions"])
+    return options
+
+
+def page_job_options(options, profiler=None, site_outputs=None):
+    """Extends the settings of a build with what each page job needs to know
+    about the profiler and site outputs of the build, which stay in the main
+    process
+
+    :param options: The settings of the build, from build_options
+    :type options: dict
+    :param profiler: The profiler the build is recorded against, if any
+    :type profiler: BuildProfiler
+    :param site_outputs: The site outputs pages are added to, if any
+    :type site_outputs: SiteOutputs
+    :returns: The options taken by generate_page_job
+    :rtype: dict
+    """
+    job_options = dict(options)
+    job_options["profile"] = profiler is not None
+    job_options["trace"] = profiler is not None and profiler.events is not None
+    job_options["page_data"] = (
+        site_outputs.page_data if site_outputs is not None else ()
     )
-    markdown_content = open(source_filepath, "r").read()
-    template_content = open(template_path, "r").read()
-    html_content = markdown_to_html_node(markdown_content).to_html()
-    html_markup = template_content.replace(
-        " {{ Title }} ", extract_title(markdown_content)
-    ).replace("{{ Content }}", html_content)
+    job_options["render_cache"] = None
+    if options["render_cache_size"] > 0 or options["render_cache_dir"] is not None:
+        job_options["render_cache"] = (
+            options["render_cache_size"],
+            options["render_cache_dir"],
+        )
+    return job_options
 
-    write_destination(destination_filepath, html_markup)
 
+def run_page_job(source_filepath, options, work):
+    """Runs the work for a single page with the profiler, render cache, image
+    index, highlighter and page data collection requested by the build options,
+    capturing any error so that one broken page does not abort the build
 
-def generate_pages_recursive(content_dir_path, template_path, dest_dir_path):
-    """Generate html pages from a directory of markdown files. This function will
-    recursively process subdirectories.
+    :param source_filepath: The filepath of the page's source markdown file
+    :type source_filepath: str
+    :param options: The options shared by every job in the build, described in
+        generate_page_job
+    :type options: dict
+    :param work: Generates the page, taking no arguments
+    :type work: Callable
+    :returns: A tuple of (result, error, timings, render_counts, page_data),
+        where the result is the value returned by work, or None if it failed
+    :rtype: tuple
+    """
+    profiler = BuildProfiler(options["trace"]) if options["profile"] else None
+    cache = None
+    counts_before = (0, 0, 0)
+    if options["render_cache"] is not None:
+        cache = get_render_cache(*options["render_cache"])
+        counts_before = cache.counts()
+    # worker processes that were not forked from the build import the
+    # extensions themselves
+    load_extensions(options.get("extensions", ()))
+    result = None
+    error = None
+    page_data = None
+    collect = options.get("page_data", ())
+    image_index = None
+    if options.get("image_index") is not None:
+        image_index = get_image_index(options["image_index"])
+    highlighter = None
+    if options.get("highlight") is not None:
+        highlighter = get_highlighter(options["highlight"])
+    with profiling(profiler), render_caching(cache), using_image_index(
+        image_index
+    ), using_highlighter(highlighter), ExitStack() as collection:
+        text = links = None
+        if "text" in collect:
+            text = collection.enter_context(collecting_page_text())
+        if "links" in collect:
+            links = collection.enter_context(collecting_page_links())
+        try:
+            if profiler is None:
+                result = work()
+            else:
+                with profiler.page(source_filepath):
+                    result = work()
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {exception}"
+    if collect and error is None:
+        page_data = {}
+        if text is not None:
+            page_data["text"] = join_page_text(text)
+        if links is not None:
+            page_data["links"] = links
+    render_counts = (0, 0, 0)
+    if cache is not None:
+        render_counts = tuple(
+            after - before for after, before in zip(cache.counts(), counts_before)
+        )
+    timings = None if profiler is None else profiler.to_dict()
+    return result, error, timings, render_counts, page_data
+
+
+def generate_page_job(job):
+    """Runs generate_page for a single job, capturing any error so that one
+    broken page does not abort the build. This function is the unit of work
+    handed to the process pool.
+
+    The options shared by every job in a build are those returned by
+    page_job_options: the settings described in build_options, of which
+    image_index, minify, extensions and highlight are optional here, and:
+      * profile - whether to record the time spent in each stage of the page
+      * trace - whether to record trace events while profiling
+      * render_cache - a tuple of (max_entries, directory) for this process's
+        render cache, or None to render every block
+      * page_data - the data to collect from the page while rendering it,
+        optional: "text" for its plain text, and "links" for the targets of its
+        links and images
+
+    :param job: A tuple of (source_filepath, template_path, destination_filepath,
+        options)
+    :type job: tuple
+    :returns: A tuple of (error, timings, render_counts, page_data). The error is
+        None on success, and otherwise a description of the error. The timings
+        are None unless profiling was requested. The render counts are the render
+        cache lookups made for this page that were served from memory, served
+        from disk and missed. The page data is a dict holding the data that was
+        requested, or None if none was.
+    :rtype: tuple
+    """
+    source_filepath, template_path, destination_filepath, options = job
+    _, error, timings, render_counts, page_data = run_page_job(
+        source_filepath,
+        options,
+        lambda: generate_page(
+            source_filepath,
+            template_path,
+            destination_filepath,
+            options.get("minify", False),
+        ),
+    )
+    return error, timings, render_counts, page_data
+
+
+def render_page_job(job):
+    """Renders the html for a page whose source has already been read, for the
+    asynchronous pipeline, which does the reading and writing itself. This
+    function is the unit of work handed to the render executor.
+
+    :param job: A tuple of (source_filepath, markdown_content, template_path,
+        options), with the options described in generate_page_job
+    :type job: tuple
+    :returns: A tuple of (html, error, timings, render_counts, page_data). The
+        html is None if the page failed to render.
+    :rtype: tuple
+    """
+    source_filepath, markdown_content, template_path, options = job
+    return run_page_job(
+        source_filepath,
+        options,
+        lambda: "".join(
+            render_page(
+                markdown_content.split("\n"),
+                template_path,
+                options.get("minify", False),
+            )
+        ),
+    )
+
+
+def read_source(filepath):
+    """Reads a markdown source file
+
+    :param filepath: The path to the source file
+    :type filepath: str
+    :returns: The content of the file
+    :rtype: str
+    """
+    with open(filepath, "r") as source_file:
+        return source_file.read()
+
+
+async def run_page_pipeline(page_jobs, render_executor, io_executor, max_in_flight):
+    """Generates pages in an asyncio pipeline, so that reading sources, rendering
+    and writing outputs overlap. A fixed number of pages are in flight at once,
+    each one read and written on the I/O executor and rendered on the render
+    executor.
+
+    :param page_jobs: Jobs in the form taken by generate_page_job
+    :type page_jobs: list
+    :param render_executor: The executor pages are rendered on
+    :type render_executor: concurrent.futures.Executor
+    :param io_executor: The executor sources are read and outputs written on
+    :type io_executor: concurrent.futures.Executor
+    :param max_in_flight: The maximum number of pages being generated at once
+    :type max_in_flight: int
+    :returns: A list of results in the form returned by generate_page_job, in the
+        same order as the jobs
+    :rtype: list
+    """
+    loop = asyncio.get_running_loop()
+    results = [None] * len(page_jobs)
+    created_directories = set()
+    remaining = iter(enumerate(page_jobs))
+
+    async def generate_pages():
+        for index, (source_filepath, template_path, destination, options) in remaining:
+            try:
+                markdown_content = await loop.run_in_executor(
+                    io_executor, read_source, source_filepath
+                )
+            except OSError as exception:
+                results[index] = (
+                    f"{type(exception).__name__}: {exception}",
+                    None,
+                    (0, 0, 0),
+                    None,
+                )
+                continue
+
+            html, error, timings, render_counts, page_data = await loop.run_in_executor(
+                render_executor,
+                render_page_job,
+                (source_filepath, markdown_content, template_path, options),
+            )
+            if error is None:
+                try:
+                    await loop.run_in_executor(
+                        io_executor,
+                        write_destination,
+                        destination,
+                        html,
+                        created_directories,
+                    )
+                except OSError as exception:
+                    error = f"{type(exception).__name__}: {exception}"
+                    page_data = None
+            results[index] = (error, timings, render_counts, page_data)
+
+    await asyncio.gather(
+        *(generate_pages() for _ in range(min(max_in_flight, len(page_jobs))))
+    )
+    return results
+
+
+def generate_pages_pipelined(page_jobs, jobs, max_in_flight):
+    """Runs page jobs through the asynchronous pipeline. Pages are rendered in a
+    pool of worker processes when more than one job is requested, and otherwise
+    on a single background thread, since the profiler and render cache are
+    shared by everything rendering in a process.
+
+    :param page_jobs: Jobs in the form taken by generate_page_job
+    :type page_jobs: list
+    :param jobs: The number of worker processes to render pages with
+    :type jobs: int
+    :param max_in_flight: The maximum number of pages being generated at once
+    :type max_in_flight: int
+    :returns: A list of results in the form returned by generate_page_job, in the
+        same order as the jobs
+    :rtype: list
+    """
+    if jobs > 1:
+        render_executor = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        render_executor = ThreadPoolExecutor(max_workers=1)
+    with render_executor, ThreadPoolExecutor(max_workers=max_in_flight) as io_executor:
+        return asyncio.run(
+            run_page_pipeline(page_jobs, render_executor, io_executor, max_in_flight)
+        )
+
+
+def destination_for(filepath, source_dir_path, dest_dir_path, page=False):
+    """Maps a file under a source directory to its output path, the same way
+    collect_pages and copy_static_files do
+
+    :param filepath: The path to the source file
+    :type filepath: str
+    :param source_dir_path: The directory the source file belongs to
+    :type source_dir_path: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param page: Whether the file is a markdown page
+    :type page: bool
+    :returns: The output path
+    :rtype: str
+    """
+    directory, leaf = os.path.split(os.path.relpath(filepath, source_dir_path))
+    if page:
+        leaf = leaf.replace(".md", ".html")
+    return os.path.join(dest_dir_path, directory, leaf)
+
+
+def collect_pages(content_dir_path, dest_dir_path):
+    """Recursively walks a directory of markdown files and pairs each source file
+    with the html file it will be written to
 
     :param content_dir_path: The directory containing the site content
     :type content_dir_path: str
-    :param template_path: The path to the template file used to generate the site
-    :type template_path: str
     :param dest_dir_path: The directory to write the site content to
     :type dest_dir_path: str
-    :returns: Nothing
-    :rtype: None
+    :returns: A sorted list of tuples: (source_filepath, destination_filepath)
+    :rtype: list
     """
-    for leaf in os.listdir(content_dir_path):
+    pages = []
+    for leaf in sorted(os.listdir(content_dir_path)):
         leaf_filepath = os.path.join(content_dir_path, leaf)
         if os.path.isfile(leaf_filepath):
             target_filepath = os.path.join(dest_dir_path, leaf.replace(".md", ".html"))
-            generate_page(leaf_filepath, template_path, target_filepath)
+            pages.append((leaf_filepath, target_filepath))
         else:
             target_filepath = os.path.join(dest_dir_path, leaf)
-            generate_pages_recursive(leaf_filepath, template_path, target_filepath)
+            pages.extend(collect_pages(leaf_filepath, target_filepath))
+    return pages
+
+
+def generate_pages_recursive(
+    content_dir_path,
+    template_path,
+    dest_dir_path,
+    options=None,
+    manifest=None,
+    profiler=None,
+    site_index=None,
+    site_outputs=None,
+    source_filepaths=None,
+):
+    """Generate html pages from a directory of markdown files. This function will
+    recursively process subdirectories, or generate only the given pages.
+
+    When a manifest is provided, pages whose source and template are unchanged
+    since the previous build are skipped. When more than one job is requested,
+    pages are generated in a pool of worker processes. Progress is logged in
+    source order either way, and a page that fails to generate is reported
+    without stopping the rest of the build.
+
+    When an I/O concurrency is given, pages are generated in an asynchronous
+    pipeline that overlaps reading, rendering and writing, with up to that many
+    pages in flight at once. Otherwise each page is streamed from its source to
+    its output in turn.
+
+    Blocks are rendered through a render cache in each process when a size or
+    directory is given for it, and the cache's hit rate is logged at the end.
+
+    When a highlight cache directory is given, each process highlights the code
+    blocks of the pages it renders through a highlighter that caches the html
+    for each block in that directory, so a block is only highlighted once.
+
+    When a site index is provided, pages are rendered with the template named in
+    their front matter, and pages marked as drafts are skipped unless drafts are
+    included.
+
+    When site outputs are provided, every page, including those skipped as
+    unchanged, is added to them in source order as its result comes in, with
+    the plain text collected while rendering it.
+
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :param template_path: The path to the template file used to generate the site
+    :type template_path: str
+    :param dest_dir_path: The directory to write the site content to
+    :type dest_dir_path: str
+    :param options: The settings of the build, described in build_options.
+        Settings that are not given take their defaults.
+    :type options: dict
+    :param manifest: The manifest used to skip unchanged pages
+    :type manifest: BuildManifest
+    :param profiler: The profiler to record the time spent on each page against
+    :type profiler: BuildProfiler
+    :param site_index: The index holding the metadata of every page
+    :type site_index: SiteIndex
+    :param site_outputs: The sitemap, feeds, search index and link check to add
+        pages to
+    :type site_outputs: SiteOutputs
+    :param source_filepaths: The sources of the pages to generate, or None to
+        generate every page in the content directory
+    :type source_filepaths: Iterable[str]
+    :returns: A list of tuples for the pages that failed: (source_filepath, error)
+    :rtype: list
+    """
+    options = build_options(**(options or {}))
+    jobs = options["jobs"]
+    parser_digest = get_parser().digest
+    image_index_hash = None
+    if options["image_index"] is not None:
+        image_index_hash = get_image_index(options["image_index"]).digest
+    highlight_hash = None
+    if options["highlight"] is not None:
+        highlight_hash = highlight_digest()
+    if source_filepaths is None:
+        sources = collect_pages(content_dir_path, dest_dir_path)
+    else:
+        # the content directory is not walked for a handful of pages
+        sources = [
+            (source, destination_for(source, content_dir_path, dest_dir_path, True))
+            for source in sorted(set(source_filepaths))
+        ]
+    pages = []
+    for source_filepath, destination_filepath in sources:
+        page_template_path = template_path
+        if site_index is not None:
+            if site_index.is_draft(source_filepath) and not options["include_drafts"]:
+                continue
+            page_template_path = site_index.template(source_filepath, template_path)
+
+        entry = None
+        if manifest is not None:
+            with profile_stage("manifest"):
+                try:
+                    entry = {
+                        "hash": hash_file(source_filepath),
+                        "template": manifest.hash_template(page_template_path),
+                        "output": destination_filepath,
+                    }
+                except OSError:
+                    # a missing template is reported when the page fails
+                    entry = None
+                if entry is not None and site_outputs is not None:
+                    # pages built without collecting the data the site outputs
+                    # need are rebuilt once they are enabled
+                    entry["page_data"] = ",".join(site_outputs.page_data)
+                if entry is not None:
+                    # pages are rebuilt whenever the images they may show change,
+                    # when minification or highlighting is turned on or off, and
+                    # when the parser's rules change
+                    entry["images"] = image_index_hash
+                    entry["minify"] = options["minify"]
+                    entry["parser"] = parser_digest
+                    entry["highlight"] = highlight_hash
+                if entry is not None and manifest.is_current(
+                    "pages", source_filepath, entry
+                ):
+                    manifest.record("pages", source_filepath, entry)
+                    pages.append(
+                        (source_filepath, destination_filepath, None, None, True)
+                    )
+                    continue
+        pages.append(
+            (source_filepath, destination_filepath, entry, page_template_path, False)
+        )
+
+    job_options = page_job_options(options, profiler, site_outputs)
+    page_jobs = [
+        (source, page_template_path, destination, job_options)
+        for source, destination, _, page_template_path, skipped in pages
+        if not skipped
+    ]
+    if options["highlight"] is not None and page_jobs and pygments is None:
+        print("highlighting: Pygments is not installed, code is not highlighted")
+    executor = None
+    if options["io_concurrency"] > 0 and page_jobs:
+        results = generate_pages_pipelined(page_jobs, jobs, options["io_concurrency"])
+    elif jobs > 1 and len(page_jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(
+            generate_page_job,
+            page_jobs,
+            chunksize=max(1, len(page_jobs) // (jobs * 4)),
+        )
+    else:
+        results = map(generate_page_job, page_jobs)
+
+    failures = []
+    render_counts = [0, 0, 0]
+    try:
+        results = iter(results)
+        for page in pages:
+            (
+                source_filepath,
+                destination_filepath,
+                entry,
+                page_template_path,
+                skipped,
+            ) = page
+            page_data = None
+            if not skipped:
+                error, timings, page_render_counts, page_data = next(results)
+                for index, count in enumerate(page_render_counts):
+                    render_counts[index] += count
+                if timings is not None:
+                    profiler.merge(timings)
+                print(
+                    f"generating page: {source_filepath} -> {destination_filepath} using {page_template_path}"
+                )
+                if error is not None:
+                    print(f"error: {source_filepath}: {error}")
+                    failures.append((source_filepath, error))
+                    if manifest is not None:
+                        manifest.keep_previous("pages", source_filepath)
+                elif manifest is not None:
+                    manifest.record("pages", source_filepath, entry)
+
+            # a page that failed is listed with its previous data for as long as
+            # its previous output remains
+            if site_outputs is not None and (
+                page_data is not None or os.path.exists(destination_filepath)
+            ):
+                metadata = {}
+                page_id = None
+                if site_index is not None:
+                    metadata = site_index.metadata(source_filepath)
+                    page_id = site_index.page_id(source_filepath)
+                site_outputs.add_page(
+                    source_filepath, destination_filepath, metadata, page_data, page_id
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if job_options["render_cache"] is not None and page_jobs:
+        print(format_render_cache_counts(render_counts))
+    return failures
@@ -0,0 +1,295 @@
+import json
+import os
+from src.build_manifest import atomic_write
+from src.front_matter_functions import split_front_matter
+from src.markdown_block_functions import iter_markdown_blocks
+from src.site_generation_functions import (
+    collect_pages,
+    destination_for,
+    extract_title,
+)
+
+
+def read_page_metadata(source_filepath):
+    """Reads the metadata of a page without reading its body: the front matter,
+    and the heading 1 from the first block when the front matter has no title
+
+    :param source_filepath: The filepath of the page's source markdown file
+    :type source_filepath: str
+    :returns: The page's metadata
+    :rtype: dict
+    """
+    with open(source_filepath, "r") as source_file:
+        metadata, body_lines = split_front_matter(source_file)
+        if "title" not in metadata:
+            try:
+                metadata["title"] = extract_title(
+                    next(iter_markdown_blocks(body_lines), "")
+                )
+            except ValueError:
+                pass
+    return metadata
+
+
+def page_url(destination_filepath, dest_dir_path):
+    """Returns the site relative url a page is served from
+
+    :param destination_filepath: The filepath the page is written to
+    :type destination_filepath: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :returns: The url of the page, with index pages served from their directory
+    :rtype: str
+    """
+    path = os.path.relpath(destination_filepath, dest_dir_path).replace(os.sep, "/")
+    if path == "index.html":
+        return "/"
+    if path.endswith("/index.html"):
+        return f"/{path.removesuffix('index.html')}"
+    return f"/{path}"
+
+
+def page_tags(metadata):
+    """Returns the tags in a page's front matter, given either as a list or as a
+    comma separated string
+
+    :param metadata: The page's metadata
+    :type metadata: dict
+    :returns: The page's tags
+    :rtype: list
+    """
+    tags = metadata.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    return [str(tag) for tag in tags]
+
+
+class SiteIndex:
+    """Holds the metadata of every page on the site, so that listings, feeds and
+    navigation can be built without reparsing page bodies. The index is
+    persisted between builds, and a page's metadata is only read again when its
+    size or modification time changes.
+
+    Each page maps its source path to an entry containing the source's size and
+    modification time, the output path and url of the page, the metadata read
+    from its front matter, and an id that stays the same for as long as the page
+    exists, for outputs such as the search index that refer to pages by number.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.pages = self.load(index_path)
+        # the sources of the pages in each directory, built when first needed
+        self.directories = None
+
+    @staticmethod
+    def load(index_path):
+        """Loads an index from disk. A missing or unreadable index is treated as
+        an empty one, which results in every page's metadata being read.
+
+        :param index_path: The path to the index file
+        :type index_path: str
+        :returns: A dict of source path to page entry
+        :rtype: dict
+        """
+        try:
+            with open(index_path, "r") as index_file:
+                return json.load(index_file).get("pages", {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def update(self, content_dir_path, dest_dir_path):
+        """Brings the index up to date with a directory of markdown files,
+        reading the metadata of new and changed pages and dropping pages whose
+        source was removed
+
+        :param content_dir_path: The directory containing the site content
+        :type content_dir_path: str
+        :param dest_dir_path: The directory the site is written to
+        :type dest_dir_path: str
+        :returns: The number of pages whose metadata was read
+        :rtype: int
+        """
+        previous = self.pages
+        self.pages = {}
+        self.directories = None
+        next_id = self.next_id(previous)
+        read = 0
+        for source_filepath, destination_filepath in collect_pages(
+            content_dir_path, dest_dir_path
+        ):
+            entry, changed = self.refresh(
+                source_filepath,
+                previous.get(source_filepath),
+                destination_filepath,
+                dest_dir_path,
+            )
+            read += changed
+            if "id" not in entry:
+                entry["id"] = next_id
+                next_id += 1
+            self.pages[source_filepath] = entry
+        return read
+
+    def update_pages(self, source_filepaths, content_dir_path, dest_dir_path):
+        """Brings the entries of the given pages up to date, without walking the
+        rest of the content directory: pages that exist are read again if they
+        changed, and pages that do not are dropped
+
+        :param source_filepaths: The sources of the pages that were created,
+            modified or removed
+        :type source_filepaths: Iterable[str]
+        :param content_dir_path: The directory containing the site content
+        :type content_dir_path: str
+        :param dest_dir_path: The directory the site is written to
+        :type dest_dir_path: str
+        :returns: The number of pages whose metadata was read
+        :rtype: int
+        """
+        next_id = None
+        read = 0
+        directories = self.pages_by_directory()
+        for source_filepath in source_filepaths:
+            directory = os.path.dirname(source_filepath)
+            if not os.path.isfile(source_filepath):
+                if self.pages.pop(source_filepath, None) is not None:
+                    del directories[directory][source_filepath]
+                    if not directories[directory]:
+                        del directories[directory]
+                continue
+            directories.setdefault(directory, {})[source_filepath] = None
+            entry, changed = self.refresh(
+                source_filepath,
+                self.pages.get(source_filepath),
+                destination_for(source_filepath, content_dir_path, dest_dir_path, True),
+                dest_dir_path,
+            )
+            read += changed
+            if "id" not in entry:
+                if next_id is None:
+                    next_id = self.next_id(self.pages)
+                entry["id"] = next_id
+                next_id += 1
+            self.pages[source_filepath] = entry
+        return read
+
+    def pages_by_directory(self):
+        """Groups the pages by the directory their source is in, so that the
+        pages of a section can be found without going through every page
+
+        :returns: A dict of directory to a dict whose keys are the sources of
+            the pages in it
+        :rtype: dict
+        """
+        if self.directories is None:
+            self.directories = {}
+            for source_filepath in self.pages:
+                directory = os.path.dirname(source_filepath)
+                self.directories.setdefault(directory, {})[source_filepath] = None
+        return self.directories
+
+    @staticmethod
+    def next_id(pages):
+        return 1 + max((entry.get("id", -1) for entry in pages.values()), default=-1)
+
+    @staticmethod
+    def refresh(source_filepath, entry, destination_filepath, dest_dir_path):
+        """Returns the entry of a page, reading its metadata again unless its
+        size and modification time match its previous entry. A new page is left
+        without an id for the caller to assign.
+
+        :param source_filepath: The filepath of the page's source markdown file
+        :type source_filepath: str
+        :param entry: The page's previous entry, or None
+        :type entry: dict
+        :param destination_filepath: The filepath the page is written to
+        :type destination_filepath: str
+        :param dest_dir_path: The directory the site is written to
+        :type dest_dir_path: str
+        :returns: A tuple of (entry, whether the metadata was read)
+        :rtype: tuple
+        """
+        stat = os.stat(source_filepath)
+        changed = (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        )
+        if changed:
+            try:
+                metadata = read_page_metadata(source_filepath)
+            except (OSError, ValueError):
+                # the error is reported when the page fails to generate
+                metadata = {}
+            previous_id = None if entry is None else entry.get("id")
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            entry["metadata"] = metadata
+            if previous_id is not None:
+                entry["id"] = previous_id
+        entry["output"] = destination_filepath
+        entry["url"] = page_url(destination_filepath, dest_dir_path)
+        return entry, changed
+
+    def metadata(self, source_filepath):
+        """Returns the metadata of a page, or an empty dict for a page that is not
+        in the index"""
+        entry = self.pages.get(source_filepath)
+        return {} if entry is None else entry["metadata"]
+
+    def page_id(self, source_filepath):
+        """Returns the stable id of a page, or None for a page that is not in the
+        index"""
+        entry = self.pages.get(source_filepath)
+        return None if entry is None else entry["id"]
+
+    def is_draft(self, source_filepath):
+        """Returns True if a page is marked as a draft in its front matter"""
+        return self.metadata(source_filepath).get("draft") is True
+
+    def template(self, source_filepath, default_template_path):
+        """Returns the template a page is rendered with: the template named in its
+        front matter, or the default template"""
+        return self.metadata(source_filepath).get("template") or default_template_path
+
+    def templates(self, default_template_path):
+        """Returns every template the pages on the site are rendered with, so
+        that a change to any of them can be traced to the pages using it
+
+        :param default_template_path: The template of pages that do not name one
+        :type default_template_path: str
+        :returns: The paths of the templates
+        :rtype: set
+        """
+        templates = {default_template_path}
+        for source_filepath in self.pages:
+            templates.add(self.template(source_filepath, default_template_path))
+        return templates
+
+    def tags(self, include_drafts=False):
+        """Groups the pages on the site by tag
+
+        :param include_drafts: Whether to include pages marked as drafts
+        :type include_drafts: bool
+        :returns: A dict of tag to a sorted list of the source paths of the pages
+            with that tag, sorted by tag
+        :rtype: dict
+        """
+        tags = {}
+        for source_filepath in sorted(self.pages):
+            if self.is_draft(source_filepath) and not include_drafts:
+                continue
+            for tag in page_tags(self.metadata(source_filepath)):
+                tags.setdefault(tag, []).append(source_filepath)
+        return dict(sorted(tags.items()))
+
+    def save(self):
+        """Writes the index to disk, replacing the previous index atomically
+
+        :returns: Nothing
+        :rtype: None
+        """
+        with atomic_write(self.index_path) as index_file:
+            json.dump({"pages": self.pages}, index_file, indent=1, sort_keys=True)
+
+    def __repr__(self):
+        return f"SiteIndex({self.index_path}, pages: {len(self.pages)})"
@@ -0,0 +1,496 @@
+import heapq
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from src.link_checker import LinkGraph
+from src.search_index import SearchIndexBuilder
+from src.site_index import page_url
+
+SITEMAP_NAME = "sitemap.xml"
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+RSS_NAME = "rss.xml"
+ATOM_NAME = "atom.xml"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+FEED_SUMMARY_LENGTH = 280
+
+
+def parse_page_date(value):
+    """Parses a date from a page's front matter
+
+    :param value: An ISO 8601 date or date and time
+    :type value: str
+    :returns: The date as a timezone aware datetime, in UTC when no timezone is
+        given, or None if the value is not a valid date
+    :rtype: datetime
+    """
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def page_summary(metadata, text, length=FEED_SUMMARY_LENGTH):
+    """Returns the summary of a page for a feed: the description or summary in
+    its front matter, or the start of its text, cut at a word boundary
+
+    :param metadata: The page's metadata
+    :type metadata: dict
+    :param text: The plain text of the page
+    :type text: str
+    :param length: The maximum length of a summary taken from the text
+    :type length: int
+    :returns: The summary
+    :rtype: str
+    """
+    summary = metadata.get("description") or metadata.get("summary")
+    if summary:
+        return str(summary)
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def xml_escape(value):
+    """Escapes text for use in xml content and double quoted attributes"""
+    return escape(str(value), {'"': "&quot;"})
+
+
+class OutputFile:
+    """A file that is written to a temporary path as it is produced, and only
+    replaces its destination once it is committed, so an interrupted build never
+    leaves a truncated output behind. Committing the file logs it.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.temporary_filepath = f"{filepath}.{os.getpid()}.tmp"
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.temporary_filepath, "w", encoding="utf-8")
+
+    def write(self, text):
+        self.file.write(text)
+
+    def commit(self, filepath=None):
+        """Closes the file and moves it into place
+
+        :param filepath: The path to move the file to, defaults to the path it
+            was opened for
+        :type filepath: str
+        :returns: The path the file was written to
+        :rtype: str
+        """
+        self.file.close()
+        filepath = filepath or self.filepath
+        os.replace(self.temporary_filepath, filepath)
+        print(f"writing: {filepath}")
+        return filepath
+
+    def discard(self):
+        """Closes the file and removes it, leaving the destination untouched"""
+        self.file.close()
+        if os.path.exists(self.temporary_filepath):
+            os.remove(self.temporary_filepath)
+
+
+class SitemapWriter:
+    """Streams the urls of a site into sitemap.xml. A sitemap may hold at most
+    50,000 urls and 50 MiB, so once either limit is reached the urls are split
+    across sitemap-N.xml files, and sitemap.xml becomes an index of them.
+    """
+
+    def __init__(
+        self,
+        dest_dir_path,
+        base_url,
+        max_urls=SITEMAP_MAX_URLS,
+        max_bytes=SITEMAP_MAX_BYTES,
+    ):
+        self.dest_dir_path = dest_dir_path
+        self.base_url = base_url.rstrip("/")
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.parts = []
+        self.part = None
+        self.part_urls = 0
+        self.part_bytes = 0
+
+    def part_path(self, number):
+        return os.path.join(self.dest_dir_path, f"sitemap-{number}.xml")
+
+    def start_part(self):
+        header = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+        )
+        self.part = OutputFile(self.part_path(len(self.parts) + 1))
+        self.part.write(header)
+        self.parts.append(self.part)
+        self.part_urls = 0
+        self.part_bytes = len(header) + len("</urlset>\n")
+
+    def add(self, url, lastmod=None):
+        """Adds a page to the sitemap
+
+        :param url: The site relative url of the page
+        :type url: str
+        :param lastmod: When the page was last modified, or None
+        :type lastmod: datetime
+        :returns: Nothing
+        :rtype: None
+        """
+        line = f"<url><loc>{xml_escape(self.base_url + url)}</loc>"
+        if lastmod is not None:
+            line += f"<lastmod>{lastmod.isoformat()}</lastmod>"
+        line += "</url>\n"
+        size = len(line.encode())
+        if (
+            self.part is None
+            or self.part_urls == self.max_urls
+            or self.part_bytes + size > self.max_bytes
+        ):
+            if self.part is not None:
+                self.part.write("</urlset>\n")
+            self.start_part()
+        self.part.write(line)
+        self.part_urls += 1
+        self.part_bytes += size
+
+    def close(self, manifest=None):
+        """Finishes the sitemap, writing an index of its parts when the urls did
+        not fit in a single sitemap
+
+        :param manifest: The manifest of the current build, unused
+        :type manifest: BuildManifest
+        :returns: The manifest entries of the files written
+        :rtype: list
+        """
+        if self.part is None:
+            self.start_part()
+        self.part.write("</urlset>\n")
+
+        sitemap_path = os.path.join(self.dest_dir_path, SITEMAP_NAME)
+        if len(self.parts) == 1:
+            return [{"output": self.parts[0].commit(sitemap_path)}]
+
+        outputs = [part.commit() for part in self.parts]
+        index = OutputFile(sitemap_path)
+        index.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+        )
+        for number in range(1, len(self.parts) + 1):
+            location = f"{self.base_url}/{os.path.basename(self.part_path(number))}"
+            index.write(f"<sitemap><loc>{xml_escape(location)}</loc></sitemap>\n")
+        index.write("</sitemapindex>\n")
+        outputs.append(index.commit())
+        return [{"output": output} for output in outputs]
+
+    def discard(self):
+        for part in self.parts:
+            part.discard()
+
+
+class FeedWriter:
+    """Collects the newest dated pages of a site and writes them as RSS and Atom
+    feeds. Only the entries that will appear in the feeds are held in memory.
+    """
+
+    def __init__(self, dest_dir_path, base_url, title, max_entries=20):
+        self.dest_dir_path = dest_dir_path
+        self.base_url = base_url.rstrip("/")
+        self.title = title
+        self.max_entries = max_entries
+        self.entries = []
+
+    def add(self, url, title, metadata, text):
+        """Offers a page to the feeds. Pages without a valid date are left out.
+
+        :param url: The site relative url of the page
+        :type url: str
+        :param title: The title of the page
+        :type title: str
+        :param metadata: The page's metadata
+        :type metadata: dict
+        :param text: The plain text of the page
+        :type text: str
+        :returns: Nothing
+        :rtype: None
+        """
+        date = parse_page_date(metadata.get("date"))
+        if date is None or self.max_entries < 1:
+            return
+        entry = (date, url, title, page_summary(metadata, text))
+        if len(self.entries) < self.max_entries:
+            heapq.heappush(self.entries, entry)
+        elif entry > self.entries[0]:
+            heapq.heapreplace(self.entries, entry)
+
+    def write_rss(self, entries):
+        feed = OutputFile(os.path.join(self.dest_dir_path, RSS_NAME))
+        feed.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<rss version="2.0" xmlns:atom="{ATOM_NAMESPACE}">\n<channel>\n'
+            f"<title>{xml_escape(self.title)}</title>\n"
+            f"<link>{xml_escape(self.base_url)}/</link>\n"
+            f"<description>{xml_escape(self.title)}</description>\n"
+            f'<atom:link href="{xml_escape(self.base_url)}/{RSS_NAME}" rel="self" '
+            'type="application/rss+xml"/>\n'
+        )
+        if entries:
+            feed.write(
+                f"<lastBuildDate>{format_datetime(entries[0][0])}</lastBuildDate>\n"
+            )
+        for date, url, title, summary in entries:
+            link = xml_escape(self.base_url + url)
+            feed.write(
+                f"<item><title>{xml_escape(title)}</title><link>{link}</link>"
+                f"<guid>{link}</guid><pubDate>{format_datetime(date)}</pubDate>"
+                f"<description>{xml_escape(summary)}</description></item>\n"
+            )
+        feed.write("</channel>\n</rss>\n")
+        return feed.commit()
+
+    def write_atom(self, entries):
+        updated = entries[0][0] if entries else datetime.fromtimestamp(0, timezone.utc)
+        feed = OutputFile(os.path.join(self.dest_dir_path, ATOM_NAME))
+        feed.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<feed xmlns="{ATOM_NAMESPACE}">\n'
+            f"<title>{xml_escape(self.title)}</title>\n"
+            f'<link href="{xml_escape(self.base_url)}/"/>\n'
+            f'<link href="{xml_escape(self.base_url)}/{ATOM_NAME}" rel="self"/>\n'
+            f"<id>{xml_escape(self.base_url)}/</id>\n"
+            f"<updated>{updated.isoformat()}</updated>\n"
+        )
+        for date, url, title, summary in entries:
+            link = xml_escape(self.base_url + url)
+            feed.write(
+                f'<entry><title>{xml_escape(title)}</title><link href="{link}"/>'
+                f"<id>{link}</id><updated>{date.isoformat()}</updated>"
+                f"<summary>{xml_escape(summary)}</summary></entry>\n"
+            )
+        feed.write("</feed>\n")
+        return feed.commit()
+
+    def close(self, manifest=None):
+        """Writes the feeds, newest entry first
+
+        :param manifest: The manifest of the current build, unused
+        :type manifest: BuildManifest
+        :returns: The manifest entries of the files written
+        :rtype: list
+        """
+        entries = sorted(self.entries, reverse=True)
+        return [
+            {"output": self.write_rss(entries)},
+            {"output": self.write_atom(entries)},
+        ]
+
+    def discard(self):
+        self.entries = []
+
+
+class PageDataStore:
+    """Keeps the plain text and links of every page between builds, so the
+    outputs that need them can still be written in full when unchanged pages
+    are skipped.
+
+    The store is a file of JSON lines in source order. The previous build's
+    store is streamed alongside the pages of this build, and the new store is
+    streamed out as pages are added, so neither is held in memory.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.previous_records = self.read_records(store_path)
+        self.previous_record = next(self.previous_records, None)
+        self.output = OutputFile(store_path)
+
+    @staticmethod
+    def read_records(store_path):
+        try:
+            with open(store_path, "r", encoding="utf-8") as store_file:
+                for line in store_file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        return
+        except OSError:
+            return
+
+    @staticmethod
+    def source_key(source_filepath):
+        # pages are collected in sorted order one directory level at a time, so
+        # paths compare component by component rather than character by character
+        return source_filepath.split(os.sep)
+
+    def previous(self, source_filepath):
+        """Returns the data stored for a page on the previous build. Pages must
+        be looked up in the order collect_pages returns them.
+
+        :param source_filepath: The filepath of the page's source markdown file
+        :type source_filepath: str
+        :returns: A dict of the page's "text" and "links", or None if it was not
+            stored
+        :rtype: dict
+        """
+        key = self.source_key(source_filepath)
+        while (
+            self.previous_record is not None
+            and self.source_key(self.previous_record["source"]) < key
+        ):
+            self.previous_record = next(self.previous_records, None)
+        if (
+            self.previous_record is None
+            or self.previous_record["source"] != source_filepath
+        ):
+            return None
+        return self.previous_record
+
+    def add(self, source_filepath, text, links):
+        record = json.dumps({"source": source_filepath, "text": text, "links": links})
+        self.output.write(f"{record}\n")
+
+    def close(self):
+        self.previous_records.close()
+        self.output.commit()
+
+    def discard(self):
+        self.previous_records.close()
+        self.output.discard()
+
+
+class SiteOutputs:
+    """Produces the sitemap, the RSS and Atom feeds, and the search index from
+    the pages of a build as they are generated, and checks their links, so none
+    of them needs a second pass over the generated site. The sitemap and feeds
+    are written when a base url is given, and the search index and link check
+    when they are requested.
+
+    Pages must be added in the order collect_pages returns them, including the
+    pages skipped as unchanged, whose text and links are carried over from the
+    previous build.
+    """
+
+    def __init__(
+        self,
+        dest_dir_path,
+        store_path,
+        base_url=None,
+        title="",
+        search_index=False,
+        feed_size=20,
+        check_links=False,
+    ):
+        self.dest_dir_path = dest_dir_path
+        self.writers = []
+        self.sitemap = None
+        self.feeds = None
+        self.search_index = None
+        if base_url:
+            self.sitemap = SitemapWriter(dest_dir_path, base_url)
+            self.feeds = FeedWriter(dest_dir_path, base_url, title, feed_size)
+            self.writers.extend((self.sitemap, self.feeds))
+        if search_index:
+            self.search_index = SearchIndexBuilder(dest_dir_path)
+            self.writers.append(self.search_index)
+        self.link_graph = None
+        self.link_problems = None
+        # the data collected from each page as it is rendered
+        self.page_data = ("text",)
+        if check_links:
+            self.link_graph = LinkGraph()
+            self.page_data = ("links", "text")
+        self.page_data_store = PageDataStore(store_path)
+        self.pages = 0
+
+    def add_page(
+        self,
+        source_filepath,
+        destination_filepath,
+        metadata,
+        page_data=None,
+        page_id=None,
+    ):
+        """Adds a page to each of the outputs
+
+        :param source_filepath: The filepath of the page's source markdown file
+        :type source_filepath: str
+        :param destination_filepath: The filepath the page is written to
+        :type destination_filepath: str
+        :param metadata: The page's metadata
+        :type metadata: dict
+        :param page_data: The data collected from the page as it was rendered,
+            or None to use the data stored on the previous build
+        :type page_data: dict
+        :param page_id: The page's stable id from the site index, or None to
+            number pages in the order they are added
+        :type page_id: int
+        :returns: Nothing
+        :rtype: None
+        """
+        if page_data is None:
+            page_data = self.page_data_store.previous(source_filepath) or {}
+        text = page_data.get("text", "")
+        links = page_data.get("links", [])
+        self.page_data_store.add(source_filepath, text, links)
+
+        url = page_url(destination_filepath, self.dest_dir_path)
+        title = str(metadata.get("title", url))
+        if self.sitemap is not None:
+            lastmod = parse_page_date(metadata.get("updated", metadata.get("date")))
+            self.sitemap.add(url, lastmod)
+            self.feeds.add(url, title, metadata, text)
+        if self.search_index is not None:
+            self.search_index.add(url, title, text, page_id)
+        if self.link_graph is not None:
+            self.link_graph.add_page(url, links)
+        self.pages += 1
+
+    def close(self, manifest=None):
+        """Finishes every output, recording them in the manifest so they are
+        removed if they stop being produced. Links are checked against every
+        output recorded in the manifest, or every file in the site without one,
+        so this must be called once the rest of the site has been generated.
+
+        :param manifest: The manifest of the current build
+        :type manifest: BuildManifest
+        :returns: The paths written
+        :rtype: list
+        """
+        outputs = []
+        for writer in self.writers:
+            for entry in writer.close(manifest):
+                outputs.append(entry["output"])
+                if manifest is not None:
+                    manifest.record("outputs", entry["output"], entry)
+        self.page_data_store.close()
+        if self.link_graph is not None:
+            if manifest is not None:
+                built = manifest.current_outputs()
+            else:
+                built = {
+                    os.path.join(directory, filename)
+                    for directory, _, filenames in os.walk(self.dest_dir_path)
+                    for filename in filenames
+                }
+            self.link_problems = self.link_graph.report(built, self.dest_dir_path)
+        return outputs
+
+    def discard(self):
+        """Abandons every output, leaving the previous versions in place"""
+        for writer in self.writers:
+            writer.discard()
+        self.page_data_store.discard()
+
+    def __repr__(self):
+        return f"SiteOutputs({self.dest_dir_path}, pages: {self.pages})"
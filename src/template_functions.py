@@ -0,0 +1,101 @@
+import os
+import re
+from src.minify_functions import minify_template
+
+TEMPLATE_SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# compiled templates, keyed by path and whether they were minified, along with
+# the mtime they were compiled at
+template_cache = {}
+
+
+def compile_template(template_content):
+    """Takes the content of a template and splits it into literal segments and
+    named slots, such as `{{ Title }}` and `{{ Content }}`
+
+    :param template_content: The content of a template file
+    :type template_content: str
+    :returns: A list alternating between literal text and slot names, starting
+        and ending with literal text: [literal, slot, literal, ..., literal]
+    :rtype: list
+    """
+    return TEMPLATE_SLOT_PATTERN.split(template_content)
+
+
+def load_template(template_path, minify=False):
+    """Returns the compiled template for a template file. Each template is only
+    read and compiled again when its modification time changes.
+
+    :param template_path: The path to the template file
+    :type template_path: str
+    :param minify: Whether to minify the template's literal html
+    :type minify: bool
+    :returns: A compiled template
+    :rtype: list
+    """
+    modified = os.stat(template_path).st_mtime_ns
+    cached = template_cache.get((template_path, minify))
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+
+    with open(template_path, "r") as template_file:
+        compiled_template = compile_template(template_file.read())
+    if minify:
+        compiled_template = minify_template(compiled_template)
+    template_cache[(template_path, minify)] = (modified, compiled_template)
+    return compiled_template
+
+
+def metadata_values(metadata):
+    """Turns the metadata from a page's front matter into values for the slots
+    of a template, so that a template can show any front matter variable, such
+    as `{{ date }}` or `{{ tags }}`
+
+    :param metadata: The page's metadata
+    :type metadata: dict
+    :returns: The text of each value, keyed by its name, with lists joined by
+        commas
+    :rtype: dict
+    """
+    values = {}
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        values[key] = str(value)
+    return values
+
+
+def iter_template(compiled_template, values):
+    """Fills the slots of a compiled template, yielding the result as a sequence
+    of string chunks. A slot value may be a string, or an iterable of string
+    chunks which is consumed lazily. Slots without a value are left empty.
+
+    :param compiled_template: A template compiled with compile_template
+    :type compiled_template: list
+    :param values: The values to fill each slot with, keyed by slot name
+    :type values: dict
+    :returns: A generator of string chunks
+    :rtype: Generator[str]
+    """
+    for index, segment in enumerate(compiled_template):
+        if index % 2 == 0:
+            yield segment
+            continue
+        value = values.get(segment, "")
+        if isinstance(value, str):
+            yield value
+        else:
+            yield from value
+
+
+def render_template(compiled_template, values):
+    """Fills the slots of a compiled template and returns the result
+
+    :param compiled_template: A template compiled with compile_template
+    :type compiled_template: list
+    :param values: The values to fill each slot with, keyed by slot name
+    :type values: dict
+    :returns: The rendered template
+    :rtype: str
+    """
+    return "".join(iter_template(compiled_template, values))
@@ -0,0 +1,628 @@
+import ctypes
+import os
+import select
+import struct
+import time
+from src.build_manifest import BuildManifest
+from src.listing_functions import affected_listings, generate_listings
+from src.server_functions import LiveReload, start_live_reload_server
+from src.site_index import SiteIndex
+from src.site_generation_functions import (
+    build_options,
+    collect_pages,
+    copy_static_file,
+    destination_for,
+    generate_pages_recursive,
+    remove_orphaned_outputs,
+    static_file_entry,
+)
+
+try:
+    inotify = ctypes.CDLL(None, use_errno=True)
+    inotify.inotify_init1
+except (OSError, AttributeError, TypeError):
+    inotify = None
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+# struct inotify_event, followed by a name of the given length
+EVENT_HEADER = struct.Struct("iIII")
+
+# how long to wait for further events after one arrives before rebuilding
+WATCH_SETTLE_SECONDS = 0.01
+
+
+def snapshot_files(paths):
+    """Records the modification time and size of every file under the given
+    paths. Hidden files and directories, such as editor swap files, are ignored.
+
+    :param paths: The files and directories to record
+    :type paths: list
+    :returns: A dict of filepath to (mtime_ns, size)
+    :rtype: dict
+    """
+    snapshot = {}
+    directories = []
+    for path in paths:
+        if os.path.isdir(path):
+            directories.append(path)
+        elif os.path.isfile(path):
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    directories.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(previous, current):
+    """Compares two snapshots taken with snapshot_files
+
+    :param previous: The earlier snapshot
+    :type previous: dict
+    :param current: The later snapshot
+    :type current: dict
+    :returns: A tuple of sorted lists: (changed_filepaths, removed_filepaths)
+    :rtype: tuple
+    """
+    changed = sorted(
+        filepath
+        for filepath, signature in current.items()
+        if previous.get(filepath) != signature
+    )
+    removed = sorted(filepath for filepath in previous if filepath not in current)
+    return changed, removed
+
+
+class InotifyWatcher:
+    """Watches files and directories with inotify, so that only the paths the
+    kernel reports as changed are looked at, rather than the whole tree on every
+    poll. Directories are watched recursively, and a file is watched through its
+    parent directory.
+
+    The snapshot taken when watching starts is kept up to date incrementally
+    from the events, so changes are reported the same way snapshot_files and
+    diff_snapshots report them. If the kernel's event queue overflows, the
+    watched paths are snapshotted again in full.
+    """
+
+    def __init__(self, paths):
+        self.fd = inotify.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # watch descriptor to the directory it watches, and whether it is
+        # watched recursively or only for the files named in self.files
+        self.directories = {}
+        self.files = set()
+        self.paths = []
+        self.snapshot = {}
+        self.dirty = set()
+        self.watch(paths)
+        self.snapshot = snapshot_files(self.paths)
+        self.dirty.clear()
+
+    def add_watch(self, directory, recursive):
+        wd = inotify.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), directory)
+        _, watched_recursively = self.directories.get(wd, (directory, False))
+        self.directories[wd] = (directory, recursive or watched_recursively)
+
+    def add_tree(self, directory):
+        directories = [directory]
+        while directories:
+            directory = directories.pop()
+            self.add_watch(directory, True)
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        directories.append(entry.path)
+                    elif entry.is_file():
+                        self.dirty.add(entry.path)
+
+    def watch(self, paths):
+        """Starts watching the given paths that are not watched yet. The files
+        found in newly watched directories are reported as changed by the next
+        call to changes, unless the watcher was only just created.
+
+        :param paths: The files and directories to watch
+        :type paths: list
+        :returns: Nothing
+        :rtype: None
+        """
+        for path in paths:
+            if path in self.paths:
+                continue
+            if os.path.isdir(path):
+                self.add_tree(path)
+            elif os.path.isfile(path):
+                self.files.add(path)
+                self.add_watch(os.path.dirname(path) or ".", False)
+                self.dirty.add(path)
+            else:
+                continue
+            self.paths.append(path)
+
+    def read_events(self, timeout):
+        """Waits up to a timeout for events, and marks the paths they name as
+        changed
+
+        :param timeout: The number of seconds to wait, or None to wait for as
+            long as it takes
+        :type timeout: float
+        :returns: True if any events were read
+        :rtype: bool
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[
+                offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length
+            ]
+            offset += EVENT_HEADER.size + length
+            self.handle_event(wd, mask, os.fsdecode(name.rstrip(b"\0")))
+        return True
+
+    def handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            self.dirty.update(snapshot_files(self.paths))
+            self.dirty.update(self.snapshot)
+            return
+        if mask & IN_IGNORED:
+            self.directories.pop(wd, None)
+            return
+        if wd not in self.directories or not name or name.startswith("."):
+            return
+        directory, recursive = self.directories[wd]
+        path = os.path.join(directory, name)
+        if not recursive and path not in self.files:
+            return
+        if not mask & IN_ISDIR:
+            self.dirty.add(path)
+        elif mask & (IN_CREATE | IN_MOVED_TO):
+            self.add_tree(path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            # the files that were in the directory are looked at again, and
+            # found to be removed
+            prefix = os.path.join(path, "")
+            self.dirty.update(
+                filepath for filepath in self.snapshot if filepath.startswith(prefix)
+            )
+            for watched, (watched_directory, _) in list(self.directories.items()):
+                if watched_directory == path or watched_directory.startswith(prefix):
+                    inotify.inotify_rm_watch(self.fd, watched)
+                    del self.directories[watched]
+
+    def changes(self):
+        """Looks at the paths marked as changed since the last call, and updates
+        the snapshot with them
+
+        :returns: A tuple of sorted lists: (changed_filepaths, removed_filepaths)
+        :rtype: tuple
+        """
+        current = {}
+        for filepath in self.dirty:
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            current[filepath] = (stat.st_mtime_ns, stat.st_size)
+        previous = {
+            filepath: self.snapshot[filepath]
+            for filepath in self.dirty
+            if filepath in self.snapshot
+        }
+        self.dirty.clear()
+        changed, removed = diff_snapshots(previous, current)
+        for filepath in removed:
+            del self.snapshot[filepath]
+        self.snapshot.update(current)
+        return changed, removed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_files(paths, interval):
+    """Watches the given paths, yielding each batch of changes as it is
+    detected. Changes are reported by inotify where it is available, and the
+    paths are polled otherwise.
+
+    :param paths: The files and directories to watch, or a function returning
+        them, which is called after every batch of changes so that files that
+        become relevant while watching, such as a newly named template, are
+        watched
+    :type paths: list | Callable[[], list]
+    :param interval: The number of seconds between polls, when polling
+    :type interval: float
+    :returns: A generator of tuples: (changed_filepaths, removed_filepaths)
+    :rtype: Generator[tuple]
+    """
+    watched = paths if callable(paths) else lambda: paths
+    watcher = None
+    if inotify is not None:
+        try:
+            watcher = InotifyWatcher(watched())
+        except OSError as exception:
+            # such as when the limit on the number of watches is reached
+            print(f"watching: inotify is unavailable, polling instead: {exception}")
+    if watcher is None:
+        yield from poll_files(watched, interval)
+        return
+
+    try:
+        while True:
+            watcher.read_events(None)
+            # an editor saving a file, or a tool writing many, causes a burst of
+            # events, which are gathered into one batch
+            while watcher.read_events(WATCH_SETTLE_SECONDS):
+                pass
+            watcher.watch(watched())
+            changed, removed = watcher.changes()
+            if changed or removed:
+                yield changed, removed
+    finally:
+        watcher.close()
+
+
+def poll_files(watched, interval):
+    """Polls the paths returned by a function, yielding each batch of changes as
+    it is detected
+
+    :param watched: A function returning the files and directories to watch
+    :type watched: Callable[[], list]
+    :param interval: The number of seconds between polls
+    :type interval: float
+    :returns: A generator of tuples: (changed_filepaths, removed_filepaths)
+    :rtype: Generator[tuple]
+    """
+    previous = snapshot_files(watched())
+    while True:
+        time.sleep(interval)
+        current = snapshot_files(watched())
+        changed, removed = diff_snapshots(previous, current)
+        previous = current
+        if changed or removed:
+            yield changed, removed
+
+
+def is_within(filepath, directory):
+    """Returns True if a filepath is inside a directory"""
+    return os.path.commonpath([filepath, directory]) == os.path.normpath(directory)
+
+
+def rebuild_changes(
+    changed,
+    removed,
+    content_dir_path,
+    static_dir_path,
+    template_path,
+    dest_dir_path,
+    options=None,
+    site_index=None,
+    manifest=None,
+):
+    """Rebuilds only the outputs affected by a batch of changed and removed
+    files, with the same settings as the build. A changed page is rebuilt, as is
+    every page rendered with a changed template, whether that is the default
+    template or one named in a page's front matter. When a site index is given,
+    the entries of the changed and removed pages are brought up to date first,
+    and the output of a page marked as a draft is removed unless drafts are
+    included. Neither the content directory nor the index is walked unless a
+    template changed.
+
+    When a manifest is given, the entries of the rebuilt pages and copied
+    static files are recorded in it, and those of removed files dropped, so the
+    next build carries on from the rebuilt site.
+
+    :param changed: The filepaths that were created or modified
+    :type changed: list
+    :param removed: The filepaths that were removed
+    :type removed: list
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :param static_dir_path: The directory containing the static files
+    :type static_dir_path: str
+    :param template_path: The path to the default template file
+    :type template_path: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param options: The settings of the build, described in build_options
+    :type options: dict
+    :param site_index: The index holding the metadata of every page
+    :type site_index: SiteIndex
+    :param manifest: The manifest of the build, carried forward from the
+        previous build
+    :type manifest: BuildManifest
+    :returns: A list of tuples for the files that failed: (filepath, error)
+    :rtype: list
+    """
+    options = build_options(**(options or {}))
+    if site_index is not None:
+        site_index.update_pages(
+            [
+                filepath
+                for filepath in (*changed, *removed)
+                if is_within(filepath, content_dir_path)
+            ],
+            content_dir_path,
+            dest_dir_path,
+        )
+
+    def is_published(source_filepath):
+        return (
+            site_index is None
+            or options["include_drafts"]
+            or not site_index.is_draft(source_filepath)
+        )
+
+    pages = set()
+    for filepath in changed:
+        if not is_within(filepath, content_dir_path):
+            continue
+        if is_published(filepath):
+            pages.add(filepath)
+        else:
+            # a page that became a draft is no longer published
+            destination = destination_for(
+                filepath, content_dir_path, dest_dir_path, page=True
+            )
+            remove_output(destination, manifest, "pages", filepath)
+
+    # templates live outside the content and static directories, and only a
+    # change to one means looking through every page for those rendered with it
+    templates = {
+        os.path.normpath(filepath)
+        for filepath in changed
+        if not is_within(filepath, content_dir_path)
+        and not is_within(filepath, static_dir_path)
+    }
+    if os.path.normpath(template_path) in templates and site_index is None:
+        pages.update(source for source, _ in collect_pages(content_dir_path, "."))
+    elif templates and site_index is not None:
+        normalized = {}
+        for source_filepath in site_index.pages:
+            page_template_path = site_index.template(source_filepath, template_path)
+            if page_template_path not in normalized:
+                normalized[page_template_path] = os.path.normpath(page_template_path)
+            if normalized[page_template_path] in templates and is_published(
+                source_filepath
+            ):
+                pages.add(source_filepath)
+
+    failures = []
+    if pages:
+        failures = generate_pages_recursive(
+            content_dir_path,
+            template_path,
+            dest_dir_path,
+            options=options,
+            manifest=manifest,
+            site_index=site_index,
+            source_filepaths=pages,
+        )
+
+    for filepath in changed:
+        if not is_within(filepath, static_dir_path):
+            continue
+        destination = destination_for(filepath, static_dir_path, dest_dir_path)
+        print(f"copying: {filepath} -> {destination}")
+        try:
+            minified = options["minify"] and filepath.endswith(".css")
+            copy_static_file(filepath, destination, options["link_static"], minified)
+            if manifest is not None:
+                entry = static_file_entry(filepath, destination, minified)
+                stat = os.stat(filepath)
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                manifest.record("static", filepath, entry)
+        except (OSError, UnicodeDecodeError) as exception:
+            error = f"{type(exception).__name__}: {exception}"
+            print(f"error: {filepath}: {error}")
+            failures.append((filepath, error))
+
+    for filepath in removed:
+        if is_within(filepath, content_dir_path):
+            destination = destination_for(
+                filepath, content_dir_path, dest_dir_path, page=True
+            )
+            remove_output(destination, manifest, "pages", filepath)
+        elif is_within(filepath, static_dir_path):
+            destination = destination_for(filepath, static_dir_path, dest_dir_path)
+            remove_output(destination, manifest, "static", filepath)
+    return failures
+
+
+def remove_output(destination, manifest, section, source):
+    """Removes the output of a source that no longer produces one, along with
+    its entry in the manifest, if any
+
+    :param destination: The output of the source
+    :type destination: str
+    :param manifest: The manifest of the build, or None
+    :type manifest: BuildManifest
+    :param section: The manifest section of the source
+    :type section: str
+    :param source: The path to the source file
+    :type source: str
+    :returns: Nothing
+    :rtype: None
+    """
+    if manifest is not None:
+        manifest.forget(section, source)
+    if os.path.isfile(destination):
+        print(f"removing: {destination}")
+        os.remove(destination)
+
+
+def watch_site(
+    content_dir_path,
+    static_dir_path,
+    template_path,
+    dest_dir_path,
+    host,
+    port,
+    interval,
+    options=None,
+    site_index_path=None,
+    manifest_path=None,
+    listing_page_size=20,
+    listing_sort="date",
+):
+    """Serves the site with live reload, and rebuilds the affected outputs
+    whenever the content, static files or templates change. Runs until
+    interrupted. With a site index, the listings of the sections and tags of the
+    changed pages are regenerated, and every listing when the default template
+    changes. With a manifest, it is kept in memory and saved after every
+    rebuild, so the next build only rebuilds what changed since.
+
+    :param content_dir_path: The directory containing the site content
+    :type content_dir_path: str
+    :param static_dir_path: The directory containing the static files
+    :type static_dir_path: str
+    :param template_path: The path to the default template file
+    :type template_path: str
+    :param dest_dir_path: The directory the site is written to
+    :type dest_dir_path: str
+    :param host: The address to serve the site on
+    :type host: str
+    :param port: The port to serve the site on
+    :type port: int
+    :param interval: The number of seconds between polls for changes, where
+        inotify is not available
+    :type interval: float
+    :param options: The settings the site was built with, described in
+        build_options
+    :type options: dict
+    :param site_index_path: The path to the site index, kept up to date as pages
+        change
+    :type site_index_path: str
+    :param manifest_path: The path to the build manifest, kept up to date as
+        outputs are rebuilt
+    :type manifest_path: str
+    :param listing_page_size: The number of pages on each page of a listing
+    :type listing_page_size: int
+    :param listing_sort: How to sort listings, "date" or "title"
+    :type listing_sort: str
+    :returns: Nothing
+    :rtype: None
+    """
+    options = build_options(**(options or {}))
+    site_index = None
+    if site_index_path is not None:
+        site_index = SiteIndex(site_index_path)
+        site_index.update(content_dir_path, dest_dir_path)
+        site_index.pages_by_directory()
+    manifest = None
+    if manifest_path is not None:
+        manifest = BuildManifest(manifest_path)
+
+    def watched_paths():
+        templates = {template_path}
+        if site_index is not None:
+            templates = site_index.templates(template_path)
+        return [content_dir_path, static_dir_path, *sorted(templates)]
+
+    live_reload = LiveReload()
+    server = start_live_reload_server(dest_dir_path, host, port, live_reload)
+    print(f"Serving {dest_dir_path} with live reload on http://{host}:{port}/")
+    print(f"Watching {content_dir_path}, {static_dir_path} and the templates")
+    try:
+        for changed, removed in watch_files(watched_paths, interval):
+            started = time.perf_counter()
+            previous_pages = []
+            if site_index is not None:
+                previous_pages = [
+                    (filepath, site_index.pages.get(filepath))
+                    for filepath in changed + removed
+                    if is_within(filepath, content_dir_path)
+                ]
+            if manifest is not None:
+                manifest.carry_forward()
+            rebuild_changes(
+                changed,
+                removed,
+                content_dir_path,
+                static_dir_path,
+                template_path,
+                dest_dir_path,
+                options,
+                site_index,
+                manifest,
+            )
+            listings = set()
+            if site_index is not None:
+                listings = affected_listings(
+                    previous_pages
+                    + [
+                        (filepath, site_index.pages.get(filepath))
+                        for filepath, _ in previous_pages
+                    ],
+                    content_dir_path,
+                )
+                if os.path.normpath(template_path) in map(os.path.normpath, changed):
+                    listings = None
+            if listings is None or listings:
+                generate_listings(
+                    site_index,
+                    content_dir_path,
+                    template_path,
+                    dest_dir_path,
+                    manifest,
+                    page_size=listing_page_size,
+                    sort=listing_sort,
+                    include_drafts=options["include_drafts"],
+                    minify=options["minify"],
+                    directories=listings,
+                )
+            if manifest is not None:
+                remove_orphaned_outputs(manifest, dest_dir_path)
+            live_reload.notify()
+            print(f"rebuilt in {(time.perf_counter() - started) * 1000:.1f} ms")
+            # the index and manifest of a large site take longer to write than
+            # the rebuild itself, so they are saved once the browser is reloaded
+            if site_index is not None:
+                site_index.save()
+            if manifest is not None:
+                manifest.save()
+                manifest.advance()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
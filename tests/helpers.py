@@ -0,0 +1,31 @@
+import os
+import tempfile
+import unittest
+
+
+class TemporaryDirectoryTestCase(unittest.TestCase):
+    """A test case given a temporary directory to build in, which is removed
+    once each test has run
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, *parts):
+        return os.path.join(self.directory.name, *parts)
+
+    def write(self, filepath, content):
+        """Writes a file, creating the directories it is in
+
+        :param filepath: The path to the file
+        :type filepath: str
+        :param content: The text or bytes to write
+        :type content: str | bytes
+        :returns: The path to the file
+        :rtype: str
+        """
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        return filepath
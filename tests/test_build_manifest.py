@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+from src.build_manifest import BuildManifest, atomic_write, hash_file
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestHashFile(unittest.TestCase):
+    def test_same_content(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = os.path.join(directory, "first.md")
+            second = os.path.join(directory, "second.md")
+            for filepath in (first, second):
+                with open(filepath, "w") as file:
+                    file.write("# hello there")
+            self.assertEqual(hash_file(first), hash_file(second))
+
+    def test_different_content(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = os.path.join(directory, "first.md")
+            second = os.path.join(directory, "second.md")
+            with open(first, "w") as file:
+                file.write("# hello there")
+            with open(second, "w") as file:
+                file.write("# general kenobi")
+            self.assertNotEqual(hash_file(first), hash_file(second))
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def test_replaces(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "index.html")
+            with atomic_write(filepath) as file:
+                file.write("<p>hello</p>")
+                self.assertFalse(os.path.exists(filepath))
+            with open(filepath, "r") as file:
+                self.assertEqual("<p>hello</p>", file.read())
+            self.assertListEqual(["index.html"], os.listdir(directory))
+
+    def test_failed_write_leaves_destination(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "index.html")
+            with open(filepath, "w") as file:
+                file.write("<p>hello</p>")
+            with self.assertRaises(ValueError):
+                with atomic_write(filepath) as file:
+                    file.write("<p>gen")
+                    raise ValueError("interrupted")
+            with open(filepath, "r") as file:
+                self.assertEqual("<p>hello</p>", file.read())
+            self.assertListEqual(["index.html"], os.listdir(directory))
+
+
+class TestBuildManifest(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest_path = self.path("manifest.json")
+        self.output = self.write(self.path("index.html"), "<p>hello</p>")
+
+    def test_missing_manifest(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.assertTrue(manifest.is_first_build())
+        self.assertListEqual([], manifest.orphaned_outputs())
+
+    def test_round_trip(self):
+        entry = {"hash": "abc", "template": "def", "output": self.output}
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", entry)
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(manifest.is_first_build())
+        self.assertTrue(manifest.is_current("pages", "index.md", entry))
+
+    def test_advance(self):
+        entry = {"hash": "abc", "template": "def", "output": self.output}
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", entry)
+        manifest.advance()
+        self.assertTrue(manifest.is_current("pages", "index.md", entry))
+        self.assertListEqual([self.output], manifest.orphaned_outputs())
+
+    def test_changed_entry(self):
+        entry = {"hash": "abc", "template": "def", "output": self.output}
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", entry)
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(
+            manifest.is_current("pages", "index.md", entry | {"template": "ghi"})
+        )
+        self.assertFalse(
+            manifest.is_current("pages", "index.md", entry | {"hash": "xyz"})
+        )
+
+    def test_missing_output(self):
+        entry = {"hash": "abc", "template": "def", "output": self.output}
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", entry)
+        manifest.save()
+        os.remove(self.output)
+
+        manifest = BuildManifest(self.manifest_path)
+        self.assertFalse(manifest.is_current("pages", "index.md", entry))
+
+    def test_orphaned_outputs(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", {"hash": "a", "output": "index.html"})
+        manifest.record("pages", "old.md", {"hash": "b", "output": "old.html"})
+        manifest.record("static", "index.css", {"hash": "c", "output": "index.css"})
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", {"hash": "a", "output": "index.html"})
+        self.assertListEqual(["index.css", "old.html"], manifest.orphaned_outputs())
+
+    def test_carry_forward(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("pages", "index.md", {"hash": "a", "output": "index.html"})
+        manifest.record("pages", "old.md", {"hash": "b", "output": "old.html"})
+        manifest.record("listings", "list.html", {"hash": "c", "output": "list.html"})
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        manifest.carry_forward(["pages"])
+        manifest.forget("pages", "old.md")
+        manifest.record("pages", "index.md", {"hash": "d", "output": "index.html"})
+        self.assertEqual("d", manifest.current["pages"]["index.md"]["hash"])
+        self.assertListEqual(["list.html", "old.html"], manifest.orphaned_outputs())
+
+
+if "__name__" == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import gzip
+import os
+import unittest
+from unittest import mock
+from src.build_manifest import BuildManifest
+from src.compression_functions import (
+    compress_output,
+    compression_encodings,
+    precompress_outputs,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestPrecompressOutputs(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.path("public")
+        self.manifest_path = self.path("manifest.json")
+        self.page = os.path.join(self.public, "index.html")
+        self.image = os.path.join(self.public, "ring.png")
+        self.write(self.page, "<p>hello</p>" * 20)
+        self.write(self.image, "not text")
+
+    def build(self):
+        manifest = BuildManifest(self.manifest_path)
+        for output in (self.page, self.image):
+            manifest.record("static", output, {"hash": "", "output": output})
+        with mock.patch(
+            "src.compression_functions.compress_output", wraps=compress_output
+        ) as compress:
+            precompress_outputs(manifest)
+        manifest.save()
+        return compress.call_count
+
+    def test_siblings_written(self):
+        self.assertEqual(1, self.build())
+        with gzip.open(f"{self.page}.gz", "rt") as file:
+            self.assertEqual("<p>hello</p>" * 20, file.read())
+        self.assertFalse(os.path.exists(f"{self.image}.gz"))
+        for encoding in compression_encodings():
+            self.assertTrue(os.path.exists(f"{self.page}.{encoding}"))
+
+    def test_unchanged_outputs_not_compressed(self):
+        self.build()
+        self.assertEqual(0, self.build())
+
+    def test_rewritten_output_with_same_content_not_compressed(self):
+        self.build()
+        stat = os.stat(self.page)
+        os.utime(self.page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(0, self.build())
+        for encoding in compression_encodings():
+            sibling = os.stat(f"{self.page}.{encoding}")
+            self.assertGreaterEqual(sibling.st_mtime_ns, stat.st_mtime_ns + 10**9)
+
+    def test_changed_output_compressed(self):
+        self.build()
+        self.write(self.page, "<p>changed</p>")
+        self.assertEqual(1, self.build())
+        with gzip.open(f"{self.page}.gz", "rt") as file:
+            self.assertEqual("<p>changed</p>", file.read())
+
+    def test_gzip_output_is_reproducible(self):
+        self.build()
+        with open(f"{self.page}.gz", "rb") as file:
+            first = file.read()
+        compress_output((self.page, ("gz",)))
+        with open(f"{self.page}.gz", "rb") as file:
+            self.assertEqual(first, file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import unittest
+from src.front_matter_functions import (
+    parse_yaml_front_matter,
+    parse_yaml_value,
+    split_front_matter,
+)
+
+
+class TestYamlValues(unittest.TestCase):
+    def test_scalars(self):
+        self.assertEqual("hello there", parse_yaml_value(" hello there "))
+        self.assertEqual("quoted: text", parse_yaml_value('"quoted: text"'))
+        self.assertEqual("single", parse_yaml_value("'single'"))
+        self.assertIs(True, parse_yaml_value("true"))
+        self.assertIs(False, parse_yaml_value("False"))
+        self.assertEqual(42, parse_yaml_value("42"))
+        self.assertEqual("2024-01-31", parse_yaml_value("2024-01-31"))
+
+    def test_inline_list(self):
+        self.assertListEqual(["a", "b c", 3], parse_yaml_value('[a, "b c", 3]'))
+        self.assertListEqual([], parse_yaml_value("[]"))
+
+
+class TestYamlFrontMatter(unittest.TestCase):
+    def test_keys(self):
+        self.assertDictEqual(
+            {"title": "Hello", "draft": True, "tags": ["one", "two"]},
+            parse_yaml_front_matter(
+                ["title: Hello", "# a comment", "", "draft: yes", "tags: [one, two]"]
+            ),
+        )
+
+    def test_block_list(self):
+        self.assertDictEqual(
+            {"tags": ["one", "two"], "title": "Hello"},
+            parse_yaml_front_matter(["tags:", "  - one", "  - two", "title: Hello"]),
+        )
+
+    def test_empty_value(self):
+        self.assertDictEqual(
+            {"title": "", "draft": True},
+            parse_yaml_front_matter(["title:", "draft: true"]),
+        )
+        self.assertDictEqual({"title": ""}, parse_yaml_front_matter(["title:"]))
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_yaml_front_matter(["title Hello"])
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_yaml(self):
+        metadata, body = split_front_matter(
+            iter(["---\n", "title: Hello\n", "---\n", "# Heading\n"])
+        )
+        self.assertDictEqual({"title": "Hello"}, metadata)
+        self.assertListEqual(["# Heading\n"], list(body))
+
+    def test_toml(self):
+        metadata, body = split_front_matter(
+            [
+                "+++",
+                'title = "Hello"',
+                "date = 2024-01-31",
+                'tags = ["one", "two"]',
+                "draft = false",
+                "+++",
+                "body",
+            ]
+        )
+        self.assertDictEqual(
+            {
+                "title": "Hello",
+                "date": "2024-01-31",
+                "tags": ["one", "two"],
+                "draft": False,
+            },
+            metadata,
+        )
+        self.assertListEqual(["body"], list(body))
+
+    def test_toml_nested_dates(self):
+        metadata, _ = split_front_matter(
+            [
+                "+++",
+                "dates = [2024-01-31, 2024-02-01T10:00:00Z]",
+                "[event]",
+                "start = 09:30:00",
+                "+++",
+            ]
+        )
+        self.assertDictEqual(
+            {
+                "dates": ["2024-01-31", "2024-02-01T10:00:00+00:00"],
+                "event": {"start": "09:30:00"},
+            },
+            metadata,
+        )
+        json.dumps(metadata)
+
+    def test_no_front_matter(self):
+        metadata, body = split_front_matter(["# Heading", "", "text"])
+        self.assertDictEqual({}, metadata)
+        self.assertListEqual(["# Heading", "", "text"], list(body))
+        self.assertDictEqual({}, split_front_matter([])[0])
+
+    def test_only_header_read(self):
+        lines = iter(["---", "title: Hello", "---", "body", "more"])
+        split_front_matter(lines)
+        self.assertEqual("body", next(lines))
+
+    def test_unclosed(self):
+        with self.assertRaises(ValueError):
+            split_front_matter(["---", "title: Hello", "# Heading"])
+
+    def test_invalid_toml(self):
+        with self.assertRaises(ValueError):
+            split_front_matter(["+++", "title = ", "+++"])
+
+
+if "__name__" == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import unittest
+from unittest import mock
+from src import highlight_functions
+from src.highlight_functions import (
+    Highlighter,
+    cache_path,
+    highlight,
+    highlight_code,
+    highlight_key,
+    using_highlighter,
+)
+from src.markdown_conversion_functions import markdown_to_html_node
+from src.render_cache import RenderCache
+from src.site_generation_functions import generate_pages_recursive
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestHighlight(TemporaryDirectoryTestCase):
+    def test_escaped_without_highlighter(self):
+        self.assertEqual('a &lt; b &amp;&amp; "c"', highlight("py", 'a < b && "c"'))
+
+    def test_escaped_without_language(self):
+        with using_highlighter(Highlighter(self.directory.name)):
+            self.assertEqual("&lt;br&gt;\n", highlight(None, "<br>\n"))
+        self.assertEqual([], os.listdir(self.directory.name))
+
+    def test_escaped_without_pygments(self):
+        with mock.patch.object(highlight_functions, "pygments", None):
+            self.assertEqual("x = &lt;y&gt;\n", highlight_code("python", "x = <y>\n"))
+
+    def test_unknown_language_escaped(self):
+        self.assertEqual("&lt;x&gt;", highlight_code("no-such-language", "<x>"))
+
+    @unittest.skipIf(highlight_functions.pygments is None, "Pygments is not installed")
+    def test_token_spans(self):
+        highlighted = highlight_code("python", "def f():\n    return 1\n")
+        self.assertIn('<span class="k">def</span>', highlighted)
+        self.assertIn('<span class="mi">1</span>', highlighted)
+        self.assertTrue(highlighted.endswith("\n"))
+
+    def test_keys(self):
+        self.assertEqual(highlight_key("py", "x"), highlight_key("py", "x"))
+        self.assertNotEqual(highlight_key("py", "x"), highlight_key("js", "x"))
+        self.assertNotEqual(highlight_key("py", "x"), highlight_key("py", "y"))
+
+    def test_cached_on_disk(self):
+        calls = []
+
+        def highlight_code(language, code):
+            calls.append(code)
+            return f"<i>{code}</i>"
+
+        with mock.patch.object(highlight_functions, "highlight_code", highlight_code):
+            with using_highlighter(Highlighter(self.directory.name)):
+                self.assertEqual("<i>x</i>", highlight("py", "x"))
+                self.assertEqual("<i>x</i>", highlight("py", "x"))
+            self.assertTrue(
+                os.path.exists(
+                    cache_path(self.directory.name, highlight_key("py", "x"))
+                )
+            )
+            # a new process reads the code back rather than highlighting it again
+            with using_highlighter(Highlighter(self.directory.name)):
+                self.assertEqual("<i>x</i>", highlight("py", "x"))
+        self.assertEqual(["x"], calls)
+
+    def test_memory_bounded(self):
+        highlighter = Highlighter(self.directory.name, max_entries=2)
+        for code in ("a", "b", "c"):
+            highlighter.highlight("text", code)
+        self.assertEqual(2, len(highlighter.entries))
+
+    def test_code_not_parsed_as_markdown(self):
+        html = markdown_to_html_node("```\n*a* <b>\n```").to_html()
+        self.assertEqual("<div><pre><code>*a* &lt;b&gt;\n</code></pre></div>", html)
+
+    def test_render_cache_key(self):
+        block = "```py\nx\n```"
+        key = RenderCache.key(block, "code")
+        with using_highlighter(Highlighter(self.directory.name)):
+            self.assertNotEqual(key, RenderCache.key(block, "code"))
+            self.assertEqual(
+                RenderCache.key("text", "paragraph"),
+                RenderCache.key("text", "paragraph"),
+            )
+
+
+@unittest.skipIf(highlight_functions.pygments is None, "Pygments is not installed")
+class TestHighlightPages(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.public = self.path("public")
+        self.cache = self.path("cache")
+        self.template = self.path("template.html")
+        self.write(self.template, "{{ Content }}")
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "---\ntitle: A\n---\n# A\n\n```python\nx = 1\n```\n\n```\nplain\n```\n",
+        )
+        self.write(
+            os.path.join(self.content, "b.md"),
+            "# B\n\n```python\nx = 1\n```\n\n```js\nlet y\n```\n",
+        )
+
+    def tearDown(self):
+        highlight_functions.process_highlighter = None
+
+    def build(self):
+        # each build starts with an empty highlighter, like a new process would
+        highlight_functions.process_highlighter = None
+        generate_pages_recursive(
+            self.content, self.template, self.public, {"highlight": self.cache}
+        )
+
+    def test_code_highlighted_once(self):
+        with mock.patch.object(
+            highlight_functions,
+            "highlight_code",
+            wraps=highlight_functions.highlight_code,
+        ) as highlight_code:
+            self.build()
+        # the block repeated across pages is only highlighted once
+        self.assertEqual(2, highlight_code.call_count)
+        self.assertTrue(
+            os.path.exists(cache_path(self.cache, highlight_key("js", "let y\n")))
+        )
+        with open(os.path.join(self.public, "b.html"), "r") as page:
+            html = page.read()
+        self.assertIn('<code class="language-js">', html)
+        self.assertIn("<span", html)
+
+    def test_pages_read_the_cache(self):
+        self.build()
+        with mock.patch.object(
+            highlight_functions, "highlight_code", side_effect=AssertionError
+        ):
+            self.build()
+        with open(os.path.join(self.public, "index.html"), "r") as page:
+            self.assertIn('<span class="mi">1</span>', page.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
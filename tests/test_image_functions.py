@@ -0,0 +1,106 @@
+import struct
+import unittest
+from src.image_functions import (
+    ImageIndex,
+    image_props,
+    read_image_dimensions,
+    using_image_index,
+)
+from src.nodes_textnode import TextNode, TextType, text_node_to_html_node
+from src.render_cache import RenderCache
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestReadImageDimensions(TemporaryDirectoryTestCase):
+    def dimensions(self, content):
+        filepath = self.write(self.path("image"), content)
+        return read_image_dimensions(filepath)
+
+    def test_png(self):
+        header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+        self.assertEqual(
+            (1344, 896), self.dimensions(header + struct.pack(">II", 1344, 896))
+        )
+
+    def test_gif(self):
+        self.assertEqual(
+            (20, 10), self.dimensions(b"GIF89a" + struct.pack("<HH", 20, 10))
+        )
+
+    def test_jpeg(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+        frame = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 480, 640) + b"\x03"
+        self.assertEqual((640, 480), self.dimensions(b"\xff\xd8" + app0 + frame))
+
+    def test_webp(self):
+        header = b"RIFF" + struct.pack("<I", 0) + b"WEBP"
+        extended = header + b"VP8X" + bytes(8) + (99).to_bytes(3, "little")
+        self.assertEqual(
+            (100, 50), self.dimensions(extended + (49).to_bytes(3, "little"))
+        )
+        lossless = header + b"VP8L" + bytes(5) + (99 | 49 << 14).to_bytes(4, "little")
+        self.assertEqual((100, 50), self.dimensions(lossless))
+
+    def test_unrecognised(self):
+        self.assertIsNone(self.dimensions(b"<svg></svg>"))
+        self.assertIsNone(self.dimensions(b"\xff\xd8\xff\xe0"))
+
+
+class TestImageIndex(unittest.TestCase):
+    index = ImageIndex(
+        {
+            "/images/ring.png": {
+                "width": 1200,
+                "height": 800,
+                "variants": [["/images/ring-480w.png", 480]],
+            },
+            "/images/icon.gif": {"width": 16, "height": 16, "variants": []},
+        },
+        "digest",
+    )
+
+    def test_image_props(self):
+        self.assertDictEqual(
+            {
+                "src": "/images/ring.png",
+                "alt": "ring",
+                "width": "1200",
+                "height": "800",
+                "srcset": "/images/ring-480w.png 480w, /images/ring.png 1200w",
+                "sizes": "(max-width: 1200px) 100vw, 1200px",
+            },
+            self.index.image_props("/images/ring.png", "ring"),
+        )
+        self.assertDictEqual(
+            {"src": "/images/icon.gif", "alt": "", "width": "16", "height": "16"},
+            self.index.image_props("/images/icon.gif", ""),
+        )
+        self.assertDictEqual(
+            {"src": "/missing.png", "alt": ""},
+            self.index.image_props("/missing.png", ""),
+        )
+
+    def test_image_tags_completed_from_active_index(self):
+        node = TextNode("icon", TextType.IMAGE, "/images/icon.gif")
+        self.assertEqual(
+            '<img src="/images/icon.gif" alt="icon"></img>',
+            text_node_to_html_node(node).to_html(),
+        )
+        with using_image_index(self.index):
+            self.assertEqual(
+                '<img src="/images/icon.gif" alt="icon" width="16" height="16"></img>',
+                text_node_to_html_node(node).to_html(),
+            )
+        self.assertDictEqual({"src": "/a.png", "alt": ""}, image_props("/a.png", ""))
+
+    def test_render_cache_key_depends_on_index(self):
+        block = "![icon](/images/icon.gif)"
+        key = RenderCache.key(block, "paragraph")
+        plain_key = RenderCache.key("text", "paragraph")
+        with using_image_index(self.index):
+            self.assertNotEqual(key, RenderCache.key(block, "paragraph"))
+            self.assertEqual(plain_key, RenderCache.key("text", "paragraph"))
+
+
+if __name__ == "__main__":
+    unittest.main()
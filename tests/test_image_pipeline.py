@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+import shutil
+import struct
+import unittest
+from unittest import mock
+from src import image_pipeline
+from src.build_manifest import BuildManifest
+from src.image_pipeline import (
+    image_cache_key,
+    process_images,
+    variant_path,
+)
+from src.site_generation_functions import copy_static_files, remove_orphaned_outputs
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+def png_header(width, height):
+    header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+    return header + struct.pack(">II", width, height)
+
+
+class TestImageHelpers(unittest.TestCase):
+    def test_variant_path(self):
+        self.assertEqual("/images/ring-480w.png", variant_path("/images/ring.png", 480))
+
+    def test_cache_key(self):
+        self.assertEqual(image_cache_key("abc", (480,)), image_cache_key("abc", (480,)))
+        self.assertNotEqual(
+            image_cache_key("abc", (480,)), image_cache_key("abd", (480,))
+        )
+
+
+class TestProcessImages(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = self.path("static")
+        self.public = self.path("public")
+        self.cache = self.path("cache")
+        self.index = self.path("images.json")
+        self.write(os.path.join(self.static, "images", "ring.png"), png_header(40, 20))
+        self.write(os.path.join(self.static, "images", "copy.png"), png_header(40, 20))
+        self.write(os.path.join(self.static, "index.css"), b"body {}")
+
+    def build(self):
+        manifest = BuildManifest(self.path("manifest.json"))
+        copy_static_files(self.static, self.public, manifest)
+        index = process_images(
+            self.static, self.public, self.cache, self.index, manifest, widths=(20,)
+        )
+        remove_orphaned_outputs(manifest, self.public)
+        manifest.save()
+        return index
+
+    def test_index(self):
+        index = self.build()
+        self.assertListEqual(["/images/copy.png", "/images/ring.png"], sorted(index))
+        self.assertEqual(40, index["/images/ring.png"]["width"])
+        self.assertEqual(20, index["/images/ring.png"]["height"])
+        with open(self.index, "r") as index_file:
+            self.assertDictEqual(index, json.load(index_file))
+
+    def test_images_processed_once(self):
+        if image_pipeline.Image is not None:
+            # the headers alone cannot be decoded, which would not be cached
+            for name in ("ring.png", "copy.png"):
+                image = image_pipeline.Image.new("RGB", (40, 20))
+                image.save(os.path.join(self.static, "images", name))
+        with mock.patch(
+            "src.image_pipeline.process_image", wraps=image_pipeline.process_image
+        ) as process_image:
+            self.build()
+            # identical images share a cache entry
+            self.assertEqual(1, process_image.call_count)
+            self.build()
+            self.assertEqual(1, process_image.call_count)
+
+    def test_unreadable_images_left_out(self):
+        self.write(os.path.join(self.static, "broken.jpg"), b"not an image")
+        self.assertNotIn("/broken.jpg", self.build())
+
+    @unittest.skipIf(image_pipeline.Image is None, "Pillow is not installed")
+    def test_variants(self):
+        image = image_pipeline.Image.new("RGB", (40, 20))
+        image.save(os.path.join(self.static, "images", "ring.png"))
+        index = self.build()
+        self.assertListEqual(
+            [["/images/ring-20w.png", 20]], index["/images/ring.png"]["variants"]
+        )
+        variant = os.path.join(self.public, "images", "ring-20w.png")
+        with image_pipeline.Image.open(variant) as resized:
+            self.assertEqual((20, 10), resized.size)
+
+        os.remove(os.path.join(self.static, "images", "ring.png"))
+        self.build()
+        self.assertFalse(os.path.exists(variant))
+
+    @unittest.skipIf(image_pipeline.Image is None, "Pillow is not installed")
+    def test_undecodable_image_not_cached(self):
+        with mock.patch(
+            "src.image_pipeline.process_image", wraps=image_pipeline.process_image
+        ) as process_image:
+            index = self.build()
+            self.assertListEqual([], index["/images/ring.png"]["variants"])
+            self.assertEqual(40, index["/images/ring.png"]["width"])
+            self.build()
+            self.assertEqual(2, process_image.call_count)
+        self.assertListEqual([], glob.glob(os.path.join(self.cache, "*", "*.json")))
+
+    @unittest.skipIf(image_pipeline.Image is None, "Pillow is not installed")
+    def test_missing_cached_variant_regenerated(self):
+        image = image_pipeline.Image.new("RGB", (40, 20))
+        image.save(os.path.join(self.static, "images", "ring.png"))
+        self.build()
+        (cached,) = glob.glob(os.path.join(self.cache, "*", "*-20.png"))
+        os.remove(cached)
+        shutil.rmtree(self.public)
+        os.remove(self.path("manifest.json"))
+
+        index = self.build()
+        self.assertListEqual(
+            [["/images/ring-20w.png", 20]], index["/images/ring.png"]["variants"]
+        )
+        self.assertTrue(os.path.exists(cached))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.public, "images", "ring-20w.png"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
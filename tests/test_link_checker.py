@@ -0,0 +1,71 @@
+import os
+import unittest
+from src.link_checker import LinkGraph, html_node_links, resolve_link, target_outputs
+from src.listing_functions import listing_node
+
+
+class TestLinkHelpers(unittest.TestCase):
+    def test_resolve_link(self):
+        self.assertEqual("/blog/b.html", resolve_link("/blog/a.html", "b.html"))
+        self.assertEqual("/b.html", resolve_link("/blog/", "../b.html?x=1#top"))
+        self.assertEqual("/a b.png", resolve_link("/", "/a%20b.png"))
+        self.assertIsNone(resolve_link("/", "https://example.com/"))
+        self.assertIsNone(resolve_link("/", "mailto:frodo@example.com"))
+        self.assertIsNone(resolve_link("/", "#section"))
+
+    def test_target_outputs(self):
+        self.assertEqual(("index.html",), target_outputs("/"))
+        self.assertEqual(("blog/index.html",), target_outputs("/blog/"))
+        self.assertEqual(("blog", "blog/index.html"), target_outputs("/blog"))
+
+    def test_html_node_links(self):
+        node = listing_node(
+            "Blog",
+            [("Notes", "/blog/notes/")],
+            [{"url": "/blog/a.html", "metadata": {}}],
+            1,
+            2,
+            "blog",
+        )
+        self.assertListEqual(
+            [
+                ("link", "/blog/notes/"),
+                ("link", "/blog/a.html"),
+                ("link", "/blog/page/2/"),
+            ],
+            html_node_links(node),
+        )
+
+
+class TestLinkGraph(unittest.TestCase):
+    def setUp(self):
+        self.outputs = [
+            os.path.join("public", *path.split("/"))
+            for path in ("index.html", "a.html", "b.html", "blog/index.html", "x.png")
+        ]
+
+    def test_check(self):
+        graph = LinkGraph()
+        graph.add_page("/", [("link", "a.html"), ("link", "/blog"), ("image", "x.png")])
+        graph.add_page("/a.html", [("link", "/"), ("link", "a.html#top")])
+        graph.add_page("/b.html", [("link", "/c.html"), ("image", "/y.png")])
+        graph.add_page("/blog/", [("link", "https://example.com/")])
+        self.assertDictEqual(
+            {
+                "broken_links": [("/b.html", "/c.html")],
+                "missing_images": [("/b.html", "/y.png")],
+                "orphan_pages": ["/b.html"],
+            },
+            graph.check(self.outputs, "public"),
+        )
+        self.assertEqual(8, graph.link_count)
+
+    def test_links_from_other_pages_count_as_inbound(self):
+        graph = LinkGraph()
+        graph.add_page("/a.html", [])
+        graph.add_links("/blog/", [("link", "/a.html")])
+        self.assertListEqual([], graph.check(self.outputs, "public")["orphan_pages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
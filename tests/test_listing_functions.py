@@ -0,0 +1,269 @@
+import os
+import unittest
+from src.build_manifest import BuildManifest
+from src.listing_functions import (
+    affected_listings,
+    collect_sections,
+    generate_listings,
+    listing_directory,
+    listing_output,
+    listing_url,
+    section_title,
+    sort_listing_pages,
+    tag_slug,
+)
+from src.site_generation_functions import remove_orphaned_outputs
+from src.site_index import SiteIndex
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+def entry(url, **metadata):
+    return {"url": url, "metadata": metadata}
+
+
+class TestListingHelpers(unittest.TestCase):
+    def test_section_title(self):
+        self.assertEqual("Home", section_title("."))
+        self.assertEqual("Release notes", section_title("docs/release-notes"))
+
+    def test_listing_url(self):
+        self.assertEqual("/", listing_url(".", 1))
+        self.assertEqual("/blog/", listing_url("blog", 1))
+        self.assertEqual("/blog/page/3/", listing_url("blog", 3))
+
+    def test_listing_output(self):
+        self.assertEqual(
+            os.path.join("public", "index.html"), listing_output("public", ".", 1)
+        )
+        self.assertEqual(
+            os.path.join("public", "blog", "page", "2", "index.html"),
+            listing_output("public", "blog", 2),
+        )
+
+    def test_tag_slug(self):
+        self.assertEqual("release-notes", tag_slug("Release notes"))
+        self.assertEqual("c", tag_slug("C++"))
+
+    def test_listing_directory(self):
+        for directory, page_number in ((".", 1), (".", 2), ("blog", 1), ("a/b", 3)):
+            self.assertEqual(
+                directory,
+                listing_directory(
+                    listing_output("public", directory, page_number), "public"
+                ),
+            )
+
+    def test_affected_listings(self):
+        self.assertSetEqual(
+            {
+                ".",
+                "docs",
+                os.path.join("docs", "guides"),
+                "tags",
+                os.path.join("tags", "c"),
+            },
+            affected_listings(
+                [
+                    (os.path.join("content", "docs", "guides", "a.md"), None),
+                    (
+                        os.path.join("content", "docs", "guides", "a.md"),
+                        entry("/docs/guides/a.html", tags="C++"),
+                    ),
+                ],
+                "content",
+            ),
+        )
+
+    def test_sort_by_date(self):
+        pages = [
+            entry("/c.html", title="C"),
+            entry("/b.html", title="B", date="2024-01-01"),
+            entry("/a.html", title="A", date="2024-01-01"),
+            entry("/d.html", title="D", date="2024-06-30"),
+        ]
+        self.assertListEqual(
+            ["/d.html", "/a.html", "/b.html", "/c.html"],
+            [page["url"] for page in sort_listing_pages(pages, "date")],
+        )
+
+    def test_sort_by_title(self):
+        pages = [
+            entry("/b.html", title="beta", date="2024-06-30"),
+            entry("/a.html", title="Alpha"),
+        ]
+        self.assertListEqual(
+            ["/a.html", "/b.html"],
+            [page["url"] for page in sort_listing_pages(pages, "title")],
+        )
+
+
+class TestGenerateListings(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.public = self.path("public")
+        self.template = self.path("template.html")
+        self.manifest_path = self.path("manifest.json")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for number in range(1, 6):
+            self.write(
+                os.path.join(self.content, "blog", f"post-{number}.md"),
+                f"---\ntitle: Post {number}\ndate: 2024-01-0{number}\n---\n",
+            )
+        self.write(
+            os.path.join(self.content, "blog", "draft.md"),
+            "---\ntitle: Draft\ndraft: true\n---\n",
+        )
+        self.write(os.path.join(self.content, "docs", "index.md"), "# Docs")
+        self.write(os.path.join(self.content, "docs", "setup.md"), "# Setup")
+        self.site_index = SiteIndex(self.path("index.json"))
+        self.site_index.update(self.content, self.public)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts), "r") as file:
+            return file.read()
+
+    def generate(self, manifest=None, page_size=2, include_drafts=False):
+        return generate_listings(
+            self.site_index,
+            self.content,
+            self.template,
+            self.public,
+            manifest,
+            page_size,
+            include_drafts=include_drafts,
+        )
+
+    def test_collect_sections(self):
+        sections = collect_sections(self.site_index, self.content)
+        self.assertSetEqual({".", "blog", "docs"}, set(sections))
+        self.assertSetEqual({"blog", "docs"}, sections["."]["subsections"])
+        self.assertEqual(5, len(sections["blog"]["pages"]))
+        self.assertIsNone(sections["blog"]["index"])
+        self.assertEqual("/docs/", sections["docs"]["index"]["url"])
+
+        with_drafts = collect_sections(self.site_index, self.content, True)
+        self.assertEqual(6, len(with_drafts["blog"]["pages"]))
+
+        root_only = collect_sections(self.site_index, self.content, directories={"."})
+        self.assertSetEqual({"blog", "docs"}, root_only["."]["subsections"])
+        self.assertListEqual([], root_only["blog"]["pages"])
+        self.assertEqual("/docs/", root_only["docs"]["index"]["url"])
+
+    def test_paginated(self):
+        self.assertEqual(4, self.generate())
+        first = self.read("blog", "index.html")
+        self.assertIn("<title>Blog</title>", first)
+        self.assertLess(first.index("Post 5"), first.index("Post 4"))
+        self.assertNotIn("Post 3", first)
+        self.assertNotIn("Draft", first)
+        self.assertNotIn('rel="prev"', first)
+        self.assertIn('<a href="/blog/page/2/" rel="next">Next</a>', first)
+        self.assertIn("Page 1 of 3", first)
+
+        last = self.read("blog", "page", "3", "index.html")
+        self.assertIn('<a href="/blog/post-1.html">Post 1</a>', last)
+        self.assertIn('<time datetime="2024-01-01">2024-01-01</time>', last)
+        self.assertIn('<a href="/blog/page/2/" rel="prev">Previous</a>', last)
+        self.assertNotIn('rel="next"', last)
+
+    def test_sections_listed_on_root(self):
+        self.generate()
+        root = self.read("index.html")
+        self.assertIn('<ul class="sections">', root)
+        self.assertIn('<a href="/blog/">Blog</a>', root)
+        self.assertIn('<a href="/docs/">Docs</a>', root)
+
+    def test_directory_with_index_not_listed(self):
+        self.generate()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "docs")))
+
+    def test_drafts_included(self):
+        self.generate(page_size=10, include_drafts=True)
+        self.assertIn("Draft", self.read("blog", "index.html"))
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            self.generate(page_size=0)
+        with self.assertRaises(ValueError):
+            generate_listings(
+                self.site_index, self.content, self.template, self.public, sort="size"
+            )
+
+    def test_unchanged_listings_skipped(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(4, self.generate(manifest))
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(0, self.generate(manifest))
+
+    def test_surplus_pages_removed(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.generate(manifest)
+        manifest.save()
+
+        manifest = BuildManifest(self.manifest_path)
+        self.generate(manifest, page_size=3)
+        remove_orphaned_outputs(manifest, self.public)
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.public, "blog", "page", "2", "index.html"))
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page", "3")))
+
+    def test_only_given_listings_generated(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.generate(manifest)
+        manifest.save()
+
+        os.remove(os.path.join(self.content, "blog", "post-5.md"))
+        os.remove(os.path.join(self.content, "blog", "post-4.md"))
+        self.site_index.update(self.content, self.public)
+        os.remove(os.path.join(self.public, "index.html"))
+        manifest = BuildManifest(self.manifest_path)
+        manifest.carry_forward()
+        written = generate_listings(
+            self.site_index,
+            self.content,
+            self.template,
+            self.public,
+            manifest,
+            page_size=2,
+            directories={"blog"},
+        )
+        remove_orphaned_outputs(manifest, self.public)
+        self.assertEqual(2, written)
+        self.assertIn("Post 3", self.read("blog", "index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page", "3")))
+        # the root listing was not regenerated
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_tag_pages(self):
+        self.write(
+            os.path.join(self.content, "blog", "post-1.md"),
+            "---\ntitle: Post 1\ntags: [news, Release notes]\n---\n",
+        )
+        self.write(
+            os.path.join(self.content, "docs", "setup.md"),
+            "---\ntitle: Setup\ntags: [news]\n---\n",
+        )
+        self.write(
+            os.path.join(self.content, "blog", "draft.md"),
+            "---\ntitle: Draft\ndraft: true\ntags: [drafts]\n---\n",
+        )
+        self.site_index.update(self.content, self.public)
+        self.generate(page_size=10)
+        tags = self.read("tags", "index.html")
+        self.assertIn("<title>Tags</title>", tags)
+        self.assertIn('<a href="/tags/news/">news</a>', tags)
+        self.assertIn('<a href="/tags/release-notes/">Release notes</a>', tags)
+        self.assertNotIn("drafts", tags)
+        news = self.read("tags", "news", "index.html")
+        self.assertIn("<title>Tagged news</title>", news)
+        self.assertIn('<a href="/blog/post-1.html">Post 1</a>', news)
+        self.assertIn('<a href="/docs/setup.html">Setup</a>', news)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "tags", "drafts")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import glob
+import os
+import unittest
+from unittest import mock
+from src.main import build, options_from_arguments, parse_arguments
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestBuild(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        # the build works on the site in the current directory
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory.name)
+        os.makedirs("static")
+        self.write(os.path.join("content", "index.md"), "# Home\n\nWelcome")
+        self.write(
+            "template.html", "<title>{{ Title }}</title><main>{{ Content }}</main>"
+        )
+
+    def build(self, *argv):
+        arguments = parse_arguments(["build", *argv])
+        return build(arguments, options_from_arguments(arguments))
+
+    def test_failed_build_discards_outputs(self):
+        argv = ("--base-url", "https://example.com", "--search-index")
+        self.build(*argv)
+        with open(os.path.join("public", "sitemap.xml"), "r") as file:
+            sitemap = file.read()
+
+        self.write(os.path.join("content", "about.md"), "# About\n\nMe")
+        with mock.patch("src.main.generate_listings", side_effect=OSError("full")):
+            with self.assertRaises(OSError):
+                self.build(*argv)
+        self.assertListEqual(
+            [], glob.glob("**/*.tmp", recursive=True, include_hidden=True)
+        )
+        with open(os.path.join("public", "sitemap.xml"), "r") as file:
+            self.assertEqual(sitemap, file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,12 @@
+import io
 import unittest
-from src.markdown_block_functions import markdown_to_blocks, block_to_block_type
+from src.markdown_block_functions import (
+    block_to_block_type,
+    iter_markdown_blocks,
+    markdown_to_blocks,
+    split_code_fence,
+    split_table_row,
+)
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -20,6 +27,42 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
             ],
         )
 
+    def test_fenced_code_keeps_empty_lines(self):
+        document = "intro\n\n```\nfirst\n\n\nsecond\n```\n\noutro"
+        self.assertListEqual(
+            ["intro", "```\nfirst\n\n\nsecond\n```", "outro"],
+            markdown_to_blocks(document),
+        )
+
+    def test_fence_only_opens_a_block(self):
+        self.assertListEqual(
+            ["text\n```", "more text", "```"],
+            markdown_to_blocks("text\n```\n\nmore text\n\n```"),
+        )
+        self.assertListEqual(
+            ["```inline```", "text"], markdown_to_blocks("```inline```\n\ntext")
+        )
+
+    def test_unclosed_fence_runs_to_end(self):
+        self.assertListEqual(
+            ["text", "```\ncode\n\nmore"],
+            markdown_to_blocks("text\n\n```\ncode\n\nmore\n"),
+        )
+
+    def test_reads_from_file(self):
+        source = io.StringIO("# heading\n\n\n\nparagraph\nline two\n\n  \n- item\n")
+        self.assertListEqual(
+            ["# heading", "paragraph\nline two", "- item"],
+            list(iter_markdown_blocks(source)),
+        )
+
+    def test_reads_lazily(self):
+        lines = iter(["# heading", "", "paragraph", "", "- item"])
+        blocks = iter_markdown_blocks(lines)
+        self.assertEqual("# heading", next(blocks))
+        self.assertEqual("paragraph", next(lines))
+        self.assertListEqual(["- item"], list(blocks))
+
 
 class TestBlocksToBlockType(unittest.TestCase):
     def test_paragraph(self):
@@ -72,6 +115,62 @@ class TestBlocksToBlockType(unittest.TestCase):
             block_to_block_type("- item one\n- item two\n- item three"), "ordered_list"
         )
 
+    def test_every_line_validated(self):
+        self.assertEqual(block_to_block_type("> quote\nnot quote"), "paragraph")
+        self.assertEqual(block_to_block_type("- item\nnot an item"), "paragraph")
+        self.assertEqual(block_to_block_type("1. item\n- item"), "paragraph")
+        self.assertEqual(block_to_block_type("text\n- item"), "paragraph")
+
+    def test_empty_quote_line(self):
+        self.assertEqual(block_to_block_type("> quote\n>\n> quote"), "quote")
+
+    def test_nested_list_items(self):
+        self.assertEqual(
+            block_to_block_type("- item\n  - nested\n    * deeper\n- item"),
+            "unordered_list",
+        )
+        self.assertEqual(
+            block_to_block_type("1. item\n  - nested\n  1. nested\n2. item"),
+            "ordered_list",
+        )
+        self.assertEqual(block_to_block_type("- item\n  nested"), "paragraph")
+
+    def test_table(self):
+        self.assertEqual(
+            block_to_block_type("| a | b |\n|---|:-:|\n| 1 | 2 |"), "table"
+        )
+        self.assertEqual(block_to_block_type("a | b\n--|--"), "table")
+        self.assertEqual(block_to_block_type("a | b\n--|--|--"), "paragraph")
+        self.assertEqual(block_to_block_type("Title\n---"), "paragraph")
+        self.assertEqual(block_to_block_type("a | b"), "paragraph")
+
+    def test_split_table_row(self):
+        self.assertEqual(["a", "b|c", ""], split_table_row("| a | b\\|c | |"))
+        self.assertEqual(["a", "b"], split_table_row("a|b"))
+
+    def test_split_code_fence(self):
+        self.assertEqual(
+            ("python", "print(1)\n"),
+            split_code_fence("``` python {linenos}\nprint(1)\n```"),
+        )
+        self.assertEqual((None, "inline"), split_code_fence("```inline```"))
+
+    def test_marker_needs_space(self):
+        self.assertEqual(block_to_block_type("**bold** text"), "paragraph")
+        self.assertEqual(block_to_block_type("#hashtag"), "paragraph")
+        self.assertEqual(block_to_block_type("1.5 million"), "paragraph")
+
+    def test_code_must_be_closed_at_end(self):
+        self.assertEqual(block_to_block_type("```"), "paragraph")
+        self.assertEqual(block_to_block_type("```\ncode\n```\ntext"), "paragraph")
+
+    def test_unclosed_fences_linear(self):
+        # the previous pattern took seconds to reject this block
+        block = "\n".join(["```x"] * 20000)
+        self.assertEqual(block_to_block_type(block), "paragraph")
+        block = "\n".join(["> quote"] * 20000 + ["text"])
+        self.assertEqual(block_to_block_type(block), "paragraph")
+
 
 if "__name__" == "__main__":
     unittest.main()
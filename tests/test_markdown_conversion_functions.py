@@ -5,6 +5,7 @@ from src.markdown_conversion_functions import (
     parse_quote,
     parse_code,
     parse_headings,
+    parse_table,
 )
 from src.nodes_htmlnode import ParentNode, LeafNode
 
@@ -48,6 +49,62 @@ class TestListParsing(unittest.TestCase):
             ),
         )
 
+    def test_nested_list(self):
+        self.assertEqual(
+            "<ul><li>one<ul><li>nested<ol><li>deeper</li></ol></li>"
+            "<li>nested</li></ul></li><li>two</li></ul>",
+            ParentNode(
+                "ul",
+                parse_unordered_list(
+                    "- one\n  - nested\n    1. deeper\n  - nested\n- two"
+                ),
+            ).to_html(),
+        )
+
+    def test_nested_marker_change(self):
+        self.assertEqual(
+            "<ol><li>one<ul><li>a</li></ul><ol><li>b</li></ol></li></ol>",
+            ParentNode("ol", parse_ordered_list("1. one\n  - a\n  1. b")).to_html(),
+        )
+
+    def test_deeply_nested_list(self):
+        depth = 2000
+        html = ParentNode(
+            "ul",
+            parse_unordered_list(
+                "\n".join(f"{' ' * level}- item" for level in range(depth))
+            ),
+        ).to_html()
+        self.assertEqual(depth, html.count("<li>"))
+        self.assertEqual(depth, html.count("<ul>"))
+
+
+class TestTableParsing(unittest.TestCase):
+    def test_table(self):
+        self.assertEqual(
+            '<table><thead><tr><th align="left">name</th><th align="center">'
+            '<b>kind</b></th><th align="right">size</th></tr></thead><tbody>'
+            '<tr><td align="left">a</td><td align="center">x|y</td>'
+            '<td align="right"></td></tr></tbody></table>',
+            ParentNode(
+                "table",
+                parse_table("| name | **kind** | size |\n|:--|:-:|--:|\n| a | x\\|y |"),
+            ).to_html(),
+        )
+
+    def test_table_without_rows(self):
+        self.assertEqual(
+            "<table><thead><tr><th>a</th><th>b</th></tr></thead></table>",
+            ParentNode("table", parse_table("a | b\n--|--")).to_html(),
+        )
+
+    def test_extra_cells_dropped(self):
+        self.assertEqual(
+            "<table><thead><tr><th>a</th></tr></thead>"
+            "<tbody><tr><td>1</td></tr></tbody></table>",
+            ParentNode("table", parse_table("| a |\n| - |\n| 1 | 2 |")).to_html(),
+        )
+
 
 class TestQuoteParsing(unittest.TestCase):
     def test_quote(self):
@@ -76,8 +133,9 @@ class TestCodeParsing(unittest.TestCase):
                         ParentNode(
                             "code",
                             [
-                                LeafNode(None, "beep boop i am\nsome code\n"),
+                                LeafNode(None, "some code\n"),
                             ],
+                            {"class": "language-beep"},
                         )
                     ],
                 )
@@ -85,6 +143,12 @@ class TestCodeParsing(unittest.TestCase):
             repr(ParentNode("pre", parse_code("```beep boop i am\nsome code\n```"))),
         )
 
+    def test_code_without_language(self):
+        self.assertEqual(
+            repr([ParentNode("code", [LeafNode(None, "some code\n")])]),
+            repr(parse_code("```\nsome code\n```")),
+        )
+
 
 class TestHeadingParsing(unittest.TestCase):
     def test_heading_one(self):
@@ -0,0 +1,135 @@
+import unittest
+from src.markdown_conversion_functions import markdown_to_html_node, text_to_children
+from src.markdown_extensions import (
+    ParserRegistry,
+    default_registry,
+    get_parser,
+    using_parser_registry,
+)
+from src.markdown_inline_functions import text_to_textnodes
+from src.nodes_htmlnode import LeafNode, ParentNode
+from src.nodes_textnode import TextNode, TextType
+
+
+class TestMarkdownParser(unittest.TestCase):
+    def test_block_dispatch_by_trigger(self):
+        calls = []
+
+        def is_table(block):
+            calls.append(block)
+            return True
+
+        registry = ParserRegistry()
+        registry.register_block_rule("table", is_table, "|")
+        parser = registry.parser()
+        self.assertEqual("paragraph", parser.block_type("text"))
+        self.assertEqual("table", parser.block_type("| a | b |"))
+        self.assertEqual(["| a | b |"], calls)
+
+    def test_block_rule_without_triggers(self):
+        registry = ParserRegistry()
+        registry.register_block_rule("heading", lambda block: True, "#")
+        registry.register_block_rule("any", lambda block: block.endswith("!"))
+        parser = registry.parser()
+        self.assertEqual("any", parser.block_type("text!"))
+        self.assertEqual("heading", parser.block_type("# text!"))
+
+    def test_block_priority(self):
+        registry = ParserRegistry()
+        registry.register_block_rule("first", lambda block: True, "!")
+        registry.register_block_rule("second", lambda block: True, "!")
+        self.assertEqual("first", registry.parser().block_type("!"))
+        registry.register_block_rule("urgent", lambda block: True, "!", priority=1)
+        self.assertEqual("urgent", registry.parser().block_type("!"))
+
+    def test_inline_marker_order(self):
+        registry = ParserRegistry()
+        registry.register_inline_rule("*", None)
+        registry.register_inline_rule("**", None)
+        registry.register_inline_rule("`", None, priority=1)
+        self.assertEqual(r"`|\*\*|\*", registry.parser().inline_pattern.pattern)
+
+    def test_compiled_once(self):
+        registry = ParserRegistry()
+        registry.register_block_rule("table", lambda block: True, "|")
+        parser = registry.parser()
+        self.assertIs(parser, registry.parser())
+        registry.register_block_rule("quote", lambda block: True, ">")
+        self.assertIsNot(parser, registry.parser())
+        self.assertNotEqual(parser.digest, registry.parser().digest)
+
+    def test_copy(self):
+        registry = default_registry.copy()
+        registry.register_block_rule("admonition", lambda block: True, "!")
+        self.assertIn("admonition", registry.block_rules)
+        self.assertNotIn("admonition", default_registry.block_rules)
+
+
+class TestExtensions(unittest.TestCase):
+    def setUp(self):
+        self.registry = default_registry.copy()
+        self.registry.register_block_rule(
+            "admonition", lambda block: block.startswith("!!! "), "!"
+        )
+        self.registry.register_block_renderer(
+            "admonition",
+            lambda block: ParentNode(
+                "aside", text_to_children(block[4:]), {"class": "admonition"}
+            ),
+        )
+        footnote = self.registry.register_text_type(
+            "footnote",
+            lambda node: LeafNode("sup", f'<a href="#fn-{node.text}">{node.text}</a>'),
+        )
+
+        def parse_footnote(text, token):
+            end = text.find("]", token.end())
+            if end == -1:
+                return None
+            return TextNode(text[token.end() : end], footnote), end + 1
+
+        self.registry.register_inline_rule("[^", parse_footnote)
+
+    def test_block_extension(self):
+        with using_parser_registry(self.registry):
+            html = markdown_to_html_node("!!! be **careful**\n\n!!text").to_html()
+        self.assertEqual(
+            '<div><aside class="admonition">be <b>careful</b></aside>'
+            "<p>!!text</p></div>",
+            html,
+        )
+
+    def test_inline_extension(self):
+        with using_parser_registry(self.registry):
+            nodes = text_to_textnodes("a note[^1] and a [link](/a)")
+            html = markdown_to_html_node("a note[^1]").to_html()
+        self.assertEqual("footnote", nodes[1].text_type.value)
+        self.assertEqual(
+            [
+                TextNode("a note", TextType.TEXT),
+                TextNode("1", nodes[1].text_type),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "/a"),
+            ],
+            nodes,
+        )
+        self.assertEqual(
+            '<div><p>a note<sup><a href="#fn-1">1</a></sup></p></div>', html
+        )
+
+    def test_incomplete_syntax_left_as_text(self):
+        with using_parser_registry(self.registry):
+            nodes = text_to_textnodes("[^1 is not closed")
+        self.assertEqual([TextNode("[^1 is not closed", TextType.TEXT)], nodes)
+
+    def test_active_registry_restored(self):
+        with using_parser_registry(self.registry):
+            self.assertIs(self.registry.parser(), get_parser())
+        self.assertIs(default_registry.parser(), get_parser())
+        self.assertEqual(
+            "<div><p>!!! text</p></div>", markdown_to_html_node("!!! text").to_html()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -216,6 +216,41 @@ class TestFullExtraction(unittest.TestCase):
             ],
         )
 
+    def test_code_content_not_parsed(self):
+        self.assertListEqual(
+            text_to_textnodes("run `ls *.md` and **`this`**"),
+            [
+                TextNode("run ", TextType.TEXT),
+                TextNode("ls *.md", TextType.CODE),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("`this`", TextType.BOLD),
+            ],
+        )
+
+    def test_incomplete_media_is_text(self):
+        self.assertListEqual(
+            text_to_textnodes("an [unclosed link, ![alt] and [text](b"),
+            [TextNode("an [unclosed link, ![alt] and [text](b", TextType.TEXT)],
+        )
+
+    def test_adjacent_media(self):
+        self.assertListEqual(
+            text_to_textnodes("![a](a.png)[b](/b)"),
+            [
+                TextNode("a", TextType.IMAGE, "a.png"),
+                TextNode("b", TextType.LINK, "/b"),
+            ],
+        )
+
+    def test_unclosed_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("this is **not closed")
+        with self.assertRaises(ValueError):
+            text_to_textnodes("this is `not closed")
+
+    def test_empty(self):
+        self.assertListEqual(text_to_textnodes(""), [])
+
 
 if "__name__" == "__main__":
     unittest.main()
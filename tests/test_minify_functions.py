@@ -0,0 +1,74 @@
+import unittest
+from src.minify_functions import minify_css, minify_html, minify_template
+from src.template_functions import compile_template
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_whitespace_beside_block_tags_removed(self):
+        self.assertEqual(
+            "<ul><li>one</li><li>two</li></ul>",
+            minify_html("<ul>\n    <li>one</li>\n    <li> two </li>\n</ul>\n"),
+        )
+
+    def test_inline_whitespace_collapsed(self):
+        self.assertEqual(
+            "<p>a <b>bold</b> <i>move</i></p>",
+            minify_html("<p>a\n  <b>bold</b>   <i>move</i>\n</p>"),
+        )
+
+    def test_non_breaking_spaces_kept(self):
+        self.assertEqual("<p>a&nbsp;\xa0b</p>", minify_html("<p>a&nbsp;\xa0b </p>"))
+
+    def test_comments_removed(self):
+        self.assertEqual(
+            "<p>a b<!--[if IE]>old<![endif]--></p>",
+            minify_html("<p>a <!-- note --> b<!--[if IE]>old<![endif]--></p>"),
+        )
+
+    def test_raw_elements_kept(self):
+        html = "<pre><code>  x\n\n  y</code></pre>\n<script>\n  var a  = 1;\n</script>"
+        self.assertEqual(
+            "<pre><code>  x\n\n  y</code></pre><script>\n  var a  = 1;\n</script>",
+            minify_html(html),
+        )
+
+    def test_minify_template(self):
+        template = compile_template(
+            "<html>\n  <title>{{ Title }} site</title>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n"
+        )
+        self.assertListEqual(
+            [
+                "<html><title>",
+                "Title",
+                " site</title><body>",
+                "Content",
+                "</body></html>",
+            ],
+            minify_template(template),
+        )
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_minify(self):
+        self.assertEqual(
+            "a>b,c{margin:0 auto;color:red}",
+            minify_css(
+                "/* rules */\na  >  b ,\nc {\n  margin: 0 auto;\n  color: red;\n}\n"
+            ),
+        )
+
+    def test_expressions_strings_and_selectors_kept(self):
+        self.assertEqual(
+            'a :hover{width:calc(1px + 2px);content:"  /* x */ "}',
+            minify_css('a :hover { width: calc(1px + 2px); content: "  /* x */ "; }'),
+        )
+
+    def test_nested_blocks(self):
+        self.assertEqual(
+            "@media (max-width:600px){body{padding:0}}",
+            minify_css("@media (max-width: 600px) {\n  body { padding: 0; }\n}"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
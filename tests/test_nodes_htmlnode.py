@@ -1,3 +1,4 @@
+import io
 import unittest
 from src.nodes_htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -109,5 +110,74 @@ class TestParentNode(unittest.TestCase):
         )
 
 
+class TestStreamingHTML(unittest.TestCase):
+    def setUp(self):
+        self.node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, "Normal")]),
+                LeafNode("a", "link", {"href": "https://andy.bz"}),
+            ],
+        )
+
+    def test_iter_html(self):
+        self.assertListEqual(
+            [
+                "<div>",
+                "<p>",
+                "<b>Bold text</b>",
+                "Normal",
+                "</p>",
+                '<a href="https://andy.bz">link</a>',
+                "</div>",
+            ],
+            list(self.node.iter_html()),
+        )
+
+    def test_iter_matches_to_html(self):
+        self.assertEqual(self.node.to_html(), "".join(self.node.iter_html()))
+
+    def test_write_html(self):
+        destination = io.StringIO()
+        self.node.write_html(destination)
+        self.assertEqual(self.node.to_html(), destination.getvalue())
+
+    def test_invalid_child(self):
+        node = ParentNode("div", [LeafNode("b", "fine"), LeafNode("p", None)])
+        with self.assertRaises(ValueError):
+            list(node.iter_html())
+
+    def test_lazy_children(self):
+        node = ParentNode("div", (LeafNode("p", str(index)) for index in range(2)))
+        self.assertEqual("<div><p>0</p><p>1</p></div>", "".join(node.iter_html()))
+
+    def test_deeply_nested(self):
+        node = LeafNode(None, "text")
+        for _ in range(5000):
+            node = ParentNode("b", [node])
+        html = "<b>" * 5000 + "text" + "</b>" * 5000
+        self.assertEqual(html, node.to_html())
+        self.assertEqual(html, "".join(node.iter_html()))
+
+    def test_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "text").to_html()
+
+
+class TestNodeSlots(unittest.TestCase):
+    def test_no_instance_dict(self):
+        for node in (
+            HTMLNode("p", "text"),
+            LeafNode("b", "text"),
+            ParentNode("div", [LeafNode(None, "text")]),
+        ):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_attributes_assignable(self):
+        node = LeafNode("b", "text")
+        node.props = {"class": "loud"}
+        self.assertEqual('<b class="loud">text</b>', node.to_html())
+
+
 if "__name__" == "__main__":
     unittest.main()
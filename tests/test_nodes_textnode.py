@@ -13,6 +13,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.ITALIC)
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
     def test_url(self):
         node = TextNode("This is a link node", TextType.LINK, "http://andy.bz")
         self.assertIsNotNone(node.url)
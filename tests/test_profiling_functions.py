@@ -0,0 +1,76 @@
+import time
+import unittest
+from src.profiling_functions import (
+    NULL_STAGE,
+    BuildProfiler,
+    profile_iter,
+    profile_stage,
+    profiling,
+)
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_exclusive_stage_time(self):
+        profiler = BuildProfiler()
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                time.sleep(0.02)
+        calls, outer_wall, _ = profiler.stages["outer"]
+        self.assertEqual(1, calls)
+        self.assertLess(outer_wall, 0.01)
+        self.assertGreaterEqual(profiler.stages["inner"][1], 0.02)
+
+    def test_page(self):
+        profiler = BuildProfiler()
+        with profiler.page("content/index.md"):
+            pass
+        self.assertListEqual(["content/index.md"], list(profiler.pages))
+
+    def test_merge(self):
+        first = BuildProfiler()
+        second = BuildProfiler()
+        for profiler, page in ((first, "a.md"), (second, "b.md")):
+            with profiler.page(page):
+                with profiler.stage("read"):
+                    pass
+        first.merge(second.to_dict())
+        self.assertEqual(2, first.stages["read"][0])
+        self.assertListEqual(["a.md", "b.md"], sorted(first.pages))
+
+    def test_trace_events(self):
+        profiler = BuildProfiler(trace=True)
+        with profiler.page("a.md"):
+            with profiler.stage("read"):
+                pass
+        self.assertListEqual(
+            ["read", "a.md"], [event["name"] for event in profiler.events]
+        )
+
+    def test_report(self):
+        profiler = BuildProfiler()
+        with profiler.page("content/slow.md"):
+            with profiler.stage("read"):
+                pass
+        report = profiler.report()
+        self.assertIn("content/slow.md", report)
+        self.assertIn("read", report)
+
+
+class TestActiveProfiler(unittest.TestCase):
+    def test_inactive(self):
+        self.assertIs(NULL_STAGE, profile_stage("read"))
+        chunks = ["a", "b"]
+        self.assertIs(chunks, profile_iter("to_html", chunks))
+
+    def test_active(self):
+        with profiling(BuildProfiler()) as profiler:
+            with profile_stage("read"):
+                pass
+            self.assertListEqual(["a", "b"], list(profile_iter("to_html", "ab")))
+        self.assertEqual(1, profiler.stages["read"][0])
+        self.assertEqual(3, profiler.stages["to_html"][0])
+        self.assertIs(NULL_STAGE, profile_stage("read"))
+
+
+if "__name__" == "__main__":
+    unittest.main()
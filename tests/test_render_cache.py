@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from src.nodes_htmlnode import LeafNode, ParentNode
+from src.page_text import collect_page_text, collecting_page_text
+from src.render_cache import (
+    RenderCache,
+    format_render_cache_counts,
+    get_render_cache,
+    render_block,
+    render_caching,
+)
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.rendered = []
+
+    def render(self, block, block_type):
+        self.rendered.append(block)
+        return ParentNode("p", [LeafNode(None, block)])
+
+    def test_key(self):
+        self.assertEqual(
+            RenderCache.key("text", "paragraph"), RenderCache.key("text", "paragraph")
+        )
+        self.assertNotEqual(
+            RenderCache.key("text", "paragraph"), RenderCache.key("text", "quote")
+        )
+        self.assertNotEqual(
+            RenderCache.key("text", "paragraph"), RenderCache.key("text!", "paragraph")
+        )
+
+    def test_render_once(self):
+        cache = RenderCache()
+        first = cache.render("text", "paragraph", self.render)
+        second = cache.render("text", "paragraph", self.render)
+        self.assertEqual("<p>text</p>", first.to_html())
+        self.assertEqual("<p>text</p>", second.to_html())
+        self.assertListEqual(["text"], self.rendered)
+        self.assertEqual((1, 0, 1), cache.counts())
+
+    def test_least_recently_used_evicted(self):
+        cache = RenderCache(max_entries=2)
+        cache.render("a", "paragraph", self.render)
+        cache.render("b", "paragraph", self.render)
+        cache.render("a", "paragraph", self.render)
+        cache.render("c", "paragraph", self.render)
+        cache.render("a", "paragraph", self.render)
+        cache.render("b", "paragraph", self.render)
+        self.assertListEqual(["a", "b", "c", "b"], self.rendered)
+        self.assertEqual(2, len(cache.entries))
+
+    def test_persisted_between_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            RenderCache(directory=directory).render("text", "paragraph", self.render)
+            cache = RenderCache(directory=directory)
+            html = cache.render("text", "paragraph", self.render).to_html()
+            self.assertEqual("<p>text</p>", html)
+            self.assertListEqual(["text"], self.rendered)
+            self.assertEqual((0, 1, 0), cache.counts())
+            self.assertFalse(
+                any(
+                    file.endswith(".tmp")
+                    for _, _, files in os.walk(directory)
+                    for file in files
+                )
+            )
+
+    def test_text_cached_with_html(self):
+        def render(block, block_type):
+            collect_page_text(block.upper())
+            return self.render(block, block_type)
+
+        with tempfile.TemporaryDirectory() as directory:
+            RenderCache(directory=directory).render("text", "paragraph", render)
+            cache = RenderCache(directory=directory)
+            with collecting_page_text() as text:
+                cache.render("text", "paragraph", render)
+                cache.render("text", "paragraph", render)
+            self.assertListEqual(["TEXT", "TEXT"], text)
+            self.assertEqual((1, 1, 0), cache.counts())
+
+    def test_errors_not_cached(self):
+        cache = RenderCache()
+
+        def broken(block, block_type):
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            cache.render("text", "paragraph", broken)
+        self.assertEqual(0, len(cache.entries))
+
+    def test_render_block_uses_active_cache(self):
+        cache = RenderCache()
+        render_block("text", "paragraph", self.render)
+        with render_caching(cache):
+            render_block("text", "paragraph", self.render)
+            render_block("text", "paragraph", self.render)
+        render_block("text", "paragraph", self.render)
+        self.assertEqual(3, len(self.rendered))
+        self.assertEqual((1, 0, 1), cache.counts())
+
+    def test_process_cache_reused(self):
+        cache = get_render_cache(10, None)
+        self.assertIs(cache, get_render_cache(10, None))
+        self.assertIsNot(cache, get_render_cache(20, None))
+
+    def test_format_counts(self):
+        self.assertEqual(
+            "render cache: 3 hits (1 from disk), 1 misses, 75.0% hit rate",
+            format_render_cache_counts((2, 1, 1)),
+        )
+        self.assertIn("0.0% hit rate", format_render_cache_counts((0, 0, 0)))
+
+
+if "__name__" == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import os
+import unittest
+from unittest import mock
+from src.build_manifest import BuildManifest
+from src.search_index import (
+    MAX_POSITIONS,
+    SearchIndexBuilder,
+    decode_postings,
+    encode_postings,
+    page_terms,
+    search_index,
+    shard_key,
+    tokenize,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertListEqual(
+            ["gandalf", "the", "grey", "s", "staff", "ñu"],
+            tokenize("Gandalf the Grey's staff! Ñu"),
+        )
+        self.assertListEqual(["a", None, "b"], tokenize(f"a {'x' * 33} b"))
+
+    def test_page_terms(self):
+        terms = page_terms("the ring " + "the " * 20)
+        self.assertListEqual([1], terms["ring"])
+        self.assertEqual(MAX_POSITIONS, len(terms["the"]))
+
+    def test_shard_key(self):
+        self.assertEqual("ga", shard_key("gandalf", 2))
+        self.assertEqual("a", shard_key("a", 2))
+        self.assertEqual("_f1_u", shard_key("ñu", 2))
+        self.assertNotEqual(shard_key("жук", 2), shard_key("лес", 2))
+
+    def test_postings_round_trip(self):
+        postings = [(7, [3, 10]), (2, [0])]
+        encoded = encode_postings(postings, True)
+        self.assertListEqual([[2, 0], [5, 3, 7]], encoded)
+        self.assertDictEqual({2: [0], 7: [3, 10]}, decode_postings(encoded))
+        self.assertListEqual([[2], [5]], encode_postings(postings, False))
+
+
+class TestSearchIndexBuilder(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.path("public")
+        self.search = os.path.join(self.public, "search")
+
+    def build(self, pages, manifest=None):
+        builder = SearchIndexBuilder(self.public)
+        for page_id, (url, text) in pages.items():
+            builder.add(url, url.strip("/").title(), text, page_id)
+        return builder.close(manifest)
+
+    def load(self, *parts):
+        with open(os.path.join(self.search, *parts), "r") as file:
+            return json.load(file)
+
+    def test_search(self):
+        self.build(
+            {
+                0: ("/ring/", "one ring to rule them all, the ring"),
+                1: ("/hobbit/", "a hobbit found the ring"),
+                5: ("/elves/", "the elves left"),
+            }
+        )
+        self.assertListEqual(
+            [("/ring/", "Ring"), ("/hobbit/", "Hobbit")],
+            search_index(self.search, "ring"),
+        )
+        self.assertListEqual(
+            [("/hobbit/", "Hobbit")], search_index(self.search, "Ring HOBBIT")
+        )
+        self.assertListEqual([], search_index(self.search, "ring elves"))
+        self.assertListEqual([], search_index(self.search, "dragon"))
+        self.assertEqual(
+            [
+                ["/ring/", "Ring"],
+                ["/hobbit/", "Hobbit"],
+                None,
+                None,
+                None,
+                ["/elves/", "Elves"],
+            ],
+            self.load("pages", "0.json"),
+        )
+        self.assertTrue(os.path.isfile(os.path.join(self.search, "search.js")))
+
+    def test_large_shards_split(self):
+        pages = {page_id: (f"/{page_id}/", f"t{page_id:03d}") for page_id in range(300)}
+        with mock.patch("src.search_index.MAX_SHARD_BYTES", 500), mock.patch(
+            "src.search_index.MAX_TERM_BYTES", 250
+        ):
+            self.build(pages)
+        shards = self.load("index.json")["shards"]
+        self.assertNotIn("t1", shards)
+        self.assertIn("t12", shards)
+        for name in shards:
+            self.assertLessEqual(
+                os.path.getsize(os.path.join(self.search, "terms", f"{name}.json")),
+                500,
+            )
+        self.assertListEqual([("/123/", "123")], search_index(self.search, "t123"))
+
+    def test_large_terms_chunked(self):
+        pages = {
+            page_id: (f"/{page_id}/", "ring " * (page_id % 3 + 1) + "щит")
+            for page_id in range(400)
+        }
+        with mock.patch("src.search_index.MAX_SHARD_BYTES", 500), mock.patch(
+            "src.search_index.MAX_TERM_BYTES", 250
+        ), mock.patch("src.search_index.COMMON_TERM_MIN_PAGES", 1000):
+            self.build(pages)
+        terms = os.path.join(self.search, "terms")
+        for name in os.listdir(terms):
+            self.assertLessEqual(os.path.getsize(os.path.join(terms, name)), 500)
+        chunks = self.load("terms", "ri.json")["ring"]["chunks"]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(0, chunks[0])
+        self.assertTrue(os.path.exists(os.path.join(terms, "ring.0.json")))
+        self.assertEqual(400, len(search_index(self.search, "ring")))
+        self.assertEqual(("/2/", "2"), search_index(self.search, "ring")[0])
+        self.assertEqual(400, len(search_index(self.search, "ЩИТ ring")))
+
+    def test_common_terms_keep_only_ids(self):
+        pages = {page_id: (f"/{page_id}/", "the ring") for page_id in range(150)}
+        pages[150] = ("/rare/", "the rare ring")
+        with mock.patch("src.search_index.COMMON_TERM_MIN_PAGES", 100):
+            self.build(pages)
+        shard = self.load("terms", "th.json")
+        self.assertTrue(all(len(page) == 1 for page in shard["the"]))
+        self.assertListEqual([[150, 1]], self.load("terms", "ra.json")["rare"])
+
+    def test_unchanged_files_not_rewritten(self):
+        manifest_path = self.path("manifest.json")
+        pages = {0: ("/a/", "alpha beta"), 1: ("/b/", "gamma delta")}
+        manifest = BuildManifest(manifest_path)
+        for entry in self.build(pages, manifest):
+            manifest.record("outputs", entry["output"], entry)
+        manifest.save()
+        before = {
+            name: os.stat(os.path.join(self.search, "terms", name)).st_mtime_ns
+            for name in os.listdir(os.path.join(self.search, "terms"))
+        }
+
+        pages[1] = ("/b/", "gamma epsilon")
+        manifest = BuildManifest(manifest_path)
+        self.build(pages, manifest)
+        terms = os.path.join(self.search, "terms")
+        self.assertEqual(
+            before["al.json"], os.stat(os.path.join(terms, "al.json")).st_mtime_ns
+        )
+        self.assertListEqual([("/b/", "B")], search_index(self.search, "epsilon"))
+
+    def test_discard_removes_runs(self):
+        builder = SearchIndexBuilder(self.public)
+        builder.add("/", "Home", "some text")
+        builder.discard()
+        self.assertFalse(os.path.exists(builder.run_directory))
+        self.assertFalse(os.path.exists(self.search))
+
+
+if __name__ == "__main__":
+    unittest.main()
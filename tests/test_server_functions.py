@@ -0,0 +1,222 @@
+import gzip
+import http.client
+import os
+import threading
+import unittest
+import urllib.request
+from src.server_functions import (
+    LIVE_RELOAD_SCRIPT,
+    FileCache,
+    LiveReload,
+    accepted_encodings,
+    start_live_reload_server,
+    start_static_server,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestLiveReload(unittest.TestCase):
+    def test_wait_times_out(self):
+        self.assertEqual(0, LiveReload().wait(0, timeout=0.01))
+
+    def test_notify(self):
+        live_reload = LiveReload()
+        threading.Timer(0.01, live_reload.notify).start()
+        self.assertEqual(1, live_reload.wait(0, timeout=5))
+
+
+class TestLiveReloadServer(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(self.path("index.html"), "<html><body><p>hello</p></body></html>")
+        self.write(self.path("index.css"), "body {}")
+        self.server = start_live_reload_server(
+            self.directory.name, "127.0.0.1", 0, LiveReload()
+        )
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return response.read().decode()
+
+    def test_script_injected(self):
+        self.assertEqual(
+            f"<html><body><p>hello</p>{LIVE_RELOAD_SCRIPT}</body></html>",
+            self.fetch("/"),
+        )
+
+    def test_other_files_unchanged(self):
+        self.assertEqual("body {}", self.fetch("/index.css"))
+
+
+class TestFileCache(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filepath = self.write(self.path("page.html"), "first")
+
+    def test_read_cached(self):
+        cache = FileCache()
+        stat, content = cache.read(self.filepath)
+        self.assertEqual(b"first", content)
+        self.assertEqual(5, stat.st_size)
+        self.assertEqual(5, cache.size)
+        self.assertEqual((stat, b"first"), cache.read(self.filepath))
+
+    def test_replaced_file_read_again(self):
+        cache = FileCache()
+        cache.read(self.filepath)
+        replacement = self.filepath + ".tmp"
+        with open(replacement, "w") as file:
+            file.write("second!")
+        os.replace(replacement, self.filepath)
+        self.assertEqual(b"second!", cache.read(self.filepath)[1])
+        self.assertEqual(7, cache.size)
+
+    def test_large_file_not_cached(self):
+        cache = FileCache(max_file_size=4)
+        stat, content = cache.read(self.filepath)
+        self.assertIsNone(content)
+        self.assertEqual(5, stat.st_size)
+        self.assertEqual(0, len(cache.entries))
+
+    def test_least_recently_used_evicted(self):
+        other = self.path("other.html")
+        with open(other, "w") as file:
+            file.write("other")
+        cache = FileCache(max_size=8)
+        cache.read(self.filepath)
+        cache.read(other)
+        self.assertEqual([other], list(cache.entries))
+        self.assertEqual(5, cache.size)
+
+
+class TestAcceptedEncodings(unittest.TestCase):
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            {"gzip", "br"}, accepted_encodings("gzip, deflate;q=0, BR;q=0.5")
+        )
+
+    def test_no_header(self):
+        self.assertEqual(set(), accepted_encodings(None))
+
+
+class TestStaticServer(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.html", b"<p>home</p>")
+        self.write("blog/index.html", b"<p>blog</p>")
+        self.write("index.css", b"body {}")
+        self.write("image.png", b"\x89PNG" * 32)
+        self.server = start_static_server(self.directory.name, "127.0.0.1", 0)
+        self.server.file_cache.max_file_size = 64
+        self.connection = http.client.HTTPConnection(
+            "127.0.0.1", self.server.server_address[1], timeout=5
+        )
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def write(self, filepath, content):
+        return super().write(self.path(filepath), content)
+
+    def request(self, path, method="GET", **headers):
+        self.connection.request(method, path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_index(self):
+        response, content = self.request("/")
+        self.assertEqual(200, response.status)
+        self.assertEqual(b"<p>home</p>", content)
+        self.assertEqual("text/html; charset=utf-8", response.getheader("Content-Type"))
+        self.assertEqual("no-cache", response.getheader("Cache-Control"))
+
+    def test_keep_alive(self):
+        self.request("/")
+        sock = self.connection.sock
+        response, content = self.request("/blog/")
+        self.assertEqual(b"<p>blog</p>", content)
+        self.assertIs(sock, self.connection.sock)
+
+    def test_directory_redirected(self):
+        response, _ = self.request("/blog?page=2")
+        self.assertEqual(301, response.status)
+        self.assertEqual("/blog/?page=2", response.getheader("Location"))
+
+    def test_large_file(self):
+        response, content = self.request("/image.png")
+        self.assertEqual(b"\x89PNG" * 32, content)
+        self.assertEqual("image/png", response.getheader("Content-Type"))
+        self.assertIsNone(response.getheader("Vary"))
+
+    def test_head(self):
+        response, content = self.request("/index.css", method="HEAD")
+        self.assertEqual(b"", content)
+        self.assertEqual("7", response.getheader("Content-Length"))
+
+    def test_not_found(self):
+        response, content = self.request("/missing")
+        self.assertEqual(404, response.status)
+        self.assertEqual(b"404 Not Found\n", content)
+        self.write("404.html", b"<p>lost</p>")
+        response, content = self.request("/missing")
+        self.assertEqual(404, response.status)
+        self.assertEqual(b"<p>lost</p>", content)
+
+    def test_path_traversal(self):
+        response, content = self.request("/../../etc/passwd")
+        self.assertEqual(404, response.status)
+
+    def test_if_none_match(self):
+        response, _ = self.request("/index.css")
+        etag = response.getheader("ETag")
+        response, content = self.request("/index.css", **{"If-None-Match": etag})
+        self.assertEqual(304, response.status)
+        self.assertEqual(b"", content)
+        response, _ = self.request("/index.css", **{"If-None-Match": '"other"'})
+        self.assertEqual(200, response.status)
+
+    def test_if_modified_since(self):
+        response, _ = self.request("/index.css")
+        last_modified = response.getheader("Last-Modified")
+        response, _ = self.request("/index.css", **{"If-Modified-Since": last_modified})
+        self.assertEqual(304, response.status)
+        response, _ = self.request(
+            "/index.css", **{"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}
+        )
+        self.assertEqual(200, response.status)
+
+    def test_precompressed_sibling(self):
+        self.write("index.css.gz", gzip.compress(b"body {}"))
+        response, content = self.request("/index.css", **{"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+        self.assertEqual("text/css; charset=utf-8", response.getheader("Content-Type"))
+        self.assertEqual(b"body {}", gzip.decompress(content))
+        compressed_etag = response.getheader("ETag")
+
+        response, content = self.request("/index.css")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(b"body {}", content)
+        self.assertNotEqual(compressed_etag, response.getheader("ETag"))
+
+    def test_stale_sibling_ignored(self):
+        self.write("index.css.gz", gzip.compress(b"old"))
+        stat = os.stat(self.path("index.css"))
+        os.utime(
+            self.path("index.css.gz"),
+            ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9),
+        )
+        response, content = self.request("/index.css", **{"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(b"body {}", content)
+
+
+if "__name__" == "__main__":
+    unittest.main()
@@ -1,5 +1,23 @@
+import os
+import tempfile
 import unittest
-from src.site_generation_functions import extract_title
+import unittest.mock
+from src.build_manifest import BuildManifest
+from src.profiling_functions import BuildProfiler
+from src.site_index import SiteIndex
+from src.site_generation_functions import (
+    build_options,
+    collect_pages,
+    collect_static_files,
+    copy_file,
+    copy_static_files,
+    destination_for,
+    extract_title,
+    generate_pages_recursive,
+    remove_orphaned_outputs,
+    write_destination,
+)
+from tests.helpers import TemporaryDirectoryTestCase
 
 
 class TestTitleExtraction(unittest.TestCase):
@@ -24,5 +42,405 @@ class TestTitleExtraction(unittest.TestCase):
             extract_title("## hello")
 
 
+class TestIncrementalBuild(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.static = self.path("static")
+        self.public = self.path("public")
+        self.template = self.path("template.html")
+        self.manifest_path = self.path("manifest.json")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# post")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def build(self):
+        manifest = BuildManifest(self.manifest_path)
+        copy_static_files(self.static, self.public, manifest)
+        generate_pages_recursive(
+            self.content, self.template, self.public, manifest=manifest
+        )
+        remove_orphaned_outputs(manifest, self.public)
+        manifest.save()
+
+    def mtimes(self):
+        return {
+            os.path.join(root, file): os.stat(os.path.join(root, file)).st_mtime_ns
+            for root, _, files in os.walk(self.public)
+            for file in files
+        }
+
+    def test_unchanged_inputs_skipped(self):
+        self.build()
+        before = self.mtimes()
+        self.build()
+        self.assertDictEqual(before, self.mtimes())
+
+    def test_changed_page_rebuilt(self):
+        self.build()
+        before = self.mtimes()
+        self.write(os.path.join(self.content, "index.md"), "# new home")
+        self.build()
+        after = self.mtimes()
+        index = os.path.join(self.public, "index.html")
+        post = os.path.join(self.public, "blog", "post.html")
+        self.assertNotEqual(before[index], after[index])
+        self.assertEqual(before[post], after[post])
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        with open(os.path.join(self.public, "blog", "post.html")) as file:
+            self.assertTrue(file.read().startswith("<h1>"))
+
+    def test_orphans_removed(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        os.remove(os.path.join(self.static, "index.css"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+class TestStaticSync(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = self.path("static")
+        self.public = self.path("public")
+        self.manifest_path = self.path("manifest.json")
+        self.css = self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.image = self.write(
+            os.path.join(self.static, "images", "ring.png"), bytes(range(256)) * 64
+        )
+
+    def sync(self, link=False, minify=False):
+        manifest = BuildManifest(self.manifest_path)
+        copy_static_files(self.static, self.public, manifest, link, minify)
+        manifest.save()
+        return manifest
+
+    def test_collect_static_files(self):
+        self.assertListEqual(
+            [
+                (self.image, os.path.join("public", "images", "ring.png")),
+                (self.css, os.path.join("public", "index.css")),
+            ],
+            collect_static_files(self.static, "public"),
+        )
+
+    def test_copies_content(self):
+        self.sync()
+        for source, destination in collect_static_files(self.static, self.public):
+            with open(source, "rb") as expected, open(destination, "rb") as actual:
+                self.assertEqual(expected.read(), actual.read())
+
+    def test_unmodified_files_not_hashed(self):
+        self.sync()
+        manifest = BuildManifest(self.manifest_path)
+        with unittest.mock.patch(
+            "src.site_generation_functions.hash_file"
+        ) as hash_file:
+            copy_static_files(self.static, self.public, manifest)
+        hash_file.assert_not_called()
+        self.assertEqual(manifest.previous["static"], manifest.current["static"])
+
+    def test_touched_file_with_same_content_not_copied(self):
+        self.sync()
+        destination = os.path.join(self.public, "index.css")
+        before = os.stat(destination).st_mtime_ns
+        os.utime(self.css, ns=(before + 10**9, before + 10**9))
+        self.sync()
+        self.assertEqual(before, os.stat(destination).st_mtime_ns)
+
+    def test_changed_file_copied(self):
+        self.sync()
+        with open(self.css, "w") as file:
+            file.write("body { color: red; }")
+        self.sync()
+        with open(os.path.join(self.public, "index.css")) as file:
+            self.assertEqual("body { color: red; }", file.read())
+
+    def test_link(self):
+        self.sync(link=True)
+        destination = os.path.join(self.public, "images", "ring.png")
+        self.assertTrue(os.path.samefile(self.image, destination))
+
+    def test_minified_stylesheets(self):
+        with open(self.css, "w") as file:
+            file.write("body {\n  color: red;\n}\n")
+        destination = os.path.join(self.public, "index.css")
+        self.sync(link=True, minify=True)
+        with open(destination) as file:
+            self.assertEqual("body{color:red}", file.read())
+        with open(self.css) as file:
+            self.assertEqual("body {\n  color: red;\n}\n", file.read())
+        self.assertTrue(
+            os.path.samefile(
+                self.image, os.path.join(self.public, "images", "ring.png")
+            )
+        )
+
+        # turning minification off copies the stylesheet again
+        self.sync(link=True)
+        self.assertTrue(os.path.samefile(self.css, destination))
+
+    def test_copy_over_link_leaves_source_intact(self):
+        self.sync(link=True)
+        destination = os.path.join(self.public, "index.css")
+        with open(self.image, "rb") as file:
+            image = file.read()
+        copy_file(self.image, destination)
+        with open(self.css) as file:
+            self.assertEqual("body {}", file.read())
+        with open(destination, "rb") as file:
+            self.assertEqual(image, file.read())
+        self.assertFalse(os.path.samefile(self.css, destination))
+
+
+class TestPageGeneration(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.template = self.write(
+            self.path("template.html"), "<title>{{ Title }}</title>{{ Content }}"
+        )
+        for page in ("index", "b/post", "a/post", "a/z/deep"):
+            self.write(
+                os.path.join(self.content, f"{page}.md"), f"# {page}\n\nsome *text*"
+            )
+
+    def read_site(self, public):
+        site = {}
+        for source, destination in collect_pages(self.content, public):
+            with open(destination) as file:
+                site[os.path.relpath(destination, public)] = file.read()
+        return site
+
+    def test_collect_pages(self):
+        self.assertListEqual(
+            [
+                (os.path.join(self.content, "a/post.md"), "public/a/post.html"),
+                (os.path.join(self.content, "a/z/deep.md"), "public/a/z/deep.html"),
+                (os.path.join(self.content, "b/post.md"), "public/b/post.html"),
+                (os.path.join(self.content, "index.md"), "public/index.html"),
+            ],
+            collect_pages(self.content, "public"),
+        )
+
+    def test_destination_for(self):
+        for source, destination in collect_pages(self.content, "public"):
+            self.assertEqual(
+                destination,
+                destination_for(source, self.content, "public", page=True),
+            )
+        self.assertEqual(
+            "public/images/a.png",
+            destination_for("static/images/a.png", "static", "public"),
+        )
+
+    def test_given_pages_generated(self):
+        public = self.path("public")
+        source = os.path.join(self.content, "a/z/deep.md")
+        self.assertListEqual(
+            [],
+            generate_pages_recursive(
+                self.content, self.template, public, source_filepaths=[source]
+            ),
+        )
+        self.assertListEqual(["a"], os.listdir(public))
+        self.assertListEqual(["deep.html"], os.listdir(os.path.join(public, "a", "z")))
+
+    def test_parallel_matches_serial(self):
+        serial = self.path("serial")
+        parallel = self.path("parallel")
+        self.assertListEqual(
+            [], generate_pages_recursive(self.content, self.template, serial)
+        )
+        self.assertListEqual(
+            [],
+            generate_pages_recursive(
+                self.content, self.template, parallel, build_options(jobs=2)
+            ),
+        )
+        self.assertDictEqual(self.read_site(serial), self.read_site(parallel))
+        self.assertEqual(
+            "<title>index</title><div><h1>index</h1><p>some <i>text</i></p></div>",
+            self.read_site(serial)["index.html"],
+        )
+
+    def test_minify(self):
+        public = self.path("public")
+        with open(self.template, "w") as file:
+            file.write("<title>{{ Title }}</title>\n<body>\n  {{ Content }}\n</body>\n")
+        with open(os.path.join(self.content, "index.md"), "w") as file:
+            file.write("# index\n\nsome\n*text*\n\n```\n  code\n```")
+        generate_pages_recursive(
+            self.content, self.template, public, build_options(minify=True)
+        )
+        self.assertEqual(
+            "<title>index</title><body><div><h1>index</h1><p>some <i>text</i></p>"
+            "<pre><code>  code\n</code></pre></div></body>",
+            self.read_site(public)["index.html"],
+        )
+
+    def test_profiled(self):
+        public = self.path("public")
+        for jobs in (1, 2):
+            profiler = BuildProfiler()
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                public,
+                build_options(jobs=jobs),
+                profiler=profiler,
+            )
+            self.assertEqual(4, len(profiler.pages))
+            self.assertEqual(4, profiler.stages["write"][0])
+            self.assertIn("read", profiler.stages)
+            self.assertIn("inline_parse", profiler.stages)
+
+    def test_render_cache(self):
+        serial = self.path("serial")
+        cached = self.path("cached")
+        generate_pages_recursive(self.content, self.template, serial)
+        for jobs in (1, 2):
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                cached,
+                build_options(jobs=jobs, render_cache_size=8),
+            )
+            self.assertDictEqual(self.read_site(serial), self.read_site(cached))
+
+    def test_failed_page_leaves_previous_output(self):
+        public = self.path("public")
+        generate_pages_recursive(self.content, self.template, public)
+        with open(os.path.join(self.content, "index.md"), "a") as file:
+            file.write("\n\nan *unclosed delimiter")
+        failures = generate_pages_recursive(self.content, self.template, public)
+        self.assertEqual(1, len(failures))
+        self.assertEqual(
+            "<title>index</title><div><h1>index</h1><p>some <i>text</i></p></div>",
+            self.read_site(public)["index.html"],
+        )
+        self.assertListEqual(
+            ["index.html"],
+            [file for file in os.listdir(public) if file.startswith("index")],
+        )
+
+    def test_failures_reported_per_file(self):
+        broken = os.path.join(self.content, "a/broken.md")
+        with open(broken, "w") as file:
+            file.write("no heading here")
+        public = self.path("public")
+        for jobs in (1, 2):
+            failures = generate_pages_recursive(
+                self.content, self.template, public, build_options(jobs=jobs)
+            )
+            self.assertListEqual(
+                [(broken, "ValueError: No valid heading 1 found in markdown")],
+                failures,
+            )
+            self.assertTrue(os.path.exists(os.path.join(public, "index.html")))
+
+    def test_pipelined(self):
+        serial = self.path("serial")
+        generate_pages_recursive(self.content, self.template, serial)
+        for jobs in (1, 2):
+            pipelined = self.path(f"pipelined-{jobs}")
+            profiler = BuildProfiler()
+            self.assertListEqual(
+                [],
+                generate_pages_recursive(
+                    self.content,
+                    self.template,
+                    pipelined,
+                    build_options(jobs=jobs, io_concurrency=2),
+                    profiler=profiler,
+                ),
+            )
+            self.assertDictEqual(self.read_site(serial), self.read_site(pipelined))
+            self.assertEqual(4, len(profiler.pages))
+
+    def test_pipelined_failures_reported_per_file(self):
+        broken = os.path.join(self.content, "a/broken.md")
+        with open(broken, "w") as file:
+            file.write("no heading here")
+        public = self.path("public")
+        failures = generate_pages_recursive(
+            self.content, self.template, public, build_options(io_concurrency=3)
+        )
+        self.assertListEqual(
+            [(broken, "ValueError: No valid heading 1 found in markdown")], failures
+        )
+        self.assertTrue(os.path.exists(os.path.join(public, "a", "z", "deep.html")))
+        self.assertFalse(os.path.exists(os.path.join(public, "a", "broken.html")))
+
+    def test_front_matter(self):
+        post_template = self.path("post.html")
+        with open(post_template, "w") as file:
+            file.write("<h1>{{ Title }}</h1><p>{{ tags }}</p>{{ Content }}")
+        with open(os.path.join(self.content, "a/post.md"), "w") as file:
+            file.write(
+                f"---\ntitle: Post\ntags: [news, rings]\ntemplate: {post_template}\n---\ntext"
+            )
+        with open(os.path.join(self.content, "b/post.md"), "w") as file:
+            file.write("+++\ndraft = true\n+++\n# draft")
+        public = self.path("public")
+        site_index = SiteIndex(self.path("index.json"))
+        site_index.update(self.content, public)
+        self.assertListEqual(
+            [],
+            generate_pages_recursive(
+                self.content, self.template, public, site_index=site_index
+            ),
+        )
+        with open(os.path.join(public, "a", "post.html")) as file:
+            self.assertEqual(
+                "<h1>Post</h1><p>news, rings</p><div><p>text</p></div>", file.read()
+            )
+        self.assertFalse(os.path.exists(os.path.join(public, "b", "post.html")))
+
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            public,
+            build_options(include_drafts=True),
+            site_index=site_index,
+        )
+        self.assertTrue(os.path.exists(os.path.join(public, "b", "post.html")))
+
+
+class TestBuildOptions(unittest.TestCase):
+    def test_defaults(self):
+        options = build_options(jobs=4, extensions=["a"])
+        self.assertEqual(4, options["jobs"])
+        self.assertEqual(("a",), options["extensions"])
+        self.assertFalse(options["minify"])
+        self.assertEqual(build_options(**options), options)
+
+    def test_unknown_option(self):
+        with self.assertRaises(TypeError):
+            build_options(job=4)
+
+
+class TestWriteDestination(unittest.TestCase):
+    def test_created_directories_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            created_directories = set()
+            first = os.path.join(directory, "a", "b", "first.html")
+            second = os.path.join(directory, "a", "b", "second.html")
+            write_destination(first, "first", created_directories)
+            self.assertSetEqual({os.path.dirname(first)}, created_directories)
+            with unittest.mock.patch("os.makedirs") as makedirs:
+                write_destination(second, ["sec", "ond"], created_directories)
+            makedirs.assert_not_called()
+            with open(second) as file:
+                self.assertEqual("second", file.read())
+
+
 if "__name__" == "__main__":
     unittest.main()
@@ -0,0 +1,129 @@
+import os
+import unittest
+from src.site_index import SiteIndex, page_tags, page_url, read_page_metadata
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestSiteIndex(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.index_path = self.path("index.json")
+        self.write("index.md", "# Home\n\nwelcome")
+        self.write(
+            "blog/first.md",
+            "---\ntitle: First post\ndate: 2024-01-31\ntags: [news, rings]\n---\n"
+            "# Heading\n",
+        )
+        self.write(
+            "blog/draft.md",
+            '+++\ntitle = "Draft"\ndraft = true\ntags = ["news"]\n'
+            'template = "post.html"\n+++\n',
+        )
+
+    def write(self, page, content):
+        return super().write(self.source(page), content)
+
+    def source(self, page):
+        return os.path.join(self.content, page)
+
+    def test_page_url(self):
+        self.assertEqual("/", page_url("public/index.html", "public"))
+        self.assertEqual("/blog/", page_url("public/blog/index.html", "public"))
+        self.assertEqual("/blog/a.html", page_url("public/blog/a.html", "public"))
+
+    def test_page_tags(self):
+        self.assertListEqual(["a", "b"], page_tags({"tags": ["a", "b"]}))
+        self.assertListEqual(["a", "b"], page_tags({"tags": "a, b"}))
+        self.assertListEqual([], page_tags({"tags": ""}))
+        self.assertListEqual([], page_tags({}))
+
+    def test_read_page_metadata(self):
+        self.assertDictEqual(
+            {"title": "Home"}, read_page_metadata(self.source("index.md"))
+        )
+        self.assertDictEqual(
+            {"title": "First post", "date": "2024-01-31", "tags": ["news", "rings"]},
+            read_page_metadata(self.source("blog/first.md")),
+        )
+
+    def test_update(self):
+        index = SiteIndex(self.index_path)
+        self.assertEqual(3, index.update(self.content, "public"))
+        entry = index.pages[self.source("blog/first.md")]
+        self.assertEqual("public/blog/first.html", entry["output"])
+        self.assertEqual("/blog/first.html", entry["url"])
+        self.assertTrue(index.is_draft(self.source("blog/draft.md")))
+        self.assertFalse(index.is_draft(self.source("index.md")))
+        self.assertEqual(
+            "post.html", index.template(self.source("blog/draft.md"), "default.html")
+        )
+        self.assertEqual(
+            "default.html", index.template(self.source("index.md"), "default.html")
+        )
+
+    def test_persisted_and_only_changed_pages_read(self):
+        index = SiteIndex(self.index_path)
+        index.update(self.content, "public")
+        index.save()
+
+        index = SiteIndex(self.index_path)
+        self.assertEqual(0, index.update(self.content, "public"))
+        self.write("index.md", "# New home")
+        os.remove(self.source("blog/draft.md"))
+        self.assertEqual(1, index.update(self.content, "public"))
+        self.assertEqual("New home", index.metadata(self.source("index.md"))["title"])
+        self.assertNotIn(self.source("blog/draft.md"), index.pages)
+
+    def test_page_ids_stable(self):
+        index = SiteIndex(self.index_path)
+        index.update(self.content, "public")
+        ids = {source: index.page_id(source) for source in index.pages}
+        self.assertListEqual([0, 1, 2], sorted(ids.values()))
+
+        self.write("blog/first.md", "# Changed")
+        os.remove(self.source("blog/draft.md"))
+        added = self.write("about.md", "# About")
+        index.update(self.content, "public")
+        self.assertEqual(3, index.page_id(added))
+        for source in ("index.md", "blog/first.md"):
+            self.assertEqual(
+                ids[self.source(source)], index.page_id(self.source(source))
+            )
+        self.assertIsNone(index.page_id(self.source("blog/draft.md")))
+
+    def test_update_pages(self):
+        index = SiteIndex(self.index_path)
+        index.update(self.content, "public")
+        ids = {source: index.page_id(source) for source in index.pages}
+        self.write("index.md", "# New home")
+        os.remove(self.source("blog/draft.md"))
+        added = self.write("blog/second.md", "# Second")
+        changed = [self.source("index.md"), self.source("blog/draft.md"), added]
+        self.assertEqual(2, index.update_pages(changed, self.content, "public"))
+        self.assertEqual("New home", index.metadata(self.source("index.md"))["title"])
+        self.assertNotIn(self.source("blog/draft.md"), index.pages)
+        self.assertEqual("/blog/second.html", index.pages[added]["url"])
+        self.assertEqual(3, index.page_id(added))
+        self.assertEqual(
+            ids[self.source("index.md")], index.page_id(self.source("index.md"))
+        )
+
+    def test_invalid_front_matter(self):
+        broken = self.write("broken.md", "---\ntitle Hello\n---\n")
+        index = SiteIndex(self.index_path)
+        index.update(self.content, "public")
+        self.assertDictEqual({}, index.metadata(broken))
+
+    def test_tags(self):
+        index = SiteIndex(self.index_path)
+        index.update(self.content, "public")
+        first, draft = self.source("blog/first.md"), self.source("blog/draft.md")
+        self.assertDictEqual({"news": [first], "rings": [first]}, index.tags())
+        self.assertDictEqual(
+            {"news": [draft, first], "rings": [first]}, index.tags(include_drafts=True)
+        )
+
+
+if "__name__" == "__main__":
+    unittest.main()
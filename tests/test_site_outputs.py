@@ -0,0 +1,244 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from src.build_manifest import BuildManifest
+from src.markdown_conversion_functions import markdown_to_html_node
+from src.page_text import collecting_page_text, join_page_text
+from src.render_cache import RenderCache, render_caching
+from src.search_index import search_index
+from src.site_generation_functions import (
+    generate_pages_recursive,
+    remove_orphaned_outputs,
+)
+from src.site_index import SiteIndex
+from src.site_outputs import (
+    FeedWriter,
+    PageDataStore,
+    SitemapWriter,
+    SiteOutputs,
+    page_summary,
+    parse_page_date,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestPageText(unittest.TestCase):
+    markdown = "# The *title*\n\nSome **bold** and `code`\n\n- one\n- [two](/two.html)"
+
+    def test_collected_from_text_nodes(self):
+        with collecting_page_text() as text:
+            markdown_to_html_node(self.markdown)
+        self.assertEqual("The title Some bold and code one two", join_page_text(text))
+
+    def test_not_collected_outside_block(self):
+        with collecting_page_text() as text:
+            pass
+        markdown_to_html_node(self.markdown)
+        self.assertListEqual([], text)
+
+    def test_same_text_from_render_cache(self):
+        cache = RenderCache()
+        texts = []
+        for _ in range(2):
+            with render_caching(cache), collecting_page_text() as text:
+                markdown_to_html_node(self.markdown)
+            texts.append(join_page_text(text))
+        self.assertEqual(3, cache.counts()[0])
+        self.assertEqual(texts[0], texts[1])
+        self.assertEqual("The title Some bold and code one two", texts[1])
+
+
+class TestOutputHelpers(unittest.TestCase):
+    def test_parse_page_date(self):
+        self.assertEqual(
+            datetime(2024, 1, 31, tzinfo=timezone.utc), parse_page_date("2024-01-31")
+        )
+        self.assertEqual(
+            "2024-01-31T10:00:00+02:00",
+            parse_page_date("2024-01-31T10:00:00+02:00").isoformat(),
+        )
+        self.assertIsNone(parse_page_date("last tuesday"))
+        self.assertIsNone(parse_page_date(None))
+
+    def test_page_summary(self):
+        self.assertEqual("given", page_summary({"description": "given"}, "text"))
+        self.assertEqual("short text", page_summary({}, "short text"))
+        self.assertEqual("one two…", page_summary({}, "one two three", 10))
+
+
+class TestWriters(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.directory.name
+
+    def read(self, name):
+        with open(os.path.join(self.public, name), "r") as file:
+            return file.read()
+
+    def test_single_sitemap(self):
+        sitemap = SitemapWriter(self.public, "https://example.com/")
+        sitemap.add("/", parse_page_date("2024-01-31"))
+        sitemap.add("/a&b.html")
+        sitemap.close()
+        content = self.read("sitemap.xml")
+        self.assertIn(
+            "<url><loc>https://example.com/</loc>"
+            "<lastmod>2024-01-31T00:00:00+00:00</lastmod></url>",
+            content,
+        )
+        self.assertIn("<loc>https://example.com/a&amp;b.html</loc>", content)
+        self.assertListEqual(["sitemap.xml"], os.listdir(self.public))
+
+    def test_sitemap_split(self):
+        sitemap = SitemapWriter(self.public, "https://example.com", max_urls=2)
+        for number in range(5):
+            sitemap.add(f"/{number}.html")
+        self.assertEqual(4, len(sitemap.close()))
+        index = self.read("sitemap.xml")
+        self.assertIn("<sitemapindex", index)
+        self.assertIn("<loc>https://example.com/sitemap-3.xml</loc>", index)
+        self.assertEqual(2, self.read("sitemap-1.xml").count("<url>"))
+        self.assertEqual(1, self.read("sitemap-3.xml").count("<url>"))
+        self.assertTrue(self.read("sitemap-2.xml").endswith("</urlset>\n"))
+
+    def test_sitemap_split_by_size(self):
+        sitemap = SitemapWriter(self.public, "https://example.com", max_bytes=300)
+        for number in range(5):
+            sitemap.add(f"/{number}.html")
+        sitemap.close()
+        for name in os.listdir(self.public):
+            self.assertLessEqual(len(self.read(name).encode()), 300)
+
+    def test_feeds_keep_newest(self):
+        feeds = FeedWriter(self.public, "https://example.com", "Site", max_entries=2)
+        feeds.add("/undated.html", "Undated", {}, "text")
+        for day in (3, 1, 4, 2):
+            feeds.add(f"/{day}.html", f"Day {day}", {"date": f"2024-01-0{day}"}, "t")
+        feeds.close()
+        rss = self.read("rss.xml")
+        self.assertLess(rss.index("Day 4"), rss.index("Day 3"))
+        self.assertNotIn("Day 2", rss)
+        self.assertNotIn("Undated", rss)
+        self.assertIn("<pubDate>Thu, 04 Jan 2024 00:00:00 +0000</pubDate>", rss)
+        atom = self.read("atom.xml")
+        self.assertIn("<updated>2024-01-04T00:00:00+00:00</updated>", atom)
+        self.assertEqual(2, atom.count("<entry>"))
+
+    def test_page_data_store_order(self):
+        store_path = os.path.join(self.public, "data.jsonl")
+        store = PageDataStore(store_path)
+        for source in ("content/a/x.md", "content/a.md", "content/b.md"):
+            store.add(source, source.upper(), [["link", f"/{source}"]])
+        store.close()
+
+        store = PageDataStore(store_path)
+        self.assertEqual("CONTENT/A/X.MD", store.previous("content/a/x.md")["text"])
+        self.assertIsNone(store.previous("content/a/y.md"))
+        self.assertListEqual(
+            [["link", "/content/b.md"]], store.previous("content/b.md")["links"]
+        )
+        store.discard()
+
+    def test_discard_leaves_previous_outputs(self):
+        outputs = SiteOutputs(
+            self.public, os.path.join(self.public, "data.jsonl"), search_index=True
+        )
+        outputs.add_page(
+            "content/index.md", f"{self.public}/index.html", {}, {"text": "text"}
+        )
+        outputs.discard()
+        self.assertListEqual([], os.listdir(self.public))
+
+
+class TestSiteOutputsBuild(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.public = self.path("public")
+        self.template = self.path("template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nwelcome")
+        self.write(
+            os.path.join(self.content, "blog", "post.md"),
+            "---\ndate: 2024-01-31\n---\n# Post\n\nfirst *post*",
+        )
+
+    def build(self, **options):
+        manifest = BuildManifest(self.path("manifest.json"))
+        site_index = SiteIndex(self.path("index.json"))
+        site_index.update(self.content, self.public)
+        site_outputs = self.site_outputs = None
+        if options:
+            site_outputs = self.site_outputs = SiteOutputs(
+                self.public, self.path("data.jsonl"), title="Home", **options
+            )
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            manifest=manifest,
+            site_index=site_index,
+            site_outputs=site_outputs,
+        )
+        if site_outputs is not None:
+            site_outputs.close(manifest)
+        remove_orphaned_outputs(manifest, self.public)
+        manifest.save()
+        site_index.save()
+
+    def search(self, query):
+        return search_index(os.path.join(self.public, "search"), query)
+
+    def test_outputs(self):
+        self.build(base_url="https://example.com", search_index=True)
+        self.assertListEqual([("/", "Home")], self.search("welcome"))
+        self.assertListEqual([("/blog/post.html", "Post")], self.search("first post"))
+        with open(os.path.join(self.public, "atom.xml"), "r") as file:
+            atom = file.read()
+        self.assertIn('<link href="https://example.com/blog/post.html"/>', atom)
+        self.assertIn("<summary>Post first post</summary>", atom)
+
+    def test_unchanged_pages_keep_their_text(self):
+        self.build(search_index=True)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nwelcome back")
+        self.build(search_index=True)
+        self.assertListEqual([("/", "Home")], self.search("back"))
+        self.assertListEqual([("/blog/post.html", "Post")], self.search("first post"))
+
+    def test_pages_rebuilt_when_outputs_enabled(self):
+        self.build()
+        self.build(search_index=True)
+        self.assertListEqual([("/blog/post.html", "Post")], self.search("first"))
+
+    def test_links_checked(self):
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n[post](blog/post.html) [gone](/gone.html) ![logo](/logo.png)",
+        )
+        self.write(os.path.join(self.content, "blog", "old.md"), "# Old")
+        self.build(check_links=True)
+        self.assertDictEqual(
+            {
+                "broken_links": [("/", "/gone.html")],
+                "missing_images": [("/", "/logo.png")],
+                "orphan_pages": ["/blog/old.html"],
+            },
+            self.site_outputs.link_problems,
+        )
+
+        # unchanged pages keep their links
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build(check_links=True)
+        self.assertListEqual(
+            [("/", "/blog/post.html"), ("/", "/gone.html")],
+            self.site_outputs.link_problems["broken_links"],
+        )
+
+    def test_outputs_removed_when_disabled(self):
+        self.build(base_url="https://example.com", search_index=True)
+        self.build()
+        self.assertListEqual(["blog", "index.html"], sorted(os.listdir(self.public)))
+
+
+if __name__ == "__main__":
+    unittest.main()
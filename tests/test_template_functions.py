@@ -0,0 +1,95 @@
+import os
+import unittest
+from src.template_functions import (
+    compile_template,
+    iter_template,
+    load_template,
+    metadata_values,
+    render_template,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestCompileTemplate(unittest.TestCase):
+    def test_slots(self):
+        self.assertListEqual(
+            ["<title>", "Title", "</title><body>", "Content", "</body>"],
+            compile_template("<title>{{ Title }}</title><body>{{Content}}</body>"),
+        )
+
+    def test_no_slots(self):
+        self.assertListEqual(["<p>hello</p>"], compile_template("<p>hello</p>"))
+
+
+class TestRenderTemplate(unittest.TestCase):
+    def setUp(self):
+        self.template = compile_template(
+            "<title>{{ Title }}</title>{{ Content }}<p>{{ author }}</p>"
+        )
+
+    def test_render(self):
+        self.assertEqual(
+            "<title>hello</title><div></div><p>andy</p>",
+            render_template(
+                self.template,
+                {"Title": "hello", "Content": "<div></div>", "author": "andy"},
+            ),
+        )
+
+    def test_missing_value(self):
+        self.assertEqual(
+            "<title>hello</title><p></p>",
+            render_template(self.template, {"Title": "hello"}),
+        )
+
+    def test_streamed_value(self):
+        chunks = iter_template(
+            self.template, {"Title": "hello", "Content": iter(["<div>", "</div>"])}
+        )
+        self.assertListEqual(
+            ["<title>", "hello", "</title>", "<div>", "</div>", "<p>", "", "</p>"],
+            list(chunks),
+        )
+
+    def test_metadata_values(self):
+        self.assertDictEqual(
+            {"author": "andy", "tags": "news, rings", "draft": "False", "order": "2"},
+            metadata_values(
+                {
+                    "author": "andy",
+                    "tags": ["news", "rings"],
+                    "draft": False,
+                    "order": 2,
+                }
+            ),
+        )
+
+
+class TestLoadTemplate(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template_path = self.path("template.html")
+
+    def write(self, content, modified):
+        super().write(self.template_path, content)
+        os.utime(self.template_path, ns=(modified, modified))
+
+    def test_cached(self):
+        self.write("<p>{{ Title }}</p>", 1_000_000_000)
+        self.assertIs(
+            load_template(self.template_path), load_template(self.template_path)
+        )
+
+    def test_reloaded_on_change(self):
+        self.write("<p>{{ Title }}</p>", 1_000_000_000)
+        self.assertListEqual(
+            ["<p>", "Title", "</p>"], load_template(self.template_path)
+        )
+        self.write("<h1>{{ Title }}</h1>", 2_000_000_000)
+        self.assertListEqual(
+            ["<h1>", "Title", "</h1>"], load_template(self.template_path)
+        )
+
+
+if "__name__" == "__main__":
+    unittest.main()
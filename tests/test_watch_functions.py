@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.build_manifest import BuildManifest
+from src.site_index import SiteIndex
+from src import watch_functions
+from src.watch_functions import (
+    InotifyWatcher,
+    diff_snapshots,
+    rebuild_changes,
+    snapshot_files,
+)
+from tests.helpers import TemporaryDirectoryTestCase
+
+
+class TestSnapshots(unittest.TestCase):
+    def test_diff(self):
+        previous = {"a.md": (1, 10), "b.md": (1, 10), "c.md": (1, 10)}
+        current = {"a.md": (1, 10), "b.md": (2, 10), "d.md": (1, 10)}
+        self.assertTupleEqual(
+            (["b.md", "d.md"], ["c.md"]), diff_snapshots(previous, current)
+        )
+
+    def test_hidden_files_ignored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("index.md", ".index.md.swp"):
+                with open(os.path.join(directory, name), "w") as file:
+                    file.write("# hello")
+            self.assertListEqual(
+                [os.path.join(directory, "index.md")],
+                list(snapshot_files([directory])),
+            )
+
+
+@unittest.skipIf(watch_functions.inotify is None, "inotify is not available")
+class TestInotifyWatcher(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.template = self.path("template.html")
+        self.page = os.path.join(self.content, "index.md")
+        self.write(self.page, "# home")
+        self.write(self.template, "{{ Content }}")
+        self.write(self.path("other.html"), "")
+        self.watcher = InotifyWatcher([self.content, self.template])
+
+    def tearDown(self):
+        self.watcher.close()
+
+    def changes(self):
+        while self.watcher.read_events(0.05):
+            pass
+        return self.watcher.changes()
+
+    def test_nothing_changed(self):
+        self.assertTupleEqual(([], []), self.changes())
+
+    def test_changed_files(self):
+        self.write(self.page, "# new home")
+        self.write(self.template, "<main>{{ Content }}</main>")
+        self.write(self.path("other.html"), "ignored")
+        self.write(os.path.join(self.content, ".index.md.swp"), "ignored")
+        self.assertTupleEqual(([self.page, self.template], []), self.changes())
+
+    def test_new_and_removed_directories(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# post")
+        self.assertTupleEqual(([post], []), self.changes())
+        nested = os.path.join(self.content, "blog", "2024", "recap.md")
+        self.write(nested, "# recap")
+        self.assertTupleEqual(([nested], []), self.changes())
+
+        os.rename(os.path.join(self.content, "blog"), self.path("old"))
+        self.assertTupleEqual(([], [nested, post]), self.changes())
+        self.write(self.path("old", "post.md"), "# moved")
+        self.assertTupleEqual(([], []), self.changes())
+
+    def test_watch_added_paths(self):
+        other = self.path("other.html")
+        self.watcher.watch([self.content, self.template, other])
+        self.assertTupleEqual(([other], []), self.changes())
+
+
+class TestRebuildChanges(TemporaryDirectoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.path("content")
+        self.static = self.path("static")
+        self.public = self.path("public")
+        self.template = self.path("template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(self.path("content", "index.md"), "# home")
+        self.write(self.path("content", "post.md"), "# post")
+        self.write(self.path("static", "index.css"), "body {}")
+
+    def read(self, *parts):
+        with open(self.path(*parts)) as file:
+            return file.read()
+
+    def rebuild(self, changed, removed=(), **options):
+        return rebuild_changes(
+            changed,
+            removed,
+            self.content,
+            self.static,
+            self.template,
+            self.public,
+            options,
+            self.site_index,
+            self.manifest,
+        )
+
+    site_index = None
+    manifest = None
+
+    def test_only_changed_page_built(self):
+        with mock.patch(
+            "src.watch_functions.collect_pages", side_effect=AssertionError
+        ), mock.patch(
+            "src.site_generation_functions.collect_pages", side_effect=AssertionError
+        ):
+            self.assertListEqual([], self.rebuild([self.path("content", "index.md")]))
+        self.assertListEqual(["index.html"], os.listdir(self.public))
+
+    def test_static_copied_and_removed(self):
+        css = self.path("static", "index.css")
+        self.rebuild([css])
+        self.assertTrue(os.path.exists(self.path("public", "index.css")))
+        self.rebuild([], [css])
+        self.assertFalse(os.path.exists(self.path("public", "index.css")))
+
+    def test_template_rebuilds_every_page(self):
+        self.rebuild([self.template])
+        self.assertListEqual(
+            ["index.html", "post.html"], sorted(os.listdir(self.public))
+        )
+
+    def test_failure_reported(self):
+        broken = self.path("content", "broken.md")
+        self.write(broken, "no heading")
+        failures = self.rebuild([broken])
+        self.assertEqual(broken, failures[0][0])
+
+    def test_build_options_applied(self):
+        self.write(self.path("content", "index.md"), "# home\n\nsome   text")
+        self.write(self.path("static", "index.css"), "body {\n  color: red;\n}")
+        self.rebuild(
+            [self.path("content", "index.md"), self.path("static", "index.css")],
+            minify=True,
+        )
+        self.assertEqual(
+            "<title>home</title><div><h1>home</h1><p>some text</p></div>",
+            self.read("public", "index.html"),
+        )
+        self.assertEqual("body{color:red}", self.read("public", "index.css"))
+
+    def test_manifest_updated(self):
+        index = self.path("content", "index.md")
+        css = self.path("static", "index.css")
+        self.manifest = BuildManifest(self.path("manifest.json"))
+        self.rebuild([index, css])
+        self.assertEqual(
+            {"pages": [index], "static": [css]},
+            {
+                section: list(self.manifest.current[section])
+                for section in ("pages", "static")
+            },
+        )
+        self.rebuild([], [css])
+        self.assertNotIn(css, self.manifest.current["static"])
+
+    def test_front_matter_template_rebuilds_its_pages(self):
+        post_template = self.path("post.html")
+        self.write(post_template, "<h1>{{ Title }}</h1>")
+        self.write(
+            self.path("content", "post.md"),
+            f"---\ntemplate: {post_template}\n---\n# post",
+        )
+        self.site_index = SiteIndex(self.path("index.json"))
+        self.site_index.update(self.content, self.public)
+        self.rebuild([post_template])
+        self.assertListEqual(["post.html"], os.listdir(self.public))
+        self.assertEqual("<h1>post</h1>", self.read("public", "post.html"))
+
+    def test_draft_output_removed(self):
+        self.site_index = SiteIndex(self.path("index.json"))
+        post = self.path("content", "post.md")
+        self.rebuild([post])
+        self.assertTrue(os.path.exists(self.path("public", "post.html")))
+        self.write(post, "---\ndraft: true\n---\n# post")
+        self.rebuild([post])
+        self.assertFalse(os.path.exists(self.path("public", "post.html")))
+        self.rebuild([post], include_drafts=True)
+        self.assertTrue(os.path.exists(self.path("public", "post.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()